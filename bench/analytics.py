@@ -0,0 +1,87 @@
+# bench/analytics.py
+# Custo da análise dos negócios (barras OHLCV, VWAP, janela móvel) no motor: o
+# mesmo fluxo sintético, com muitos negócios, com e sem enable_analytics, e o
+# custo por negócio de add_trade sozinho. A memória alocada pela análise é
+# medida (tracemalloc) depois de um aquecimento e de novo no fim da sessão: os
+# anéis são alocados uma vez, então ela não cresce com os negócios.
+# Uso: python bench/analytics.py [--ops K] [--trades N] [--capacity C]
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from analytics import TradeAnalytics
+from book import OrderBook
+from sinks import NullSink
+from flowgen import FlowConfig, FlowGenerator, FlowMix, apply_command
+
+# Fluxo com bastante agressão: metade das limit cruzam e mais ordens a mercado
+def commands(ops: int):
+    config = FlowConfig(seed=3, mix=FlowMix(limit=0.5, market=0.2, cancel=0.3, peg=0, modify=0, modify_qty=0), cross=0.5)
+    gen = FlowGenerator(config)
+    return list(gen.prefill(10_000)), list(gen.commands(ops))
+
+def run_book(prefill, flow, analytics: bool):
+    book = OrderBook(sink=NullSink())
+    for cmd in prefill:
+        apply_command(book, cmd)
+    if analytics:
+        book.enable_analytics()
+    t0 = time.perf_counter()
+    for k, cmd in enumerate(flow):
+        if k % 64 == 0:
+            book.advance_time(k)
+        apply_command(book, cmd)
+    return time.perf_counter() - t0, book
+
+# add_trade direto: n negócios num passeio de preço. Com measure_memory, mede a
+# memória alocada após 10% dos negócios e no fim (tracemalloc deixa tudo lento,
+# então o tempo vem de uma passada sem ele)
+def run_trades(n: int, capacity: int, measure_memory: bool = False):
+    analytics = TradeAnalytics(trade_bar=50, time_bar=100, capacity=capacity)
+    analytics._book = OrderBook(sink=NullSink())
+    expiries = analytics._book.expiries
+    price = 10_000
+    checkpoint = None
+    if measure_memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    for k in range(n):
+        price += (k * 7919) % 5 - 2
+        expiries.now = k // 10
+        analytics.add_trade(price, 1 + k % 9)
+        if measure_memory and k == n // 10:
+            checkpoint = tracemalloc.get_traced_memory()[0]
+    elapsed = time.perf_counter() - t0
+    if measure_memory:
+        final = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return checkpoint, final
+    return elapsed / n
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo da análise de negócios no motor")
+    parser.add_argument("--ops", type=int, default=200_000, help="comandos do fluxo")
+    parser.add_argument("--trades", type=int, default=1_000_000, help="negócios no teste de add_trade")
+    parser.add_argument("--capacity", type=int, default=4096, help="barras por anel")
+    args = parser.parse_args()
+
+    prefill, flow = commands(args.ops)
+    base, _ = run_book(prefill, flow, False)
+    with_analytics, book = run_book(prefill, flow, True)
+    trades = book.analytics.trades
+    print(f"fluxo: {len(flow):,} comandos, {trades:,} negócios")
+    print(f"  sem análise {base / len(flow) * 1e6:8.2f} us/comando")
+    print(f"  com análise {with_analytics / len(flow) * 1e6:8.2f} us/comando "
+          f"(+{(with_analytics - base) / max(1, trades) * 1e6:.2f} us/negócio)")
+
+    per_trade = run_trades(args.trades, args.capacity)
+    checkpoint, final = run_trades(args.trades, args.capacity, measure_memory=True)
+    print(f"add_trade: {per_trade * 1e6:.2f} us/negócio em {args.trades:,} negócios")
+    print(f"  memória alocada após 10%: {checkpoint / 1024:.1f} KiB, no fim: {final / 1024:.1f} KiB")
+
+if __name__ == "__main__":
+    main()
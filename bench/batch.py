@@ -0,0 +1,103 @@
+# bench/batch.py
+# OrderBook.submit_batch x comandos um a um: primeiro confere que a saída e o
+# livro final são idênticos (vários seeds, tamanhos de batch e backends), depois
+# mede a vazão em rajadas de comandos.
+# Uso: python bench/batch.py [--depth N] [--ops K] [--seeds S] [--backend ladder|list|both]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from book import OrderBook
+from sinks import NullSink, TextSink
+from flowgen import FlowConfig, FlowGenerator, FlowMix, apply_command
+
+BATCH_SIZES = (1, 16, 256, 4096)
+
+# Saída capturada e estado final do livro após aplicar o fluxo
+def run_capture(backend: str, prefill, cmds, batch_size: int, debug: bool):
+    sink = TextSink(buffer_lines=sys.maxsize)
+    book = OrderBook(backend=backend, sink=sink, debug=debug)
+    for cmd in prefill:
+        apply_command(book, cmd)
+    if batch_size == 0:
+        for cmd in cmds:
+            apply_command(book, cmd)
+    else:
+        for start in range(0, len(cmds), batch_size):
+            book.submit_batch(cmds[start:start + batch_size])
+    output = sink.drain()
+    state = (
+        [(o.id, o.price, o.qty, o.ts, o.pegged) for o in book.buys],
+        [(o.id, o.price, o.qty, o.ts, o.pegged) for o in book.sells],
+        book.depth(50),
+    )
+    return output, state
+
+# Compara o batch com a referência um a um; devolve a primeira divergência
+def differential(backend: str, seeds: int, depth: int, ops: int):
+    for seed in range(1, seeds + 1):
+        # Com stops: as cascatas também precisam sair iguais
+        gen = FlowGenerator(FlowConfig(seed=seed, mix=FlowMix(stop=0.05)))
+        prefill = list(gen.prefill(depth))
+        cmds = list(gen.commands(ops))
+        expected = run_capture(backend, prefill, cmds, 0, debug=False)
+        for batch_size in (1, 7, 256, len(cmds)):
+            got = run_capture(backend, prefill, cmds, batch_size, debug=seed == 1)
+            if got[0] != expected[0]:
+                line = next(i for i, (a, b) in enumerate(zip(got[0], expected[0])) if a != b)
+                return f"seed {seed}, batch {batch_size}: saída difere na linha {line}"
+            if got[1] != expected[1]:
+                return f"seed {seed}, batch {batch_size}: livro final difere"
+    return None
+
+# Comandos/s aplicando o fluxo um a um (batch_size 0) ou em batches
+def throughput(backend: str, depth: int, ops: int, batch_size: int, seed: int) -> float:
+    gen = FlowGenerator(FlowConfig(seed=seed))
+    book = OrderBook(backend=backend, sink=NullSink())
+    for cmd in gen.prefill(depth):
+        apply_command(book, cmd)
+    cmds = list(gen.commands(ops))
+    t0 = time.perf_counter()
+    if batch_size == 0:
+        for cmd in cmds:
+            apply_command(book, cmd)
+    else:
+        submit = book.submit_batch
+        for start in range(0, len(cmds), batch_size):
+            submit(cmds[start:start + batch_size])
+    return len(cmds) / (time.perf_counter() - t0)
+
+def main():
+    parser = argparse.ArgumentParser(description="submit_batch: checagem diferencial e vazão")
+    parser.add_argument("--depth", type=int, default=10_000, help="ordens no livro antes da medição")
+    parser.add_argument("--ops", type=int, default=50_000, help="comandos medidos")
+    parser.add_argument("--seeds", type=int, default=5, help="seeds da checagem diferencial")
+    parser.add_argument("--backend", choices=("ladder", "list", "both"), default="both")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    backends = ("ladder", "list") if args.backend == "both" else (args.backend,)
+
+    failed = False
+    for backend in backends:
+        problem = differential(backend, args.seeds, 500, 5_000)
+        print(f"diferencial {backend}: {problem or 'idêntico'}")
+        failed |= problem is not None
+    if failed:
+        sys.exit(1)
+
+    print(f"\n{'backend':>8} {'batch':>6} {'cmds/s':>12} {'ganho':>7}")
+    for backend in backends:
+        # O backend em listas é O(n) por comando: mede menos ordens
+        depth = args.depth if backend == "ladder" else min(args.depth, 2_000)
+        ops = args.ops if backend == "ladder" else min(args.ops, 5_000)
+        base = throughput(backend, depth, ops, 0, args.seed)
+        print(f"{backend:>8} {'-':>6} {base:>12,.0f} {1.0:>6.2f}x")
+        for batch_size in BATCH_SIZES:
+            rate = throughput(backend, depth, ops, batch_size, args.seed)
+            print(f"{backend:>8} {batch_size:>6} {rate:>12,.0f} {rate / base:>6.2f}x")
+
+if __name__ == "__main__":
+    main()
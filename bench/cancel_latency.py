@@ -0,0 +1,65 @@
+# bench/cancel_latency.py
+# Mede a latência de cancelamento com livros de 1k a 1M ordens em repouso.
+# Uso: python bench/cancel_latency.py [--cancels K] [--list-max N]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from book import Order, OrderBook, OrderType, Side
+from sinks import NullSink
+import limit
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+# Monta um livro com n ordens limit em repouso sem cruzar os lados
+def build_book(backend: str, n: int, rng: random.Random) -> OrderBook:
+    book = OrderBook(backend=backend, sink=NullSink())
+    for _ in range(n):
+        side = Side.BUY if rng.random() < 0.5 else Side.SELL
+        price = rng.randint(1, 5000) + (0 if side == Side.BUY else 10_000)
+        order_id = book._next_id()
+        order = Order(order_type=OrderType.LIMIT, side=side, qty=10, price=price, ts=book._next_ts(), id=order_id)
+        if side == Side.BUY:
+            limit.add_buy_limit(book, order)
+        else:
+            limit.add_sell_limit(book, order)
+        book.orders_by_id[order_id] = order
+    return book
+
+# Cancela k ordens aleatórias e devolve as latências em nanossegundos
+def measure(book: OrderBook, k: int, rng: random.Random):
+    ids = rng.sample(list(book.orders_by_id), k)
+    samples = []
+    for order_id in ids:
+        t0 = time.perf_counter_ns()
+        limit.cancel_order(book, order_id)
+        samples.append(time.perf_counter_ns() - t0)
+    samples.sort()
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência de cancel por tamanho do livro")
+    parser.add_argument("--cancels", type=int, default=1000)
+    parser.add_argument("--list-max", type=int, default=10_000, help="maior livro medido no backend list")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'orders':>10} {'backend':>8} {'mean_us':>9} {'p50_us':>9} {'p99_us':>9}")
+    for n in SIZES:
+        for backend in ("ladder", "list"):
+            if backend == "list" and n > args.list_max:
+                continue
+            rng = random.Random(args.seed)
+            book = build_book(backend, n, rng)
+            s = measure(book, min(args.cancels, n), rng)
+            mean = sum(s) / len(s) / 1000
+            p50 = s[len(s) // 2] / 1000
+            p99 = s[min(len(s) - 1, int(len(s) * 0.99))] / 1000
+            print(f"{n:>10} {backend:>8} {mean:>9.2f} {p50:>9.2f} {p99:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# bench/expiry.py
+# Custo de expirar ordens GTD pela roda de tempo do livro, com muitas ordens em
+# repouso: cotações GTD de vida curta são renovadas a cada tick e o tempo anda
+# um tick por vez. Compara com a varredura das ordens vivas atrás das vencidas a
+# cada tick, que é O(ordens no livro) mesmo quando nada vence.
+# Uso: python bench/expiry.py [--depth N] [--quotes K] [--ticks T] [--life L]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from book import OrderBook, Side, TimeInForce
+from sinks import NullSink
+
+# Livro com depth ordens GTC longe do meio e o tempo em 0
+def build_book(depth: int) -> OrderBook:
+    book = OrderBook(sink=NullSink())
+    for i in range(depth):
+        if i % 2:
+            book.handle_limit(Side.BUY, 9_000 - i % 500, 10)
+        else:
+            book.handle_limit(Side.SELL, 11_000 + i % 500, 10)
+    return book
+
+# A cada tick, quotes cotações GTD com prazo now + life e o tempo avança um tick
+def run(book: OrderBook, quotes: int, ticks: int, life: int, scan: bool):
+    deadlines = {}
+    expired = 0
+    t0 = time.perf_counter()
+    for now in range(1, ticks + 1):
+        for k in range(quotes):
+            side = Side.BUY if k % 2 else Side.SELL
+            price = 9_900 - k if side == Side.BUY else 10_100 + k
+            if scan:
+                book.handle_limit(side, price, 1)
+                deadlines[book._id_counter] = now + life
+            else:
+                book.handle_limit(side, price, 1, TimeInForce.GTD, now + life)
+        if scan:
+            # Varredura: confere o prazo de cada ordem viva
+            due = [o.id for o in book.orders_by_id.values() if deadlines.get(o.id, now + 1) <= now]
+            for order_id in due:
+                book.cancel_order(order_id)
+                del deadlines[order_id]
+            expired += len(due)
+        else:
+            before = len(book.expiries)
+            book.advance_time(now)
+            expired += before - len(book.expiries)
+    return time.perf_counter() - t0, expired
+
+def main():
+    parser = argparse.ArgumentParser(description="Expiração de ordens GTD: roda de tempo x varredura")
+    parser.add_argument("--depth", type=int, default=200_000, help="ordens GTC em repouso")
+    parser.add_argument("--quotes", type=int, default=20, help="cotações GTD novas por tick")
+    parser.add_argument("--ticks", type=int, default=500)
+    parser.add_argument("--life", type=int, default=5, help="validade das cotações, em ticks")
+    args = parser.parse_args()
+
+    print(f"{'modo':>10} {'ms/tick':>10} {'expiradas':>10}")
+    for mode in ("wheel", "scan"):
+        book = build_book(args.depth)
+        elapsed, expired = run(book, args.quotes, args.ticks, args.life, mode == "scan")
+        print(f"{mode:>10} {elapsed / args.ticks * 1e3:>10.3f} {expired:>10,}")
+
+if __name__ == "__main__":
+    main()
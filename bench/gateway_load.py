@@ -0,0 +1,132 @@
+# bench/gateway_load.py
+# Gerador de carga do gateway TCP: C conexões enviam comandos sintéticos em
+# pipeline (até W pendentes cada) e medem mensagens/s e latência de ida e volta.
+# Sem --port, sobe um gateway local num subprocesso.
+# Uso: python bench/gateway_load.py [--connections C] [--count N] [--window W] [--subscribers S]
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import deque
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+from flowgen import FlowConfig, FlowGenerator, format_command
+from ticks import TickSize
+
+# Percentil pelo posto mais próximo numa lista já ordenada
+def percentile(samples, q: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+# Uma conexão: escreve os comandos respeitando a janela e lê as respostas em ordem
+async def run_client(host, port, lines, window: int, latencies: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    sent_at = deque()
+    slots = asyncio.Semaphore(window)
+
+    async def read_responses():
+        for _ in range(len(lines)):
+            header = await reader.readline()
+            while header.startswith(b"*"):
+                header = await reader.readline()
+            for _ in range(int(header[2:])):
+                await reader.readline()
+            latencies.append(time.perf_counter_ns() - sent_at.popleft())
+            slots.release()
+
+    reading = asyncio.create_task(read_responses())
+    for line in lines:
+        await slots.acquire()
+        sent_at.append(time.perf_counter_ns())
+        writer.write(line)
+        if slots.locked():
+            await writer.drain()
+    await reading
+    writer.close()
+
+# Inscrito no feed de negócios: só consome até o fim da medição
+async def run_subscriber(host, port, stop: asyncio.Event, counter: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b"subscribe trades\n")
+    while not stop.is_set():
+        try:
+            line = await asyncio.wait_for(reader.readline(), 0.1)
+        except asyncio.TimeoutError:
+            continue
+        if not line:
+            break
+        if line.startswith(b"*"):
+            counter[0] += 1
+    writer.close()
+
+async def run(args, host, port):
+    ticks = TickSize()
+    workloads = []
+    for c in range(args.connections):
+        gen = FlowGenerator(FlowConfig(seed=args.seed + c))
+        symbol = f"@S{c % args.symbols} " if args.symbols > 0 else ""
+        workloads.append([
+            f"{symbol}{format_command(cmd, ticks)}\n".encode("utf-8") for cmd in gen.commands(args.count)
+        ])
+
+    stop = asyncio.Event()
+    trades = [0]
+    subscribers = [asyncio.create_task(run_subscriber(host, port, stop, trades)) for _ in range(args.subscribers)]
+    await asyncio.sleep(0.1)
+
+    latencies = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, lines, args.window, latencies) for lines in workloads))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await asyncio.gather(*subscribers)
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"conexões {args.connections}, janela {args.window}, inscritos {args.subscribers}")
+    print(f"{total} mensagens em {elapsed:.3f}s: {total / elapsed:,.0f} msg/s")
+    print(
+        f"ida e volta (us): p50 {percentile(latencies, 0.5) / 1000:.1f}  "
+        f"p99 {percentile(latencies, 0.99) / 1000:.1f}  p99.9 {percentile(latencies, 0.999) / 1000:.1f}"
+    )
+    if args.subscribers:
+        print(f"negócios recebidos pelos inscritos: {trades[0]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga no gateway TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="gateway já em execução (padrão: sobe um local)")
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--count", type=int, default=5_000, help="comandos por conexão")
+    parser.add_argument("--window", type=int, default=64, help="comandos pendentes por conexão")
+    parser.add_argument("--subscribers", type=int, default=1)
+    parser.add_argument("--symbols", type=int, default=0, help="ativos (@S0..) distribuídos entre as conexões")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    proc = None
+    port = args.port
+    if port is None:
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(SRC, "gateway.py"), "--host", args.host, "--port", "0"],
+            stderr=subprocess.PIPE, text=True,
+        )
+        banner = proc.stderr.readline()
+        match = re.search(r"(\d+)\)", banner)
+        if match is None:
+            proc.kill()
+            raise SystemExit(f"gateway não subiu: {banner.strip()}")
+        port = int(match.group(1))
+    try:
+        asyncio.run(run(args, args.host, port))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    main()
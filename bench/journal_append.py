@@ -0,0 +1,125 @@
+# bench/journal_append.py
+# Custo de registrar comandos no journal (por tamanho de grupo, com e sem fsync),
+# sobrecarga do journal no motor e tempos de snapshot/recuperação.
+# Uso: python bench/journal_append.py [--records K] [--depth N] [--dir DIR]
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from book import OrderBook
+from sinks import NullSink
+from flowgen import FlowConfig, FlowGenerator, apply_command, LIMIT, MARKET, PEG, MODIFY, MODIFY_QTY, CANCEL
+import journal
+
+GROUP_SIZES = (1, 16, 256, 4096)
+
+# Chama o método de log correspondente a um comando gerado
+def log_command(j: journal.Journal, cmd):
+    kind = cmd[0]
+    if kind == LIMIT:
+        j.log_limit(cmd[1], cmd[2], cmd[3])
+    elif kind == MARKET:
+        j.log_market(cmd[1], cmd[2])
+    elif kind == PEG:
+        j.log_peg(cmd[1], cmd[2], cmd[3])
+    elif kind == MODIFY:
+        j.log_modify(cmd[1], cmd[2], cmd[3])
+    elif kind == MODIFY_QTY:
+        j.log_modify_qty(cmd[1], cmd[2])
+    elif kind == CANCEL:
+        j.log_cancel(cmd[1])
+
+# Custo médio (ns) de registrar cada comando, incluindo write/fsync dos grupos
+def append_cost(directory: str, cmds, group_size: int, fsync: bool) -> float:
+    path = os.path.join(directory, "append.bin")
+    if os.path.exists(path):
+        os.remove(path)
+    j = journal.Journal(path, group_size=group_size, group_interval=float("inf"), fsync=fsync)
+    t0 = time.perf_counter_ns()
+    for cmd in cmds:
+        log_command(j, cmd)
+    j.close()
+    return (time.perf_counter_ns() - t0) / len(cmds)
+
+# Custo médio (ns) por comando do motor, com ou sem journal
+def engine_cost(directory, cmds, depth_cmds) -> float:
+    if directory is None:
+        book = OrderBook(sink=NullSink())
+    else:
+        book = journal.open_book(directory, sink=NullSink())
+    for cmd in depth_cmds:
+        apply_command(book, cmd)
+    t0 = time.perf_counter_ns()
+    for cmd in cmds:
+        apply_command(book, cmd)
+    elapsed = time.perf_counter_ns() - t0
+    if book.journal is not None:
+        book.journal.close()
+    return elapsed / len(cmds)
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo do journal e da recuperação")
+    parser.add_argument("--records", type=int, default=100_000, help="comandos por medição de append")
+    parser.add_argument("--fsync-records", type=int, default=2_000, help="comandos nas medições com fsync")
+    parser.add_argument("--depth", type=int, default=1_000_000, help="ordens do livro do snapshot")
+    parser.add_argument("--tail", type=int, default=10_000, help="comandos do journal após o snapshot")
+    parser.add_argument("--dir", default=None, help="diretório de trabalho (padrão: temporário)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp(prefix="journal_bench_")
+    os.makedirs(directory, exist_ok=True)
+    try:
+        gen = FlowGenerator(FlowConfig(seed=args.seed))
+        prefill = list(gen.prefill(1_000))
+        cmds = list(gen.commands(args.records))
+
+        print(f"{'group':>6} {'fsync':>6} {'ns/cmd':>10}")
+        for group_size in GROUP_SIZES:
+            for fsync in (False, True):
+                sample = cmds[:args.fsync_records] if fsync else cmds
+                cost = append_cost(directory, sample, group_size, fsync)
+                print(f"{group_size:>6} {str(fsync):>6} {cost:>10.0f}")
+
+        base = engine_cost(None, cmds, prefill)
+        journaled = engine_cost(os.path.join(directory, "engine"), cmds, prefill)
+        print(f"\nmotor sem journal: {base:>8.0f} ns/cmd")
+        print(f"motor com journal: {journaled:>8.0f} ns/cmd (+{journaled - base:.0f})")
+
+        # Snapshot de um livro grande + cauda do journal, depois recuperação
+        state = os.path.join(directory, "state")
+        gen = FlowGenerator(FlowConfig(seed=args.seed))
+        book = journal.open_book(state, fsync=False, sink=NullSink())
+        for cmd in gen.prefill(args.depth):
+            apply_command(book, cmd)
+        t0 = time.perf_counter()
+        book.journal.checkpoint()
+        write_s = time.perf_counter() - t0
+        for cmd in gen.commands(args.tail):
+            apply_command(book, cmd)
+        book.journal.close()
+        size = os.path.getsize(os.path.join(state, journal.SNAPSHOT_FILE))
+        del book
+
+        t0 = time.perf_counter()
+        loaded, _ = journal.load_snapshot(os.path.join(state, journal.SNAPSHOT_FILE), sink=NullSink())
+        load_s = time.perf_counter() - t0
+        del loaded
+        t0 = time.perf_counter()
+        recovered, seq = journal.recover(state, sink=NullSink())
+        recover_s = time.perf_counter() - t0
+
+        print(f"\nsnapshot de {args.depth} ordens: {size / 1e6:.1f} MB, gravação {write_s:.3f}s, carga {load_s:.3f}s")
+        print(f"recuperação (snapshot + {args.tail} comandos): {recover_s:.3f}s, "
+              f"{len(recovered.orders_by_id)} ordens vivas, seq {seq}")
+    finally:
+        if args.dir is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# bench/mass_cancel.py
+# Cancelamento em massa das k ordens de um participante (cancel all) em livros
+# de tamanhos diferentes, contra cancelar as mesmas k ordens uma a uma com
+# cancel order. O cancel all deve custar O(k), sem depender do resto do livro.
+# Uso: python bench/mass_cancel.py [--sizes 10000,100000,1000000] [--k 1000] [--backend ladder|list]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from book import OrderBook, Side, Peg
+from sinks import NullSink
+
+# Livro com size ordens de outros participantes e k do market maker "mm",
+# intercaladas nos mesmos preços, mais algumas pegged
+def build_book(backend: str, size: int, k: int) -> OrderBook:
+    book = OrderBook(backend=backend, sink=NullSink())
+    every = max(1, size // k)
+    mm = 0
+    for i in range(size):
+        owner = "mm" if i % every == 0 and mm < k else f"p{i % 50}"
+        mm += owner == "mm"
+        book.set_owner(owner)
+        if i % 2:
+            book.handle_limit(Side.BUY, 9_000 - i % 1000, 10)
+        else:
+            book.handle_limit(Side.SELL, 11_000 + i % 1000, 10)
+    book.set_owner("p0")
+    for _ in range(10):
+        book.handle_peg(Peg.BID, Side.BUY, 5)
+        book.handle_peg(Peg.OFFER, Side.SELL, 5)
+    return book
+
+def main():
+    parser = argparse.ArgumentParser(description="cancel all x cancel order um a um")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="ordens no livro")
+    parser.add_argument("--k", type=int, default=1000, help="ordens do participante cancelado")
+    parser.add_argument("--backend", choices=("ladder", "list"), default="ladder")
+    args = parser.parse_args()
+
+    print(f"{'ordens':>10} {'k':>6} {'all ms':>9} {'um a um ms':>11} {'us/ordem all':>13}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        book = build_book(args.backend, size, args.k)
+        ids = list(book.owned["mm"][0]) + list(book.owned["mm"][1])
+        t0 = time.perf_counter()
+        count = book.cancel_all("mm")
+        mass = time.perf_counter() - t0
+
+        book = build_book(args.backend, size, args.k)
+        t0 = time.perf_counter()
+        for order_id in ids:
+            book.cancel_order(order_id)
+        single = time.perf_counter() - t0
+        print(f"{size:>10,} {count:>6,} {mass * 1e3:>9.2f} {single * 1e3:>11.2f} {mass / count * 1e6:>13.2f}")
+
+if __name__ == "__main__":
+    main()
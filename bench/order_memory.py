@@ -0,0 +1,72 @@
+# bench/order_memory.py
+# Mede bytes por ordem em repouso com o layout antigo (dataclass com __dict__,
+# strings e ids textuais) e com o layout compacto (slots, enums, ids inteiros).
+# Uso: python bench/order_memory.py [--orders N]
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from book import Order, OrderType, Side
+from ladder import LadderSide
+
+# Cópia do layout original de book.Order, só para comparação
+@dataclass
+class LegacyOrder:
+    order_type: str
+    side: str
+    qty: int
+    price: Optional[float] = None
+    ts: int = 0
+    id: Optional[str] = None
+    pegged: Optional[str] = None
+
+# Ordens no layout antigo: lista ordenada por lado + índice por id textual
+def build_legacy(n: int, rng: random.Random):
+    buys, sells, by_id = [], [], {}
+    for i in range(1, n + 1):
+        side = "buy" if rng.random() < 0.5 else "sell"
+        price = rng.randint(1, 5000) / 100 + (0 if side == "buy" else 100)
+        order = LegacyOrder("limit", side, 10, price, i, f"identificador_{i}")
+        (buys if side == "buy" else sells).append(order)
+        by_id[order.id] = order
+    return buys, sells, by_id
+
+# Ordens no layout compacto, em repouso no ladder + índice por id inteiro
+def build_compact(n: int, rng: random.Random):
+    buys, sells, by_id = LadderSide(is_buy=True), LadderSide(is_buy=False), {}
+    for i in range(1, n + 1):
+        side = Side.BUY if rng.random() < 0.5 else Side.SELL
+        price = rng.randint(1, 5000) + (0 if side == Side.BUY else 10_000)
+        order = Order(OrderType.LIMIT, side, 10, price, i, i)
+        (buys if side == Side.BUY else sells).insert(order)
+        by_id[i] = order
+    return buys, sells, by_id
+
+# Mede o pico de memória alocada para montar o livro
+def measure(build, n: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    book = build(n, random.Random(1))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del book
+    return current / n
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes por ordem em repouso")
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'layout':>10} {'orders':>10} {'bytes/order':>12}")
+    for name, build in (("legacy", build_legacy), ("compact", build_compact)):
+        print(f"{name:>10} {args.orders:>10} {measure(build, args.orders):>12.1f}")
+
+if __name__ == "__main__":
+    main()
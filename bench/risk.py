@@ -0,0 +1,92 @@
+# bench/risk.py
+# Latência acrescentada pelo estágio de risco por ordem: o mesmo fluxo de
+# limit/market/modify/cancel de vários participantes sobre um livro com muitas
+# ordens em repouso, sem risco e com todos os limites ligados (folgados, para
+# que nenhuma ordem seja rejeitada e o motor faça o mesmo trabalho). A checagem
+# usa só os agregados do participante, então o acréscimo não cresce com o livro.
+# Uso: python bench/risk.py [--depth N] [--orders K] [--backend ladder|list]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from book import OrderBook, Side
+from risk import RiskLimits
+from sinks import NullSink
+
+OWNERS = tuple(f"p{i}" for i in range(20))
+
+# Livro com depth ordens longe do meio, espalhadas entre os participantes
+def build_book(backend: str, depth: int) -> OrderBook:
+    book = OrderBook(backend=backend, sink=NullSink())
+    for i in range(depth):
+        book.set_owner(OWNERS[i % len(OWNERS)])
+        if i % 2:
+            book.handle_limit(Side.BUY, 9_000 - i % 1000, 10)
+        else:
+            book.handle_limit(Side.SELL, 11_000 + i % 1000, 10)
+    return book
+
+# Fluxo perto do meio: limits (às vezes agressoras), markets, modifies e cancels
+def flow(orders: int, seed: int):
+    rng = random.Random(seed)
+    commands = []
+    for _ in range(orders):
+        owner = rng.choice(OWNERS)
+        x = rng.random()
+        side = Side.BUY if rng.random() < 0.5 else Side.SELL
+        if x < 0.6:
+            commands.append((owner, "limit", side, 9_990 + rng.randint(0, 20), rng.randint(1, 20)))
+        elif x < 0.7:
+            commands.append((owner, "market", side, rng.randint(1, 20)))
+        elif x < 0.8:
+            commands.append((owner, "modify", rng.randint(1, 10_000), 9_990 + rng.randint(0, 20), rng.randint(1, 20)))
+        else:
+            commands.append((owner, "cancel", None))
+    return commands
+
+def run(book: OrderBook, commands) -> float:
+    t0 = time.perf_counter()
+    for cmd in commands:
+        book.set_owner(cmd[0])
+        kind = cmd[1]
+        if kind == "limit":
+            book.handle_limit(cmd[2], cmd[3], cmd[4])
+        elif kind == "market":
+            book.handle_market(cmd[2], cmd[3])
+        elif kind == "modify":
+            book.modify_order(book._id_counter - cmd[2] % 100, cmd[3], cmd[4])
+        else:
+            book.cancel_order(book._id_counter - 1)
+    return time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência por ordem com e sem o estágio de risco")
+    parser.add_argument("--depth", type=int, default=100_000, help="ordens em repouso")
+    parser.add_argument("--orders", type=int, default=100_000, help="ordens medidas")
+    parser.add_argument("--backend", choices=("ladder", "list"), default="ladder")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    commands = flow(args.orders, args.seed)
+    limits = RiskLimits(
+        max_order_qty=1_000, price_band=5_000, max_position=10**9, max_notional=10**15, rate=1e9, burst=10**6
+    )
+    print(f"{'modo':>8} {'us/ordem':>10} {'rejeitadas':>11}")
+    base = None
+    for mode in ("sem", "com"):
+        book = build_book(args.backend, args.depth)
+        risk = book.enable_risk(limits) if mode == "com" else None
+        per_order = run(book, commands) / len(commands)
+        rejected = risk.rejected if risk is not None else 0
+        print(f"{mode:>8} {per_order * 1e6:>10.2f} {rejected:>11,}")
+        if base is None:
+            base = per_order
+        else:
+            print(f"acréscimo: {(per_order - base) * 1e6:.2f} us/ordem ({per_order / base - 1:+.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# bench/run.py
+# Mede vazão, latência (p50/p99/p99.9) e pico de memória por tipo de comando
+# com fluxo sintético sobre livros de 100 a 1M ordens; resultado em JSON.
+# Uso: python bench/run.py [--depths 100,1000,...] [--ops K] [--backend ladder|list] [--out arquivo.json]
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from book import OrderBook
+from sinks import NullSink
+from flowgen import FlowConfig, FlowGenerator, SHAPES, apply_command
+
+DEPTHS = (100, 1_000, 10_000, 100_000, 1_000_000)
+
+# Percentil pelo posto mais próximo numa lista já ordenada
+def percentile(samples, q: float) -> int:
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+# Resumo das latências (ns) de um tipo de comando
+def summarize(samples) -> dict:
+    samples.sort()
+    total = sum(samples)
+    return {
+        "count": len(samples),
+        "throughput_per_s": round(len(samples) / (total / 1e9), 1) if total else None,
+        "mean_us": round(total / len(samples) / 1000, 3),
+        "p50_us": round(percentile(samples, 0.50) / 1000, 3),
+        "p99_us": round(percentile(samples, 0.99) / 1000, 3),
+        "p999_us": round(percentile(samples, 0.999) / 1000, 3),
+        "max_us": round(samples[-1] / 1000, 3),
+    }
+
+# Uma profundidade: monta o livro, mede latência por comando e depois o pico
+# de alocação por comando (tracemalloc, numa passada separada e menor)
+def run_depth(depth: int, args) -> dict:
+    config = FlowConfig(seed=args.seed, shape=args.shape, width=args.width, cross=args.cross)
+    gen = FlowGenerator(config)
+    book = OrderBook(backend=args.backend, sink=NullSink())
+
+    t0 = time.perf_counter()
+    for cmd in gen.prefill(depth):
+        apply_command(book, cmd)
+    prefill_s = time.perf_counter() - t0
+
+    latencies = {}
+    clock = time.perf_counter_ns
+    wall0 = time.perf_counter()
+    for cmd in gen.commands(args.ops):
+        t = clock()
+        apply_command(book, cmd)
+        elapsed = clock() - t
+        samples = latencies.get(cmd[0])
+        if samples is None:
+            samples = latencies[cmd[0]] = []
+        samples.append(elapsed)
+    wall_s = time.perf_counter() - wall0
+
+    peaks = {}
+    tracemalloc.start()
+    for cmd in gen.commands(args.mem_ops):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        apply_command(book, cmd)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks[cmd[0]] = max(peaks.get(cmd[0], 0), peak - current)
+    tracemalloc.stop()
+
+    ops = {}
+    for kind, samples in sorted(latencies.items()):
+        ops[kind] = summarize(samples)
+        ops[kind]["peak_alloc_bytes"] = peaks.get(kind)
+
+    return {
+        "depth": depth,
+        "prefill_s": round(prefill_s, 3),
+        "wall_s": round(wall_s, 3),
+        "throughput_per_s": round(args.ops / wall_s, 1),
+        "live_orders": len(book.orders_by_id),
+        "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "ops": ops,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do motor com fluxo sintético")
+    parser.add_argument("--depths", default=",".join(str(d) for d in DEPTHS), help="profundidades separadas por vírgula")
+    parser.add_argument("--ops", type=int, default=20_000, help="comandos medidos por profundidade")
+    parser.add_argument("--mem-ops", type=int, default=2_000, help="comandos da passada de memória")
+    parser.add_argument("--backend", choices=("ladder", "list"), default="ladder")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--shape", choices=SHAPES, default="normal")
+    parser.add_argument("--width", type=int, default=500, help="largura da distribuição, em ticks")
+    parser.add_argument("--cross", type=float, default=0.05, help="fração de limits agressivas")
+    parser.add_argument("--out", default=None, help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    depths = [int(d) for d in args.depths.split(",") if d]
+    results = []
+    for depth in depths:
+        result = run_depth(depth, args)
+        print(f"depth {depth:>9}: {result['throughput_per_s']:>12,.0f} cmds/s", file=sys.stderr)
+        results.append(result)
+
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "seed": args.seed,
+            "ops": args.ops,
+            "mem_ops": args.mem_ops,
+            "flow": asdict(FlowConfig(seed=args.seed, shape=args.shape, width=args.width, cross=args.cross)),
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out is None:
+        print(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# bench/shm_check.py
+# Feed em memória compartilhada: um processo produtor roda o motor com o feed
+# ligado enquanto vários consumidores fazem polling do topo do livro e do anel
+# de negócios. Ao fim, cada leitura dos consumidores é comparada com o que o
+# produtor publicou naquela versão (e com o n-ésimo negócio): qualquer diferença
+# é um valor rasgado. --unsafe lê sem o seqlock, para mostrar que a checagem
+# pega leituras rasgadas quando o protocolo não é seguido.
+# Uso: python bench/shm_check.py [--ops K] [--consumers C] [--capacity N] [--unsafe]
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from book import OrderBook
+from sinks import NullSink
+from flowgen import FlowConfig, FlowGenerator, FlowMix, apply_command
+import shmfeed
+
+# Campos comparados de uma leitura do topo
+def _top_key(top: shmfeed.TopOfBook):
+    return (
+        top.bid_price, top.bid_qty, top.bid_count, top.offer_price, top.offer_qty,
+        top.offer_count, top.last_price, top.last_qty, top.trades,
+    )
+
+# Produtor: aplica o fluxo e registra cada versão publicada e cada negócio
+def produce(name: str, ops: int, capacity: int, ready, done, release, out):
+    book = OrderBook(sink=NullSink())
+    feed = book.enable_shm_feed(name, capacity)
+    top = shmfeed.TopOfBookReader(name)
+    trades = shmfeed.TradeReader(name)
+    published = {top.version(): _top_key(top.read())}
+    log = []
+    gen = FlowGenerator(FlowConfig(seed=7, width=40, cross=0.3, mix=FlowMix(stop=0.02)))
+    cmds = list(gen.prefill(2_000)) + list(gen.commands(ops))
+    ready.wait()
+    t0 = time.perf_counter()
+    for cmd in cmds:
+        apply_command(book, cmd)
+        # Sem concorrência com o próprio escritor: leitura de referência
+        published[top.version()] = _top_key(top.read())
+        log.extend((t.n, t.price, t.qty, t.version) for t in trades.poll())
+    elapsed = time.perf_counter() - t0
+    done.set()
+    out.put((published, log, trades.lost, len(cmds) / elapsed))
+    top.close()
+    trades.close()
+    # Espera os consumidores soltarem o bloco antes de removê-lo
+    release.wait()
+    feed.close()
+
+# Leitura sem seqlock: campos e versão lidos sem conferir o seq de novo
+def _read_unsafe(reader: shmfeed.TopOfBookReader):
+    buf = reader._buf
+    seq = shmfeed._SEQ.unpack_from(buf, shmfeed._TOP)[0]
+    fields = shmfeed._TOP_FIELDS.unpack_from(buf, shmfeed._TOP + 8)
+    flags = fields[0]
+    return seq >> 1, (
+        fields[1] if flags & shmfeed.HAS_BID else None, fields[2], fields[3],
+        fields[4] if flags & shmfeed.HAS_OFFER else None, fields[5], fields[6],
+        fields[7] if flags & shmfeed.HAS_LAST else None, fields[8], fields[9],
+    )
+
+# Consumidor: guarda uma leitura por versão vista e todos os negócios lidos
+def consume(name: str, unsafe: bool, ready, done, out):
+    top = shmfeed.TopOfBookReader(name)
+    trades = shmfeed.TradeReader(name, from_start=True)
+    seen = {}
+    got = []
+    reads = 0
+    ready.wait()
+    while not done.is_set():
+        if unsafe:
+            version, key = _read_unsafe(top)
+            seen.setdefault(version, key)
+        else:
+            snapshot = top.read()
+            seen.setdefault(snapshot.version, _top_key(snapshot))
+        reads += 1
+        if reads % 8 == 0:
+            got.extend((t.n, t.price, t.qty, t.version) for t in trades.poll())
+    got.extend((t.n, t.price, t.qty, t.version) for t in trades.poll())
+    out.put((seen, got, trades.lost, reads))
+    top.close()
+    trades.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Feed em memória compartilhada: checagem de leituras rasgadas")
+    parser.add_argument("--ops", type=int, default=100_000, help="comandos do produtor")
+    parser.add_argument("--consumers", type=int, default=4)
+    parser.add_argument("--capacity", type=int, default=1024, help="posições do anel de negócios")
+    parser.add_argument("--unsafe", action="store_true", help="consumidores leem sem o seqlock")
+    args = parser.parse_args()
+
+    name = f"msep_check_{os.getpid()}"
+    ctx = mp.get_context("spawn")
+    # O produtor cria o bloco; os consumidores esperam por ele na barreira
+    ready = ctx.Barrier(args.consumers + 1)
+    done = ctx.Event()
+    release = ctx.Event()
+    produced = ctx.Queue()
+    consumed = ctx.Queue()
+    producer = ctx.Process(target=produce, args=(name, args.ops, args.capacity, ready, done, release, produced))
+    producer.start()
+    while True:
+        try:
+            shmfeed.TopOfBookReader(name).close()
+            break
+        except FileNotFoundError:
+            time.sleep(0.01)
+    consumers = [
+        ctx.Process(target=consume, args=(name, args.unsafe, ready, done, consumed))
+        for _ in range(args.consumers)
+    ]
+    for process in consumers:
+        process.start()
+
+    published, log, _, rate = produced.get()
+    results = [consumed.get() for _ in consumers]
+    for process in consumers:
+        process.join()
+    release.set()
+    producer.join()
+
+    trades = {n: (price, qty, version) for n, price, qty, version in log}
+    print(f"produtor: {args.ops:,} comandos ({rate:,.0f}/s), {len(published):,} versões, {len(log):,} negócios")
+    failed = False
+    for i, (seen, got, lost, reads) in enumerate(results):
+        torn = sum(1 for version, key in seen.items() if published.get(version) != key)
+        torn_trades = sum(1 for n, price, qty, version in got if trades.get(n) != (price, qty, version))
+        print(
+            f"consumidor {i}: {reads:,} leituras, {len(seen):,} versões vistas, rasgadas {torn}; "
+            f"{len(got):,} negócios, rasgados {torn_trades}, perdidos {lost}"
+        )
+        failed |= torn > 0 or torn_trades > 0
+    if args.unsafe:
+        print("sem seqlock: leituras rasgadas " + ("detectadas" if failed else "não observadas nesta execução"))
+    elif failed:
+        sys.exit(1)
+    else:
+        print("nenhuma leitura rasgada")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# bench/stops.py
+# Custo por comando com muitas ordens stop em repouso: o disparo consulta só a
+# faixa de preços negociada (bisect), então o custo não deve crescer com o número
+# de stops longe do mercado. Também conta disparos e cascatas de um fluxo com stops.
+# Uso: python bench/stops.py [--depth N] [--ops K] [--stops 0,1000,10000,100000]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from book import OrderBook, Side
+from sinks import Sink
+from events import StopTriggered
+from flowgen import FlowConfig, FlowGenerator, FlowMix, apply_command
+
+# Conta os disparos de stop, descartando o resto
+class TriggerCounter(Sink):
+    def __init__(self):
+        self.triggered = 0
+
+    def emit(self, event):
+        if type(event) is StopTriggered:
+            self.triggered += 1
+
+    def write(self, text: str):
+        pass
+
+# ns/comando do fluxo misto com n stops fora da faixa de preços negociada
+def cost_with_resting(n_stops: int, depth: int, ops: int, seed: int) -> float:
+    config = FlowConfig(seed=seed)
+    gen = FlowGenerator(config)
+    counter = TriggerCounter()
+    book = OrderBook(sink=counter)
+    for cmd in gen.prefill(depth):
+        apply_command(book, cmd)
+    far = config.mid + 4 * config.width
+    for i in range(n_stops):
+        if i % 2:
+            book.handle_stop(Side.BUY, far + i % 1000, 10)
+        else:
+            book.handle_stop(Side.SELL, max(1, config.mid - 4 * config.width - i % 1000), 10)
+    cmds = list(gen.commands(ops))
+    t0 = time.perf_counter_ns()
+    for cmd in cmds:
+        apply_command(book, cmd)
+    elapsed = time.perf_counter_ns() - t0
+    # (os cancels do fluxo podem acertar ids de stops; disparos não deveriam ocorrer)
+    if counter.triggered:
+        raise SystemExit("stops longe do mercado dispararam; aumente a distância")
+    return elapsed / ops
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo das ordens stop")
+    parser.add_argument("--depth", type=int, default=10_000)
+    parser.add_argument("--ops", type=int, default=50_000)
+    parser.add_argument("--stops", default="0,1000,10000,100000", help="stops em repouso, separados por vírgula")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'stops':>8} {'ns/cmd':>10}")
+    for n in (int(x) for x in args.stops.split(",")):
+        print(f"{n:>8} {cost_with_resting(n, args.depth, args.ops, args.seed):>10.0f}")
+
+    # Fluxo com 5% de stops perto do mercado: disparos e cascatas reais
+    counter = TriggerCounter()
+    book = OrderBook(sink=counter)
+    gen = FlowGenerator(FlowConfig(seed=args.seed, mix=FlowMix(stop=0.05)))
+    for cmd in gen.prefill(args.depth):
+        apply_command(book, cmd)
+    t0 = time.perf_counter_ns()
+    for cmd in gen.commands(args.ops):
+        apply_command(book, cmd)
+    elapsed = time.perf_counter_ns() - t0
+    print(f"\nfluxo com stops: {elapsed / args.ops:.0f} ns/cmd, {counter.triggered} disparos, "
+          f"{len(book.stops)} stops em repouso no fim")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# bench/sweep.py
+# Ordens agressoras pequenas contra um livro de 1M ordens: tempo por ordem e
+# memória alocada no pico de cada uma (tracemalloc), por backend. "list-slice"
+# é o backend em listas com o drop_front antigo, que copiava o resto do lado a
+# cada varredura, para comparação com o avanço do início da lista.
+# Mede a varredura (market.match_market_buy / limit.match_limit_buy) direto:
+# no backend em listas o melhor preço das pegged é uma varredura O(n) por evento,
+# que esconderia o custo da varredura em si.
+# Uso: python bench/sweep.py [--depth N] [--orders K] [--backend ladder|list|list-slice|all]
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from book import Order, OrderBook, OrderType, Side
+from sinks import NullSink
+from flat import FlatSide
+import limit
+import market
+
+# Backend em listas com a cópia do resto da lista a cada varredura (como antes)
+class _SlicingFlatSide(FlatSide):
+    def drop_front(self, n: int):
+        self._orders = self._orders[self._head + n:]
+        self._head = 0
+
+# Livro com depth ordens de venda (10 por nível) a partir do preço 10_000
+def build_book(backend: str, depth: int) -> OrderBook:
+    book = OrderBook(backend="list" if backend == "list-slice" else backend, sink=NullSink())
+    if backend == "list-slice":
+        book.sells = _SlicingFlatSide(is_buy=False)
+    orders = []
+    for i in range(depth):
+        order = Order(OrderType.LIMIT, Side.SELL, 10, 10_000 + i // 10, ts=i + 1, id=i + 1)
+        orders.append(order)
+        book.orders_by_id[order.id] = order
+    book.sells.load(orders)
+    book._id_counter = book._ts_counter = depth
+    return book
+
+# Alterna market e limit agressoras de 10 a 30 (1 a 3 ordens do livro)
+def aggress(book: OrderBook, k: int):
+    ts = book._next_ts()
+    qty = 10 * (1 + k % 3)
+    if k % 2:
+        market.match_market_buy(book, qty, ts)
+    else:
+        # Limite acima de todo o livro: a quantidade é que encerra a varredura
+        limit.match_limit_buy(book, sys.maxsize, qty, ts)
+
+def measure(backend: str, depth: int, orders: int):
+    book = build_book(backend, depth)
+    t0 = time.perf_counter()
+    for k in range(orders):
+        aggress(book, k)
+    elapsed = time.perf_counter() - t0
+
+    # Pico de memória alocada por ordem, numa amostra menor (tracemalloc é lento)
+    tracemalloc.start()
+    peak = 0
+    for k in range(min(orders, 200)):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        aggress(book, k)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return elapsed / orders, peak, len(book.sells)
+
+def main():
+    parser = argparse.ArgumentParser(description="Varredura de matching contra um livro profundo")
+    parser.add_argument("--depth", type=int, default=1_000_000, help="ordens em repouso")
+    parser.add_argument("--orders", type=int, default=20_000, help="ordens agressoras medidas")
+    parser.add_argument("--backend", choices=("ladder", "list", "list-slice", "all"), default="all")
+    args = parser.parse_args()
+    backends = ("ladder", "list", "list-slice") if args.backend == "all" else (args.backend,)
+
+    print(f"{'backend':>10} {'us/ordem':>10} {'pico KiB':>10} {'restantes':>10}")
+    for backend in backends:
+        # A cópia de 1M referências por ordem é lenta demais para o total de ordens
+        orders = args.orders if backend != "list-slice" else min(args.orders, 2_000)
+        per_order, peak, left = measure(backend, args.depth, orders)
+        print(f"{backend:>10} {per_order * 1e6:>10.2f} {peak / 1024:>10.1f} {left:>10,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# src/analytics.py
+# Estatísticas dos negócios calculadas no próprio motor, a cada Trade emitido:
+# barras OHLCV por quantidade de negócios e por faixa de tempo lógico do livro,
+# VWAP da sessão e volume/VWAP/volatilidade numa janela móvel dos últimos
+# negócios. Tudo fica em anéis NumPy alocados no enable_analytics, então a
+# memória não cresce com a sessão: as barras mais antigas e os negócios que
+# saem da janela são sobrescritos. A barra aberta fica em escalares Python e só
+# vai para o anel quando fecha.
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from events import Trade
+
+# Negócios por barra, largura das barras de tempo (no tempo lógico do livro),
+# negócios na janela móvel e barras guardadas em cada anel
+DEFAULT_TRADE_BAR = 100
+DEFAULT_TIME_BAR = 1000
+DEFAULT_WINDOW = 1000
+DEFAULT_CAPACITY = 4096
+
+# Colunas de uma barra (preços em ticks; notional = soma de preço x qty)
+BAR_FIELDS = ("start", "open", "high", "low", "close", "volume", "notional", "trades")
+
+# Barras exibidas por "stats trades"
+_REPORT_BARS = 5
+
+# Barras OHLCV num anel de capacity posições
+class BarRing:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.columns: Dict[str, np.ndarray] = {name: np.zeros(capacity, dtype=np.int64) for name in BAR_FIELDS}
+        # Barras fechadas desde o início (as de antes das capacity últimas já saíram)
+        self.closed = 0
+        # Barra aberta: início (None = nenhuma), OHLC, volume, notional e negócios
+        self.start: Optional[int] = None
+        self.open = self.high = self.low = self.close = 0
+        self.volume = self.notional = self.trades = 0
+
+    # Soma um negócio à barra que começa em start, fechando a aberta se for outra
+    def add(self, start: int, price: int, qty: int):
+        if start != self.start:
+            if self.start is not None:
+                self._flush()
+            self.start = start
+            self.open = self.high = self.low = price
+            self.volume = self.notional = self.trades = 0
+        elif price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += qty
+        self.notional += price * qty
+        self.trades += 1
+
+    def _flush(self):
+        i = self.closed % self.capacity
+        columns = self.columns
+        columns["start"][i] = self.start
+        columns["open"][i] = self.open
+        columns["high"][i] = self.high
+        columns["low"][i] = self.low
+        columns["close"][i] = self.close
+        columns["volume"][i] = self.volume
+        columns["notional"][i] = self.notional
+        columns["trades"][i] = self.trades
+        self.closed += 1
+
+    # Barras guardadas em ordem cronológica, com a aberta no fim (cópias)
+    def bars(self) -> Dict[str, np.ndarray]:
+        n = min(self.closed, self.capacity)
+        first = self.closed - n
+        order = (np.arange(first, self.closed) % self.capacity) if n else np.zeros(0, dtype=np.int64)
+        result = {}
+        for name in BAR_FIELDS:
+            column = self.columns[name][order]
+            if self.start is not None:
+                column = np.append(column, getattr(self, name))
+            result[name] = column
+        return result
+
+# Estatísticas dos negócios de um livro (ver OrderBook.enable_analytics)
+class TradeAnalytics:
+    def __init__(
+        self,
+        trade_bar: int = DEFAULT_TRADE_BAR,
+        time_bar: int = DEFAULT_TIME_BAR,
+        window: int = DEFAULT_WINDOW,
+        capacity: int = DEFAULT_CAPACITY,
+    ):
+        if trade_bar <= 0 or time_bar <= 0 or window <= 1 or capacity <= 0:
+            raise ValueError("barras, janela e capacidade precisam ser positivas (janela > 1)")
+        self.trade_bar = trade_bar
+        self.time_bar = time_bar
+        self.window = window
+        self.by_trades = BarRing(capacity)
+        self.by_time = BarRing(capacity)
+        # Sessão
+        self.trades = 0
+        self.volume = 0
+        self.notional = 0
+        self.first: Optional[int] = None
+        self.high: Optional[int] = None
+        self.low: Optional[int] = None
+        self.last: Optional[int] = None
+        # Janela móvel: preço, qty e log-retorno sobre o negócio anterior de cada
+        # um dos últimos window negócios, com as somas mantidas a cada negócio
+        self._prices = np.zeros(window, dtype=np.int64)
+        self._qtys = np.zeros(window, dtype=np.int64)
+        self._returns = np.zeros(window, dtype=np.float64)
+        # Escrita e leitura por negócio pelas memoryviews dos arrays, que não
+        # criam escalares NumPy
+        self._price_view = memoryview(self._prices)
+        self._qty_view = memoryview(self._qtys)
+        self._return_view = memoryview(self._returns)
+        self._w_volume = 0
+        self._w_notional = 0
+        self._w_ret = 0.0
+        self._w_ret_sq = 0.0
+        self._book = None
+        self._sink = None
+        self._tap = None
+
+    # Passa a receber os negócios do livro: encaixa um tap no sink
+    def attach(self, book):
+        self._book = book
+        self._sink = book.sink
+        book.sink = self._tap = _TradeTap(book.sink, self)
+
+    # Desfaz attach; se outro destino foi encaixado por cima, o tap fica na
+    # cadeia, mas só repassa os eventos
+    def detach(self):
+        book = self._book
+        if book is None:
+            return
+        if book.sink is self._tap:
+            book.sink = self._sink
+        self._book = None
+
+    # Negócio recém-emitido pelo motor, no tempo lógico atual do livro
+    def add_trade(self, price: int, qty: int):
+        n = self.trades
+        self.by_trades.add(n - n % self.trade_bar, price, qty)
+        now = self._book.expiries.now
+        self.by_time.add(now - now % self.time_bar, price, qty)
+
+        self.volume += qty
+        self.notional += price * qty
+        if self.first is None:
+            self.first = self.high = self.low = price
+        elif price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+
+        window = self.window
+        i = n % window
+        prices = self._price_view
+        qtys = self._qty_view
+        returns = self._return_view
+        if n >= window:
+            # Sai o negócio mais antigo da janela
+            old_qty = qtys[i]
+            old_ret = returns[i]
+            self._w_volume -= old_qty
+            self._w_notional -= prices[i] * old_qty
+            self._w_ret -= old_ret
+            self._w_ret_sq -= old_ret * old_ret
+        last = self.last
+        ret = math.log(price / last) if last is not None and last > 0 and price > 0 else 0.0
+        prices[i] = price
+        qtys[i] = qty
+        returns[i] = ret
+        self._w_volume += qty
+        self._w_notional += price * qty
+        self._w_ret += ret
+        self._w_ret_sq += ret * ret
+        self.last = price
+        self.trades = n + 1
+        if i == window - 1:
+            # A cada volta no anel as somas de ponto flutuante são refeitas, para
+            # o erro de arredondamento não se acumular ao longo da sessão
+            self._w_ret = float(self._returns.sum())
+            self._w_ret_sq = float(np.dot(self._returns, self._returns))
+
+    # VWAP da sessão em ticks (None sem negócios)
+    def vwap(self) -> Optional[float]:
+        return self.notional / self.volume if self.volume else None
+
+    # Negócios, volume, VWAP e volatilidade (desvio padrão dos log-retornos
+    # entre negócios seguidos) da janela móvel
+    def rolling(self) -> dict:
+        n = min(self.trades, self.window)
+        volatility = None
+        if n > 1:
+            # O primeiro negócio da sessão não tem retorno
+            m = n - 1 if self.trades <= self.window else n
+            mean = self._w_ret / m
+            volatility = math.sqrt(max(0.0, (self._w_ret_sq - m * mean * mean) / max(1, m - 1)))
+        return {
+            "trades": n,
+            "volume": self._w_volume,
+            "vwap": self._w_notional / self._w_volume if self._w_volume else None,
+            "volatility": volatility,
+        }
+
+    # Resumo da sessão e da janela móvel (preços em ticks)
+    def to_dict(self) -> dict:
+        return {
+            "trades": self.trades,
+            "volume": self.volume,
+            "vwap": self.vwap(),
+            "open": self.first,
+            "high": self.high,
+            "low": self.low,
+            "last": self.last,
+            "window": self.rolling(),
+        }
+
+    # Todas as colunas guardadas: barras por negócios e por tempo (prefixos
+    # "trade_bar_" e "time_bar_") e os negócios da janela móvel ("window_")
+    def columns(self) -> Dict[str, np.ndarray]:
+        result = {}
+        for prefix, ring in (("trade_bar_", self.by_trades), ("time_bar_", self.by_time)):
+            for name, column in ring.bars().items():
+                result[prefix + name] = column
+        n = min(self.trades, self.window)
+        order = np.arange(self.trades - n, self.trades) % self.window
+        result["window_price"] = self._prices[order]
+        result["window_qty"] = self._qtys[order]
+        result["window_return"] = self._returns[order]
+        return result
+
+    # Grava as colunas num arquivo .npz (np.load devolve um array por coluna)
+    def dump(self, target):
+        np.savez(target, **self.columns())
+
+    # Texto para o comando "stats trades"; px converte ticks em preço
+    def report(self, px) -> List[str]:
+        if not self.trades:
+            return ["Nenhum negócio."]
+        rolling = self.rolling()
+        lines = [
+            f"Negócios: {self.trades}, volume {self.volume}, VWAP {self.vwap() * px(1):.4f}, "
+            f"abertura {px(self.first)}, máxima {px(self.high)}, mínima {px(self.low)}, último {px(self.last)}",
+            f"Janela ({rolling['trades']} negócios): volume {rolling['volume']}, "
+            f"VWAP {rolling['vwap'] * px(1):.4f}, volatilidade "
+            + (f"{rolling['volatility']:.6f}" if rolling["volatility"] is not None else "-"),
+        ]
+        for title, ring in (
+            (f"Barras de {self.trade_bar} negócios", self.by_trades),
+            (f"Barras de {self.time_bar} de tempo", self.by_time),
+        ):
+            bars = ring.bars()
+            count = len(bars["start"])
+            lines.append(f"{title} ({ring.closed} fechadas, últimas {min(count, _REPORT_BARS)}):")
+            lines.append(
+                f"{'início':>10}{'abertura':>11}{'máxima':>11}{'mínima':>11}{'fecham.':>11}{'volume':>10}{'negócios':>10}"
+            )
+            for k in range(max(0, count - _REPORT_BARS), count):
+                lines.append(
+                    f"{bars['start'][k]:>10}{px(int(bars['open'][k])):>11}{px(int(bars['high'][k])):>11}"
+                    f"{px(int(bars['low'][k])):>11}{px(int(bars['close'][k])):>11}"
+                    f"{bars['volume'][k]:>10}{bars['trades'][k]:>10}"
+                )
+        return lines
+
+# Sink do livro com análise: repassa os negócios à TradeAnalytics
+class _TradeTap:
+    def __init__(self, inner, analytics: TradeAnalytics):
+        self.inner = inner
+        self.analytics = analytics
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def emit(self, event):
+        if type(event) is Trade and self.analytics._book is not None:
+            self.analytics.add_trade(event.price, event.qty)
+        self.inner.emit(event)
+
+    def write(self, text: str):
+        self.inner.write(text)
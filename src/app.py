@@ -1,111 +1,717 @@
 # src/app.py
-from book import OrderBook
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from urllib.parse import quote
+from typing import Optional
+from book import OrderBook, Side, Peg, TimeInForce, MAX_OWNER, MAX_QTY, MAX_TIME, parse_order_id
+from book import CMD_LIMIT, CMD_MARKET, CMD_PEG, CMD_MODIFY, CMD_MODIFY_QTY, CMD_CANCEL, CMD_STOP, CMD_LIMIT_TIF
+from book import CMD_CANCEL_ALL
+from registry import BookRegistry, split_symbol
+from sinks import TextSink
 
-def process_line(book: OrderBook, line: str):
-    parts = line.strip().split()
-    if not parts:
-        return
+# Linhas de ajuda com os comandos básicos
+HELP_LINES = (
+    "Comandos básicos:",
+    "  limit          <buy/sell> <preço> <qty>      -> ordem limite",
+    "  limit          ... <ioc/fok/gtd <prazo>>     -> com validade",
+    "  market         <buy/sell> <qty>              -> ordem a mercado",
+    "  peg            <bid/offer> <buy/sell> <qty>  -> ordem pegged",
+    "  stop           <buy/sell> <stop> <qty>       -> stop a mercado",
+    "  stoplimit      <buy/sell> <stop> <lim> <qty> -> stop-limit",
+    "  modify order   <id> <qty>                    -> altera qty de peg",
+    "  modify order   <id> <preço> <qty>            -> altera limit",
+    "  cancel order   <id>                          -> cancela ordem",
+    "  cancel all     [participante] [buy/sell]     -> cancela as do participante",
+    "  owner          [nome/none]                   -> participante das ordens",
+    "  risk           [<limite> <valor>/off]        -> limites pré-negociação",
+    "  print book                                   -> mostra o livro",
+    "  print depth    [N]                           -> N melhores níveis agregados",
+    "  batch          <begin/end>                   -> executa as ordens em bloco",
+    "  auction        <start/uncross>               -> leilão de preço único",
+    "  time           [t]                           -> tempo lógico (expira GTD)",
+    "  stats          [on/off/reset/json/profile N] -> métricas de latência",
+    "  stats trades   [on/off/json/dump <arquivo>]  -> barras OHLCV e VWAP",
+    "  @<símbolo> <comando>                         -> comando no livro do ativo",
+    "  exit                                         -> sai do programa",
+)
+
+# Tamanho dos blocos de leitura/escrita no modo replay
+_REPLAY_BUFFER = 1 << 20
+
+# Tokens de lado e referência aceitos no comando peg
+_SIDES = {"buy": Side.BUY, "sell": Side.SELL}
+_PEGS = {"bid": Peg.BID, "offer": Peg.OFFER}
+_TIFS = {"gtc": TimeInForce.GTC, "ioc": TimeInForce.IOC, "fok": TimeInForce.FOK, "gtd": TimeInForce.GTD}
+
+# Converte o preço digitado em ticks do livro; avisa e retorna None se inválido
+def _parse_price(book: OrderBook, text: str) -> Optional[int]:
+    try:
+        return book.ticks.to_ticks(text)
+    except ValueError as e:
+        book.sink.write(f"Preço rejeitado: {e}")
+        return None
+
+# Converte a quantidade digitada; se não for um inteiro, escreve o uso do
+# comando, e se passar de MAX_QTY avisa; nos dois casos retorna None
+def _parse_qty(book: OrderBook, text: str, usage: str) -> Optional[int]:
+    try:
+        qty = int(text)
+    except ValueError:
+        book.sink.write(usage)
+        return None
+    if abs(qty) > MAX_QTY:
+        book.sink.write(f"Quantidade rejeitada: {text} fora do intervalo")
+        return None
+    return qty
 
-    cmd = parts[0].lower()
+# Lado de limit/market: qualquer coisa diferente de buy é tratada como sell
+def _parse_side(text: str) -> Side:
+    return Side.BUY if text == "buy" or text.lower() == "buy" else Side.SELL
 
-    if cmd in ("exit", "quit"):
-        raise SystemExit
+def _cmd_exit(book: OrderBook, parts):
+    raise SystemExit
 
-    if cmd == "print" and len(parts) >= 2 and parts[1] == "book":
+# Níveis exibidos por padrão em "print depth"
+_DEFAULT_DEPTH = 10
+
+def _cmd_print(book: OrderBook, parts):
+    if len(parts) >= 2 and parts[1] == "book":
         book.print_book()
         return
+    if len(parts) >= 2 and parts[1] == "depth":
+        if len(parts) == 2:
+            book.print_depth(_DEFAULT_DEPTH)
+        elif len(parts) == 3 and parts[2].isdigit():
+            book.print_depth(int(parts[2]))
+        else:
+            book.sink.write("Uso: print depth [N]")
+        return
+    _cmd_unknown(book, parts)
 
-    if cmd == "limit":
-        if len(parts) != 4:
-            print("Uso: limit <buy/sell> <price> <qty>")
-            return
-        _, side, price, qty = parts
-        side = side.lower()
-        price = float(price)
-        qty = int(qty)
-        book.handle_limit(side, price, qty)
+_LIMIT_USAGE = "Uso: limit <buy/sell> <price> <qty> [gtc | ioc | fok | gtd <prazo>]"
+
+# Tempo lógico ou prazo GTD digitado (None se não for um inteiro de 0 a MAX_TIME)
+def _parse_time(text: str) -> Optional[int]:
+    if not text.isdigit():
+        return None
+    value = int(text)
+    return value if value <= MAX_TIME else None
+
+# Validade opcional depois da quantidade; o prazo da GTD é no tempo do livro
+def _cmd_limit(book: OrderBook, parts):
+    if len(parts) == 4:
+        tif, expires = TimeInForce.GTC, None
+    elif len(parts) == 5 and _TIFS.get(parts[4].lower(), TimeInForce.GTD) != TimeInForce.GTD:
+        tif, expires = _TIFS[parts[4].lower()], None
+    elif len(parts) == 6 and parts[4].lower() == "gtd" and _parse_time(parts[5]) is not None:
+        tif, expires = TimeInForce.GTD, int(parts[5])
+    else:
+        book.sink.write(_LIMIT_USAGE)
+        return
+    _, side, price, qty = parts[:4]
+    price = _parse_price(book, price)
+    if price is None:
+        return
+    qty = _parse_qty(book, qty, _LIMIT_USAGE)
+    if qty is None:
+        return
+    if tif == TimeInForce.GTC:
+        book.handle_limit(_parse_side(side), price, qty)
+    else:
+        book.handle_limit(_parse_side(side), price, qty, tif, expires)
+
+_MARKET_USAGE = "Uso: market <buy/sell> <qty>"
+
+def _cmd_market(book: OrderBook, parts):
+    if len(parts) != 3:
+        book.sink.write(_MARKET_USAGE)
+        return
+    _, side, qty = parts
+    qty = _parse_qty(book, qty, _MARKET_USAGE)
+    if qty is None:
+        return
+    book.handle_market(_parse_side(side), qty)
+
+_STOP_USAGE = "Uso: stop <buy/sell> <stop> <qty>"
+_STOPLIMIT_USAGE = "Uso: stoplimit <buy/sell> <stop> <price> <qty>"
+
+# Dispara ao negociar a preço >= stop (compra) ou <= stop (venda)
+def _cmd_stop(book: OrderBook, parts):
+    if len(parts) != 4:
+        book.sink.write(_STOP_USAGE)
+        return
+    _, side, stop_price, qty = parts
+    stop_price = _parse_price(book, stop_price)
+    if stop_price is None:
+        return
+    qty = _parse_qty(book, qty, _STOP_USAGE)
+    if qty is None:
+        return
+    book.handle_stop(_parse_side(side), stop_price, qty)
+
+def _cmd_stoplimit(book: OrderBook, parts):
+    if len(parts) != 5:
+        book.sink.write(_STOPLIMIT_USAGE)
+        return
+    _, side, stop_price, limit_price, qty = parts
+    stop_price = _parse_price(book, stop_price)
+    if stop_price is None:
+        return
+    limit_price = _parse_price(book, limit_price)
+    if limit_price is None:
+        return
+    qty = _parse_qty(book, qty, _STOPLIMIT_USAGE)
+    if qty is None:
         return
+    book.handle_stop(_parse_side(side), stop_price, qty, limit_price)
 
-    if cmd == "market":
-        if len(parts) != 3:
-            print("Uso: market <buy/sell> <qty>")
+_CANCEL_USAGE = "Uso: cancel order <id>  OU  cancel all [participante] [buy/sell]"
+
+# cancel all sem participante cancela as do participante atual (comando owner)
+def _cmd_cancel(book: OrderBook, parts):
+    action = parts[1].lower() if len(parts) >= 2 else ""
+    if action == "order" and len(parts) == 3:
+        book.cancel_order(parse_order_id(parts[2]))
+        return
+    if action != "all" or len(parts) > 4:
+        book.sink.write(_CANCEL_USAGE)
+        return
+    args = parts[2:]
+    side = None
+    if args and args[-1].lower() in _SIDES:
+        side = _SIDES[args.pop().lower()]
+    if len(args) > 1 or (args and len(args[0].encode("utf-8")) > MAX_OWNER):
+        book.sink.write(_CANCEL_USAGE)
+        return
+    book.cancel_all(args[0] if args else None, side)
+
+# owner: mostra o participante atual; owner <nome> passa a enviar as ordens em
+# nome dele; owner none volta a enviá-las sem participante
+def _cmd_owner(book: OrderBook, parts):
+    if len(parts) == 1:
+        book.sink.write(f"Participante: {book.owner or 'nenhum'}")
+        return
+    if len(parts) != 2 or parts[1].lower() in _SIDES or len(parts[1].encode("utf-8")) > MAX_OWNER:
+        book.sink.write(f"Uso: owner [nome/none] (nome com até {MAX_OWNER} bytes, diferente de buy/sell)")
+        return
+    book.set_owner(None if parts[1].lower() == "none" else parts[1])
+
+_MODIFY_USAGE = "Uso: modify order <id> <qty>  OU  modify order <id> <price> <qty>"
+
+def _cmd_modify(book: OrderBook, parts):
+    # 1) modify order <id> <qty>            -> PEGGED
+    # 2) modify order <id> <price> <qty>    -> LIMIT normal
+    if len(parts) < 4 or parts[1].lower() != "order":
+        book.sink.write(_MODIFY_USAGE)
+        return
+
+    if len(parts) == 4:
+        _, _, order_id, qty = parts
+        qty = _parse_qty(book, qty, _MODIFY_USAGE)
+        if qty is None:
             return
-        _, side, qty = parts
-        side = side.lower()
-        qty = int(qty)
-        book.handle_market(side, qty)
+        book.modify_order_qty_only(parse_order_id(order_id), qty)
         return
 
-    if cmd == "cancel":
-        if len(parts) != 3 or parts[1].lower() != "order":
-            print("Uso: cancel order <id>")
+    if len(parts) == 5:
+        _, _, order_id, price, qty = parts
+        order_id = parse_order_id(order_id)
+        price = _parse_price(book, price)
+        if price is None:
             return
-        order_id = parts[2]
-        book.cancel_order(order_id)
+        qty = _parse_qty(book, qty, _MODIFY_USAGE)
+        if qty is None:
+            return
+        book.modify_order(order_id, price, qty)
+        return
+
+    book.sink.write(_MODIFY_USAGE)
+
+_PEG_USAGE = "Uso: peg <bid/offer> <buy/sell> <qty>"
+
+def _cmd_peg(book: OrderBook, parts):
+    if len(parts) != 4:
+        book.sink.write(_PEG_USAGE)
         return
+    _, reference, side, qty = parts
+    qty = _parse_qty(book, qty, _PEG_USAGE)
+    if qty is None:
+        return
+    book.handle_peg(_PEGS.get(reference.lower()), _SIDES.get(side.lower()), qty)
+
+# Dentro de "batch begin/end" os tratadores recebem este coletor no lugar do
+# livro: os comandos de ordem vão para book.batch, e qualquer mensagem escrita
+# antes executa o que já foi acumulado, mantendo a ordem da saída
+class _BatchCollector:
+    __slots__ = ("book", "ticks")
+
+    def __init__(self, book: OrderBook):
+        self.book = book
+        self.ticks = book.ticks
+
+    @property
+    def sink(self):
+        return self
+
+    def write(self, text: str):
+        self.book.flush_batch()
+        self.book.sink.write(text)
+
+    def handle_limit(self, side, price, qty, tif=TimeInForce.GTC, expires=None):
+        if tif == TimeInForce.GTC:
+            self.book.batch.append((CMD_LIMIT, side, price, qty))
+        else:
+            self.book.batch.append((CMD_LIMIT_TIF, side, price, qty, tif, expires))
+
+    def handle_market(self, side, qty):
+        self.book.batch.append((CMD_MARKET, side, qty))
+
+    def handle_peg(self, reference, side, qty):
+        self.book.batch.append((CMD_PEG, reference, side, qty))
+
+    def modify_order(self, order_id, price, qty):
+        self.book.batch.append((CMD_MODIFY, order_id, price, qty))
+
+    def modify_order_qty_only(self, order_id, qty):
+        self.book.batch.append((CMD_MODIFY_QTY, order_id, qty))
+
+    def cancel_order(self, order_id):
+        self.book.batch.append((CMD_CANCEL, order_id))
+
+    def cancel_all(self, owner=None, side=None):
+        self.book.batch.append((CMD_CANCEL_ALL, owner, side))
 
-    if cmd == "modify":
-        # 1) modify order <id> <qty>            -> PEGGED
-        # 2) modify order <id> <price> <qty>    -> LIMIT normal
-        if len(parts) < 4 or parts[1].lower() != "order":
-            print("Uso: modify order <id> <qty>  OU  modify order <id> <price> <qty>")
+    def handle_stop(self, side, stop_price, qty, limit_price=None):
+        self.book.batch.append((CMD_STOP, side, stop_price, qty, limit_price))
+
+# batch begin: acumula as ordens seguintes; batch end: executa todas de uma vez
+# (OrderBook.submit_batch), com a mesma saída de executá-las uma a uma.
+# Um batch não fechado no fim da entrada é descartado
+def _cmd_batch(book: OrderBook, parts):
+    action = parts[1].lower() if len(parts) == 2 else ""
+    if action == "begin":
+        if book.batch is not None:
+            book.sink.write("Batch já aberto")
+            return
+        book.begin_batch()
+    elif action == "end":
+        if book.batch is None:
+            book.sink.write("Nenhum batch aberto")
             return
+        book.end_batch()
+    else:
+        book.sink.write("Uso: batch <begin/end>")
 
-        if len(parts) == 4:
-            _, _, order_id, qty = parts
-            qty = int(qty)
-            book.modify_order_qty_only(order_id, qty)
+# auction start: ordens se acumulam sem negociar; auction uncross: executa tudo
+# no preço de equilíbrio e volta à negociação contínua
+def _cmd_auction(book: OrderBook, parts):
+    action = parts[1].lower() if len(parts) == 2 else ""
+    if action == "start":
+        if book.auction is not None:
+            book.sink.write("Leilão já em andamento")
             return
+        book.start_auction()
+    elif action == "uncross":
+        if book.auction is None:
+            book.sink.write("Nenhum leilão em andamento")
+            return
+        book.uncross_auction()
+    else:
+        book.sink.write("Uso: auction <start/uncross>")
+
+# time: mostra o tempo lógico do livro; time <t> avança até t, expirando as GTD
+# com prazo <= t. Com um relógio (--clock wall) o tempo também anda sozinho
+def _cmd_time(book: OrderBook, parts):
+    if len(parts) == 1:
+        book.sink.write(f"Tempo: {book.expiries.now}")
+        return
+    now = _parse_time(parts[1]) if len(parts) == 2 else None
+    if now is None:
+        book.sink.write("Uso: time [t]")
+        return
+    if now < book.expiries.now:
+        book.sink.write(f"Tempo não volta: agora é {book.expiries.now}")
+        return
+    book.advance_time(now)
 
-        if len(parts) == 5:
-            _, _, order_id, price, qty = parts
-            price = float(price)
-            qty = int(qty)
-            book.modify_order(order_id, price, qty)
+# Linhas do perfil exibidas quando a janela não é gravada em arquivo
+_PROFILE_LINES = 25
+
+_STATS_USAGE = "Uso: stats [on/off/reset] | stats json [arquivo] | stats profile <N> [arquivo] | stats trades"
+_TRADES_USAGE = "Uso: stats trades [on [negócios por barra] [tempo por barra] | off | json | dump <arquivo.npz>]"
+
+# stats trades: barras, VWAP e estatísticas móveis dos negócios do livro; on
+# liga (opcionalmente com o tamanho das barras), dump grava as colunas em .npz
+def _cmd_stats_trades(book: OrderBook, parts):
+    action = parts[2].lower() if len(parts) >= 3 else ""
+    write = book.sink.write
+    if action == "on" and len(parts) <= 5 and all(p.isdigit() and int(p) > 0 for p in parts[3:]):
+        sizes = dict(zip(("trade_bar", "time_bar"), (int(p) for p in parts[3:])))
+        if book.analytics is not None and sizes:
+            book.disable_analytics()
+        book.enable_analytics(**sizes)
+        return
+    if action == "off" and len(parts) == 3:
+        book.disable_analytics()
+        return
+    analytics = book.analytics
+    if analytics is None:
+        write("Análise de negócios desligada. Use: stats trades on")
+        return
+    if action == "" and len(parts) == 2:
+        for line in analytics.report(book.ticks.to_price):
+            write(line)
+    elif action == "json" and len(parts) == 3:
+        write(json.dumps(analytics.to_dict()))
+    elif action == "dump" and len(parts) == 4:
+        try:
+            analytics.dump(parts[3])
+        except OSError as exc:
+            write(f"Erro ao gravar {parts[3]}: {exc.strerror or exc}")
             return
+        write(f"Colunas dos negócios gravadas em {parts[3]}")
+    else:
+        write(_TRADES_USAGE)
 
-        print("Uso: modify order <id> <qty>  OU  modify order <id> <price> <qty>")
+# stats: tabela de latências; on/off liga e desliga a instrumentação do livro;
+# json grava (ou mostra) as métricas; profile N perfila as próximas N operações
+def _cmd_stats(book: OrderBook, parts):
+    action = parts[1].lower() if len(parts) >= 2 else ""
+    if action == "trades":
+        _cmd_stats_trades(book, parts)
+        return
+    if action == "on" and len(parts) == 2:
+        book.enable_metrics()
         return
+    if action == "off" and len(parts) == 2:
+        book.disable_metrics()
+        return
+    metrics = book.metrics
+    if metrics is None:
+        book.sink.write("Métricas desligadas. Use: stats on")
+        return
+    write = book.sink.write
+    if action == "":
+        for line in metrics.report():
+            write(line)
+    elif action == "reset" and len(parts) == 2:
+        metrics.reset()
+    elif action == "json" and len(parts) <= 3:
+        if len(parts) == 3:
+            try:
+                metrics.dump_json(parts[2])
+            except OSError as exc:
+                write(f"Erro ao gravar {parts[2]}: {exc.strerror or exc}")
+                return
+            write(f"Métricas gravadas em {parts[2]}")
+        else:
+            write(json.dumps(metrics.to_dict()))
+    elif action == "profile" and len(parts) in (3, 4) and parts[2].isdigit() and int(parts[2]) > 0:
+        window = int(parts[2])
+        path = parts[3] if len(parts) == 4 else None
+
+        def done(stats):
+            if path is not None:
+                try:
+                    stats.dump_stats(path)
+                except OSError as exc:
+                    write(f"Erro ao gravar {path}: {exc.strerror or exc}")
+                    return
+                write(f"Perfil de {window} operações gravado em {path}")
+                return
+            stats.stream = io.StringIO()
+            stats.sort_stats("cumulative").print_stats(_PROFILE_LINES)
+            for line in stats.stream.getvalue().strip("\n").split("\n"):
+                write(line)
+
+        metrics.start_profile(window, done)
+    else:
+        write(_STATS_USAGE)
+
+def _cmd_unknown(book: OrderBook, parts):
+    write = book.sink.write
+    write("\nComando desconhecido.")
+    write("=" * 68)
+    for line in HELP_LINES:
+        write(line)
+    write("=" * 68)
+
+# Limites do comando risk: nome -> (campo de RiskLimits, valor é preço)
+_RISK_LIMITS = {
+    "qty": ("max_order_qty", False),
+    "band": ("price_band", True),
+    "position": ("max_position", False),
+    "notional": ("max_notional", True),
+    "rate": ("rate", False),
+    "burst": ("burst", False),
+}
+
+_RISK_USAGE = "Uso: risk [participante] | risk off | risk <qty/band/position/notional/rate/burst> <valor/none>"
 
-    if cmd == "peg":
-        if len(parts) != 4:
-            print("Uso: peg <bid/offer> <buy/sell> <qty>")
+# risk: mostra os limites e os agregados do participante (o atual por padrão);
+# risk <limite> <valor> liga o estágio de risco do livro e ajusta o limite
+def _cmd_risk(book: OrderBook, parts):
+    write = book.sink.write
+    if len(parts) == 2 and parts[1].lower() == "off":
+        book.disable_risk()
+        return
+    if len(parts) == 3 and parts[1].lower() in _RISK_LIMITS:
+        name, is_price = _RISK_LIMITS[parts[1].lower()]
+        text = parts[2]
+        if text.lower() == "none":
+            value = None
+        elif is_price:
+            value = _parse_price(book, text)
+            if value is None:
+                return
+        elif name == "rate":
+            try:
+                value = float(text)
+            except ValueError:
+                value = -1.0
+        else:
+            value = int(text) if text.isdigit() else -1
+        if (value is not None and value < 0) or (name == "burst" and not value):
+            write(_RISK_USAGE)
             return
-        _, reference, side, qty = parts
-        qty = int(qty)
-        book.handle_peg(reference, side, qty)
+        setattr(book.enable_risk().limits, name, value)
+        return
+    if len(parts) > 2:
+        write(_RISK_USAGE)
         return
+    risk = book.risk
+    if risk is None:
+        write("Risco desligado. Use: risk <limite> <valor>")
+        return
+    px = book.ticks.to_price
+    limits = risk.limits
+    shown = []
+    for token, (name, is_price) in _RISK_LIMITS.items():
+        value = getattr(limits, name)
+        if value is not None:
+            shown.append(f"{token} {px(value) if is_price else value}")
+    write(f"Limites: {', '.join(shown) or 'nenhum'}")
+    owner = parts[1] if len(parts) == 2 else book.owner
+    acc = risk.to_dict(owner)
+    write(
+        f"Participante {owner or 'nenhum'}: compra {acc['open_buy_qty']}, venda {acc['open_sell_qty']}, "
+        f"nocional {px(acc['open_notional'])}, posição {acc['position']}, rejeições {acc['rejected']}"
+    )
 
-    print("\nComando desconhecido.")
-    print("=" * 68)
-    print("Comandos básicos:")
-    print("  limit          <buy/sell> <preço> <qty>      -> ordem limite")
-    print("  market         <buy/sell> <qty>              -> ordem a mercado")
-    print("  peg            <bid/offer> <buy/sell> <qty>  -> ordem pegged")
-    print("  modify order   <id> <qty>                    -> altera qty de peg")
-    print("  modify order   <id> <preço> <qty>            -> altera limit")
-    print("  cancel order   <id>                          -> cancela ordem")
-    print("  print book                                   -> mostra o livro")
-    print("  exit                                         -> sai do programa")
-    print("=" * 68)
+# Tabela de despacho: token do comando (internado) -> tratador
+COMMANDS = {
+    sys.intern(name): handler
+    for name, handler in (
+        ("exit", _cmd_exit),
+        ("quit", _cmd_exit),
+        ("print", _cmd_print),
+        ("limit", _cmd_limit),
+        ("market", _cmd_market),
+        ("cancel", _cmd_cancel),
+        ("modify", _cmd_modify),
+        ("peg", _cmd_peg),
+        ("stop", _cmd_stop),
+        ("stoplimit", _cmd_stoplimit),
+        ("batch", _cmd_batch),
+        ("auction", _cmd_auction),
+        ("stats", _cmd_stats),
+        ("time", _cmd_time),
+        ("owner", _cmd_owner),
+        ("risk", _cmd_risk),
+    )
+}
 
+# Tratadores cujos comandos são acumulados dentro de um batch
+_BATCHED = frozenset((_cmd_limit, _cmd_market, _cmd_cancel, _cmd_modify, _cmd_peg, _cmd_stop, _cmd_stoplimit))
+
+def process_line(book: OrderBook, line: str):
+    parts = line.split()
+    if not parts:
+        return
+    handler = COMMANDS.get(parts[0])
+    if handler is None:
+        handler = COMMANDS.get(parts[0].lower(), _cmd_unknown)
+    # Com relógio, o tempo avança antes do comando; dentro de um batch ele fica
+    # parado até o batch end, para não passar à frente das ordens acumuladas
+    if book.clock is not None and book.batch is None:
+        book.sync_clock()
+    if book.batch is not None:
+        if handler in _BATCHED:
+            handler(_BatchCollector(book), parts)
+            return
+        if handler is not _cmd_batch and handler is not _cmd_exit:
+            # print e afins veem o livro com as ordens anteriores já aplicadas
+            book.flush_batch()
+    metrics = book.metrics
+    if metrics is None or handler is _cmd_stats:
+        handler(book, parts)
+        return
+    # Com métricas: o tempo do tratador fora do livro é o parse da linha
+    busy = metrics.busy_ns
+    t0 = time.perf_counter_ns()
+    try:
+        handler(book, parts)
+    finally:
+        metrics.record_line(time.perf_counter_ns() - t0, busy)
+
+# Linha com prefixo opcional "@SYM": encaminha ao livro do símbolo
+def process_symbol_line(registry: BookRegistry, line: str):
+    symbol, command = split_symbol(line)
+    process_line(registry.get(symbol), command)
+
+# Processa comandos de um arquivo (ou stdin) em blocos, sem prompt nem banner
+def replay(registry: BookRegistry, stream) -> int:
+    count = 0
+    try:
+        while True:
+            lines = stream.readlines(_REPLAY_BUFFER)
+            if not lines:
+                break
+            for line in lines:
+                process_symbol_line(registry, line)
+                count += 1
+    except SystemExit:
+        pass
+    return count
+
+# Livros persistentes: um subdiretório por símbolo ("@" + símbolo escapado)
+def _journal_factory(directory: str, snapshot_every: int):
+    import journal
+
+    def factory(symbol: str, **book_kwargs) -> OrderBook:
+        path = os.path.join(directory, "@" + quote(symbol, safe=""))
+        return journal.open_book(path, snapshot_every=snapshot_every, **book_kwargs)
+
+    return factory
+
+# Livros que publicam topo e negócios em memória compartilhada (--shm): o bloco
+# do símbolo padrão se chama <prefixo>, os demais <prefixo>_<símbolo escapado>
+def _shm_factory(prefix: str, factory):
+    from registry import DEFAULT_SYMBOL
+
+    def create(symbol: str, **book_kwargs) -> OrderBook:
+        book = OrderBook(**book_kwargs) if factory is None else factory(symbol, **book_kwargs)
+        name = prefix if symbol == DEFAULT_SYMBOL else f"{prefix}_{quote(symbol, safe='')}"
+        book.enable_shm_feed(name)
+        return book
+
+    return create
+
+# Relógios aceitos por --clock: "wall" é o tempo do sistema em milissegundos
+_CLOCKS = {"wall": lambda: time.time_ns() // 1_000_000}
+
+# Livros com o tempo lógico guiado por um relógio (--clock)
+def _clock_factory(clock, factory):
+    def create(symbol: str, **book_kwargs) -> OrderBook:
+        book = OrderBook(**book_kwargs) if factory is None else factory(symbol, **book_kwargs)
+        book.clock = clock
+        return book
+
+    return create
+
+# Livros já criados com a análise dos negócios ligada (--analytics)
+def _analytics_factory(factory):
+    def create(symbol: str, **book_kwargs) -> OrderBook:
+        book = OrderBook(**book_kwargs) if factory is None else factory(symbol, **book_kwargs)
+        book.enable_analytics()
+        return book
+
+    return create
+
+# Livros já criados com a instrumentação de latência ligada (--metrics)
+def _metrics_factory(factory):
+    def create(symbol: str, **book_kwargs) -> OrderBook:
+        book = OrderBook(**book_kwargs) if factory is None else factory(symbol, **book_kwargs)
+        book.enable_metrics()
+        return book
+
+    return create
+
+def _run_replay(path: str, tick: Optional[str], workers: int, factory=None):
+    if path == "-":
+        source = open(sys.stdin.fileno(), "r", buffering=_REPLAY_BUFFER, encoding="utf-8", closefd=False)
+    else:
+        source = open(path, "r", buffering=_REPLAY_BUFFER, encoding="utf-8")
+    out = open(sys.stdout.fileno(), "w", buffering=_REPLAY_BUFFER, encoding="utf-8", closefd=False)
+
+    start = time.perf_counter()
+    if workers > 1:
+        from shard import ShardedRunner
+
+        runner = ShardedRunner(workers, out, tick_size=tick)
+        with source:
+            count = runner.run(source)
+        runner.close()
+    else:
+        sink = TextSink(out, buffer_lines=1 << 16)
+        registry = BookRegistry(factory, tick_size=tick, sink=sink)
+        with source:
+            count = replay(registry, source)
+        registry.close()
+        sink.close()
+    out.flush()
+    elapsed = time.perf_counter() - start
+
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"{count} comandos em {elapsed:.3f}s ({rate:,.0f} comandos/s)", file=sys.stderr)
 
 def main():
-    book = OrderBook()
+    parser = argparse.ArgumentParser(description="Order Matching System")
+    parser.add_argument("--tick", default=None, help="tamanho do tick de preço (padrão 0.01)")
+    parser.add_argument("--replay", metavar="FILE", help="processa os comandos do arquivo (ou - para stdin)")
+    parser.add_argument("--workers", type=int, default=1, help="processos do replay; símbolos são distribuídos por hash")
+    parser.add_argument("--journal", metavar="DIR", help="persiste os livros (journal + snapshots) no diretório")
+    parser.add_argument("--snapshot-every", type=int, default=100_000, help="comandos entre snapshots com --journal")
+    parser.add_argument("--metrics", action="store_true", help="liga as métricas de latência em todos os livros")
+    parser.add_argument(
+        "--analytics", action="store_true", help="liga barras OHLCV, VWAP e estatísticas dos negócios em todos os livros"
+    )
+    parser.add_argument("--shm", metavar="NOME", help="publica topo do livro e negócios em memória compartilhada")
+    parser.add_argument(
+        "--clock", choices=("logical", "wall"), default="logical",
+        help="tempo das ordens GTD: só pelo comando time (padrão) ou relógio do sistema em ms",
+    )
+    args = parser.parse_args()
+    if args.journal is not None and args.workers > 1:
+        parser.error("--journal não é suportado com --workers > 1")
+    if args.metrics and args.workers > 1:
+        parser.error("--metrics não é suportado com --workers > 1")
+    if args.analytics and args.workers > 1:
+        parser.error("--analytics não é suportado com --workers > 1")
+    if args.shm is not None and args.workers > 1:
+        parser.error("--shm não é suportado com --workers > 1")
+    if args.clock != "logical" and args.workers > 1:
+        parser.error("--clock não é suportado com --workers > 1")
+
+    factory = None
+    if args.journal is not None:
+        factory = _journal_factory(args.journal, args.snapshot_every)
+    if args.shm is not None:
+        factory = _shm_factory(args.shm, factory)
+    if args.clock != "logical":
+        factory = _clock_factory(_CLOCKS[args.clock], factory)
+    if args.analytics:
+        factory = _analytics_factory(factory)
+    if args.metrics:
+        factory = _metrics_factory(factory)
+
+    if args.replay is not None:
+        _run_replay(args.replay, args.tick, args.workers, factory)
+        return
+
+    sink = TextSink()
+    registry = BookRegistry(factory, tick_size=args.tick, sink=sink)
 
     print("=" * 68)
     print("              Exercício de Programa da Morgan Stanley")
-    print("                  Order Matching System (1 ativo)")
+    print("               Order Matching System (multi-ativo)")
     print("=" * 68)
-    print("Comandos básicos:")
-    print("  limit          <buy/sell> <preço> <qty>      -> ordem limite")
-    print("  market         <buy/sell> <qty>              -> ordem a mercado")
-    print("  peg            <bid/offer> <buy/sell> <qty>  -> ordem pegged")
-    print("  modify order   <id> <qty>                    -> altera qty de peg")
-    print("  modify order   <id> <preço> <qty>            -> altera limit")
-    print("  cancel order   <id>                          -> cancela ordem")
-    print("  print book                                   -> mostra o livro")
-    print("  exit                                         -> sai do programa")
+    for line in HELP_LINES:
+        print(line)
     print("=" * 68)
 
     while True:
@@ -114,9 +720,12 @@ def main():
         except EOFError:
             break
         try:
-            process_line(book, line)
+            process_symbol_line(registry, line)
         except SystemExit:
             break
+        finally:
+            sink.flush()
+    registry.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,172 @@
+# src/auction.py
+# Leilão de abertura/fechamento: entre "auction start" e "auction uncross" as
+# ordens limit se acumulam no livro sem negociar (mesmo cruzadas) e as ordens a
+# mercado ficam numa fila à parte. O uncross executa tudo a um preço único, o
+# que maximiza o volume, com alocação FIFO pela prioridade preço-tempo.
+import sys
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from book import Side
+from retention import FILLED
+from events import Trade, AuctionStarted, MarketQueued, AuctionUncrossed
+
+# Ordens a mercado recebidas durante o leilão: (ts, qty, participante) em ordem
+# de chegada
+@dataclass
+class AuctionState:
+    market_buys: List[Tuple[int, int, Optional[str]]] = field(default_factory=list)
+    market_sells: List[Tuple[int, int, Optional[str]]] = field(default_factory=list)
+
+# Resultado do cálculo do preço de equilíbrio
+@dataclass
+class Clearing:
+    price: int
+    volume: int
+    demand: int
+    supply: int
+
+# Guarda uma ordem a mercado para o uncross (com prioridade sobre as limit)
+def queue_market(book, side: Side, qty: int, ts: int):
+    state = book.auction
+    if side == Side.BUY:
+        state.market_buys.append((ts, qty, book.owner))
+    else:
+        state.market_sells.append((ts, qty, book.owner))
+    book.sink.emit(MarketQueued(side, qty))
+
+# Tira da fila as ordens a mercado do participante (side None = os dois lados);
+# retorna quantas saíram
+def cancel_markets(state: AuctionState, owner: str, side: Optional[Side]) -> int:
+    count = 0
+    for queue_side, queue in ((Side.BUY, state.market_buys), (Side.SELL, state.market_sells)):
+        if side is not None and side != queue_side:
+            continue
+        kept = [entry for entry in queue if entry[2] != owner]
+        count += len(queue) - len(kept)
+        queue[:] = kept
+    return count
+
+# Níveis agregados de um lado como colunas (preços, quantidades) em ordem crescente de preço
+def _level_arrays(book_side, ascending: bool) -> Tuple[np.ndarray, np.ndarray]:
+    levels = book_side.depth(sys.maxsize)
+    if not levels:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    table = np.fromiter(chain.from_iterable(levels), dtype=np.int64, count=3 * len(levels)).reshape(-1, 3)
+    if not ascending:
+        table = table[::-1]
+    return table[:, 0], table[:, 1]
+
+# Preço de equilíbrio: entre os preços dos níveis, o de maior volume executável;
+# empate -> menor desequilíbrio |demanda - oferta|; empate -> mais perto do preço
+# de referência (último negócio, ou o meio da faixa empatada); empate -> o menor.
+# Demanda em p = mercado + compras a preço >= p; oferta = mercado + vendas a <= p
+def clearing_price(book) -> Optional[Clearing]:
+    state = book.auction
+    market_buy = sum(qty for _, qty, _ in state.market_buys)
+    market_sell = sum(qty for _, qty, _ in state.market_sells)
+    buy_prices, buy_qtys = _level_arrays(book.buys, ascending=False)
+    sell_prices, sell_qtys = _level_arrays(book.sells, ascending=True)
+    prices = np.union1d(buy_prices, sell_prices)
+    if prices.size == 0:
+        return None
+
+    # Somas acumuladas com um zero à frente: cum[k] = soma dos k primeiros níveis
+    buy_cum = np.concatenate(([0], np.cumsum(buy_qtys)))
+    sell_cum = np.concatenate(([0], np.cumsum(sell_qtys)))
+    demand = market_buy + buy_cum[-1] - buy_cum[np.searchsorted(buy_prices, prices, side="left")]
+    supply = market_sell + sell_cum[np.searchsorted(sell_prices, prices, side="right")]
+    volume = np.minimum(demand, supply)
+
+    best = volume.max()
+    if best <= 0:
+        return None
+    candidates = np.flatnonzero(volume == best)
+    imbalance = np.abs(demand[candidates] - supply[candidates])
+    candidates = candidates[imbalance == imbalance.min()]
+    if book.last_price is not None:
+        reference = book.last_price
+    else:
+        reference = (int(prices[candidates[0]]) + int(prices[candidates[-1]])) // 2
+    # argmin devolve o primeiro empate, que é o menor preço
+    chosen = candidates[np.argmin(np.abs(prices[candidates] - reference))]
+    return Clearing(int(prices[chosen]), int(best), int(demand[chosen]), int(supply[chosen]))
+
+# Quantidades executadas por ordem de um lado, em prioridade: primeiro as a
+# mercado (por chegada), depois as do livro a partir do topo, até somar volume.
+# Cada execução é (ordem do livro ou None para a mercado, qty, participante)
+def _allocate(book_side, market: List[Tuple[int, int, Optional[str]]], volume: int):
+    fills = []
+    for _, qty, owner in market:
+        if volume <= 0:
+            return fills
+        take = min(qty, volume)
+        fills.append((None, take, owner))
+        volume -= take
+    for order in book_side:
+        if volume <= 0:
+            break
+        take = min(order.qty, volume)
+        fills.append((order, take, order.owner))
+        volume -= take
+    return fills
+
+# Aplica as execuções de um lado no livro: ordens completas saem, a última pode
+# ficar parcial. Como na varredura, a quantidade vai a zero antes do drop_front
+def _settle(book, book_side, side: Side, fills):
+    retire = book._retire
+    risk = book.risk
+    filled = 0
+    for order, take, owner in fills:
+        if risk is not None:
+            risk.fill(owner, side, take)
+        if order is None:
+            continue
+        book_side.set_qty(order, order.qty - take)
+        if order.qty == 0:
+            retire(order, FILLED)
+            filled += 1
+    if filled:
+        book_side.drop_front(filled)
+
+# Executa o leilão no preço de equilíbrio e volta à negociação contínua.
+# Os negócios pareiam as execuções de compra e venda na ordem de prioridade;
+# o que sobrar das ordens a mercado é descartado
+def uncross(book):
+    clearing = clearing_price(book)
+    state = book.auction
+    book.auction = None
+    if clearing is None:
+        book.sink.emit(AuctionUncrossed(None, 0))
+        return
+    price = clearing.price
+    volume = clearing.volume
+    buys = _allocate(book.buys, state.market_buys, volume)
+    sells = _allocate(book.sells, state.market_sells, volume)
+
+    emit = book.sink.emit
+    emit(AuctionUncrossed(price, volume))
+    i = j = 0
+    buy_left = buys[0][1]
+    sell_left = sells[0][1]
+    while i < len(buys) and j < len(sells):
+        qty = min(buy_left, sell_left)
+        emit(Trade(price, qty))
+        buy_left -= qty
+        sell_left -= qty
+        if buy_left == 0:
+            i += 1
+            if i < len(buys):
+                buy_left = buys[i][1]
+        if sell_left == 0:
+            j += 1
+            if j < len(sells):
+                sell_left = sells[j][1]
+
+    _settle(book, book.buys, Side.BUY, buys)
+    _settle(book, book.sells, Side.SELL, sells)
+    book._traded(price, price)
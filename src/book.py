@@ -1,27 +1,266 @@
 # src/book.py
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Dict, Iterable, List, Optional, Tuple
 
-# Representa uma ordem no livro
-@dataclass
+# Lado da ordem
+class Side(IntEnum):
+    BUY = 0
+    SELL = 1
+
+# Tipo da ordem
+class OrderType(IntEnum):
+    LIMIT = 0
+    MARKET = 1
+
+# Referência de uma ordem pegged (NONE para ordens comuns)
+class Peg(IntEnum):
+    NONE = 0
+    BID = 1
+    OFFER = 2
+
+# Validade de uma ordem limit: GTC repousa até ser executada ou cancelada; IOC
+# negocia o que puder e descarta o resto; FOK só negocia se a quantidade inteira
+# for executável na entrada; GTD repousa até o prazo (tempo lógico do livro)
+class TimeInForce(IntEnum):
+    GTC = 0
+    IOC = 1
+    FOK = 2
+    GTD = 3
+
+# Nomes exibidos, indexados pelo valor do enum
+SIDE_NAMES = ("buy", "sell")
+PEG_NAMES = ("none", "bid", "offer")
+TIF_NAMES = ("gtc", "ioc", "fok", "gtd")
+
+# Tipos de comando aceitos por OrderBook.submit_batch: (tipo, argumentos do handler)
+#   (CMD_LIMIT, side, price, qty)      (CMD_MARKET, side, qty)
+#   (CMD_PEG, reference, side, qty)    (CMD_MODIFY, id, price, qty)
+#   (CMD_MODIFY_QTY, id, qty)          (CMD_CANCEL, id)
+#   (CMD_STOP, side, stop_price, qty, limit_price)   limit_price None = stop a mercado
+#   (CMD_LIMIT_TIF, side, price, qty, tif, expires)  expires só para GTD
+#   (CMD_CANCEL_ALL, owner, side)      side None = os dois lados
+CMD_LIMIT = "limit"
+CMD_MARKET = "market"
+CMD_PEG = "peg"
+CMD_MODIFY = "modify"
+CMD_MODIFY_QTY = "modify_qty"
+CMD_CANCEL = "cancel"
+CMD_STOP = "stop"
+CMD_LIMIT_TIF = "limit_tif"
+CMD_CANCEL_ALL = "cancel_all"
+
+# Limite do nome de um participante, em bytes UTF-8 (cabe num registro do journal)
+MAX_OWNER = 32
+
+# Nome de participante válido: uma palavra com até MAX_OWNER bytes (um nome maior
+# seria cortado no journal e, na recuperação, poderia casar com outro participante)
+def _check_owner(owner: Optional[str]):
+    if owner is not None and (owner.split() != [owner] or len(owner.encode("utf-8")) > MAX_OWNER):
+        raise ValueError(f"nome de participante inválido: {owner!r}")
+
+# Tempos lógicos e prazos GTD aceitos: int64 não negativo (cabe no journal e
+# nos níveis da roda de tempo)
+MAX_TIME = (1 << 63) - 1
+
+# Quantidades aceitas, em módulo: cabem num int64 do journal
+MAX_QTY = (1 << 63) - 1
+
+# Prefixo dos identificadores exibidos; internamente o id é um inteiro
+ID_PREFIX = "identificador_"
+
+# Formata o id inteiro no identificador exibido ao usuário
+def format_order_id(order_id: Optional[int]) -> str:
+    return f"{ID_PREFIX}{order_id}"
+
+# Converte o identificador digitado no id inteiro (None se malformado)
+def parse_order_id(text: str) -> Optional[int]:
+    if not text.startswith(ID_PREFIX):
+        return None
+    digits = text[len(ID_PREFIX):]
+    if not (digits.isascii() and digits.isdigit()) or digits[0] == "0":
+        return None
+    return int(digits)
+
+# Representa uma ordem no livro (slots e enums inteiros para caber milhões em memória)
+@dataclass(slots=True)
 class Order:
-    order_type: str
-    side: str
+    order_type: OrderType
+    side: Side
     qty: int
-    price: Optional[float] = None
+    price: Optional[int] = None
     ts: int = 0
-    id: Optional[str] = None
-    pegged: Optional[str] = None
+    id: int = 0
+    pegged: Peg = Peg.NONE
+    # Participante que enviou a ordem (None = sem participante)
+    owner: Optional[str] = None
+    # Handle intrusivo da posição no livro (nível e vizinhos na fila)
+    level: Optional[object] = field(default=None, init=False, repr=False, compare=False)
+    prev: Optional["Order"] = field(default=None, init=False, repr=False, compare=False)
+    next: Optional["Order"] = field(default=None, init=False, repr=False, compare=False)
 
 # Armazena o estado e operações do livro de ordens
 class OrderBook:
     # Inicializa o livro de ordens
-    def __init__(self):
-        self.buys: List[Order] = []
-        self.sells: List[Order] = []
+    # backend: "ladder" (níveis de preço indexados) ou "list" (listas planas originais)
+    # debug: confere o topo do livro em cache contra um recálculo completo a cada evento
+    # sink: destino dos eventos do motor (padrão: texto no stdout)
+    # tick_size: grade de preços; internamente os preços são inteiros de ticks
+    # retain: quantas ordens encerradas lembrar para responder "already filled"
+    # journal: registro dos comandos para recuperação (ver journal.open_book)
+    # clock: função que retorna o tempo atual (inteiro) lida por sync_clock; sem
+    # ela o tempo do livro só anda por advance_time (comando "time")
+    def __init__(
+        self,
+        backend: str = "ladder",
+        debug: bool = False,
+        sink=None,
+        tick_size=None,
+        retain: Optional[int] = None,
+        journal=None,
+        clock=None,
+    ):
+        import flat, ladder, retention, sinks, stops, ticks, timers
+
+        if backend == "ladder":
+            side_cls = ladder.LadderSide
+        elif backend == "list":
+            side_cls = flat.FlatSide
+        else:
+            raise ValueError(f"backend desconhecido: {backend}")
+        self.backend = backend
+        self.debug = debug
+        self.ticks = ticks.TickSize(tick_size if tick_size is not None else ticks.DEFAULT_TICK)
+        self.sink = sink if sink is not None else sinks.TextSink()
+        self.sink.bind(self.ticks)
+        self.buys = side_cls(is_buy=True)
+        self.sells = side_cls(is_buy=False)
         self._ts_counter = 0
         self._id_counter = 0
-        self.orders_by_id: Dict[str, Order] = {}
+        self.orders_by_id: Dict[int, Order] = {}
+        # Participante atual: as ordens e stops novas ficam em seu nome (ver set_owner)
+        self.owner: Optional[str] = None
+        # Ids das ordens vivas e stops em repouso de cada participante, por lado
+        self.owned: Dict[str, Tuple[Dict[int, None], Dict[int, None]]] = {}
+        # Ordens stop à espera do disparo e preço do último negócio
+        self.stops = stops.StopBook()
+        self.last_price: Optional[int] = None
+        # Tempo lógico do livro e prazos das ordens GTD
+        self.clock = clock
+        self.expiries = timers.TimingWheel()
+        # Estado do leilão em andamento (None em negociação contínua)
+        self.auction = None
+        self.terminated = retention.TerminatedOrders(
+            retain if retain is not None else retention.DEFAULT_RETAIN
+        )
+        self.journal = None
+        if journal is not None:
+            self.attach_journal(journal)
+        self.depth_feed = None
+        # Topo do livro e negócios em memória compartilhada (ver enable_shm_feed)
+        self.shm_feed = None
+        # Instrumentação de latência (ver enable_metrics); None = desligada
+        self.metrics = None
+        # Estágio de risco pré-negociação (ver enable_risk); None = desligado
+        self.risk = None
+        # Barras, VWAP e estatísticas dos negócios (ver enable_analytics)
+        self.analytics = None
+        # Comandos acumulados entre begin_batch e end_batch (None fora de um batch)
+        self.batch: Optional[List[tuple]] = None
+
+    # Passa a registrar no journal cada comando antes de aplicá-lo
+    def attach_journal(self, journal):
+        self.journal = journal
+        journal.bind(self)
+
+    # Passa a publicar as mudanças de nível (L2) a cada evento; ver depth_changes
+    def enable_depth_feed(self, capacity: Optional[int] = None):
+        import depth
+
+        self.depth_feed = depth.DepthFeed(capacity if capacity is not None else depth.DEFAULT_FEED_CAPACITY)
+        self.depth_feed.attach(self)
+
+    # Publica topo do livro e negócios num bloco de memória compartilhada para
+    # leitores em outros processos (ver shmfeed); name None gera um nome
+    def enable_shm_feed(self, name: Optional[str] = None, capacity: Optional[int] = None):
+        import shmfeed
+
+        if self.shm_feed is not None:
+            raise ValueError("feed em memória compartilhada já habilitado")
+        self.shm_feed = shmfeed.ShmFeed(
+            name, capacity if capacity is not None else shmfeed.DEFAULT_CAPACITY, str(self.ticks)
+        )
+        self.shm_feed.attach(self)
+        return self.shm_feed
+
+    # Passa a medir latência por operação e por fase (ver metrics.Metrics); sem
+    # isso o livro não executa nenhum código de medição
+    def enable_metrics(self):
+        import metrics
+
+        if self.metrics is None:
+            self.metrics = metrics.Metrics()
+            self.metrics.attach(self)
+        return self.metrics
+
+    # Remove a instrumentação, descartando as métricas coletadas
+    def disable_metrics(self):
+        if self.metrics is not None:
+            self.metrics.detach()
+            self.metrics = None
+
+    # Passa a calcular barras OHLCV, VWAP e estatísticas móveis a cada negócio
+    # (ver analytics.TradeAnalytics; kwargs vão para o construtor)
+    def enable_analytics(self, **kwargs):
+        import analytics
+
+        if self.analytics is None:
+            self.analytics = analytics.TradeAnalytics(**kwargs)
+            self.analytics.attach(self)
+        return self.analytics
+
+    # Para a análise dos negócios, descartando o que foi calculado
+    def disable_analytics(self):
+        if self.analytics is not None:
+            self.analytics.detach()
+            self.analytics = None
+
+    # Passa as ordens novas e os modifies pelos limites de risco por participante
+    # (ver risk.Risk); com o risco já ligado, só troca os limites
+    def enable_risk(self, limits=None, clock=None):
+        import risk
+
+        if self.risk is None:
+            self.risk = risk.Risk(limits) if clock is None else risk.Risk(limits, clock)
+            self.risk.attach(self)
+        elif limits is not None:
+            self.risk.limits = limits
+        return self.risk
+
+    # Remove o estágio de risco, descartando os agregados
+    def disable_risk(self):
+        if self.risk is not None:
+            self.risk.detach()
+            self.risk = None
+
+    # Mudanças de nível com seq maior que since (None se já descartadas do histórico)
+    def depth_changes(self, since: int):
+        if self.depth_feed is None:
+            raise ValueError("feed de profundidade não habilitado")
+        return self.depth_feed.changes_since(since)
+
+    # Os n melhores níveis de cada lado: ([(preço, qty, nº de ordens)], [...])
+    def depth(self, n: int = 10) -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, int, int]]]:
+        return self.buys.depth(n), self.sells.depth(n)
+
+    # Fecha um evento: publica a profundidade alterada e, em debug, confere invariantes
+    def _end_event(self):
+        if self.depth_feed is not None:
+            self.depth_feed.publish(self)
+        if self.shm_feed is not None:
+            self.shm_feed.publish(self)
+        if self.debug:
+            self.check_invariants()
 
     # Gera o próximo timestamp lógico global
     def _next_ts(self) -> int:
@@ -29,35 +268,132 @@ class OrderBook:
         return self._ts_counter
 
     # Gera o próximo identificador de ordem
-    def _next_id(self) -> str:
+    def _next_id(self) -> int:
         self._id_counter += 1
-        return f"identificador_{self._id_counter}"
+        return self._id_counter
+
+    # Tira a ordem do índice vivo e guarda só seu estado final
+    def _retire(self, order: Order, status: int):
+        self.orders_by_id.pop(order.id, None)
+        self.terminated.add(order.id, status)
+        if order.owner is not None:
+            self._disown(order.owner, order.side, order.id)
+        if self.expiries.deadlines:
+            self.expiries.discard(order.id)
+
+    # Põe uma ordem ou stop nova no índice do participante
+    def _own(self, owner: str, side: Side, order_id: int):
+        sides = self.owned.get(owner)
+        if sides is None:
+            sides = self.owned[owner] = ({}, {})
+        sides[side][order_id] = None
+
+    # Tira uma ordem ou stop do índice do participante
+    def _disown(self, owner: str, side: Side, order_id: int):
+        sides = self.owned.get(owner)
+        if sides is not None:
+            sides[side].pop(order_id, None)
+            if not sides[0] and not sides[1]:
+                del self.owned[owner]
+
+    # Motivo de rejeição para um id que não está no índice vivo
+    def _missing_reason(self, order_id: Optional[int]) -> str:
+        from events import REJECT_IS_STOP, REJECT_NOT_ACTIVE, REJECT_NOT_FOUND
+
+        if order_id in self.stops:
+            return REJECT_IS_STOP
+        return REJECT_NOT_ACTIVE if order_id in self.terminated else REJECT_NOT_FOUND
+
+    # Chamado pelos matchers com o primeiro e o último preço negociados por uma
+    # agressão: as stops cruzadas nessa faixa ficam prontas para execução
+    def _traded(self, first_price: int, last_price: int):
+        self.last_price = last_price
+        if self.stops.orders:
+            if first_price <= last_price:
+                self.stops.trigger(first_price, last_price)
+            else:
+                self.stops.trigger(last_price, first_price)
+
+    # Executa as stops disparadas em ordem de entrada; os negócios de cada uma
+    # podem disparar outras (cascata), que entram na mesma fila
+    def _run_stops(self):
+        import pegged, stops
+
+        book_stops = self.stops
+        while book_stops.ready:
+            stops.execute_stop(self, book_stops.pop_ready())
+            pegged.update_pegged_to_bid(self)
+            pegged.update_pegged_to_offer(self)
+
+    # Medidores de ordens vivas e retidas
+    def gauges(self) -> Dict[str, int]:
+        return {
+            "live_orders": len(self.orders_by_id),
+            "stop_orders": len(self.stops),
+            "gtd_orders": len(self.expiries),
+            "retained_orders": len(self.terminated),
+            "retained_capacity": self.terminated.capacity,
+        }
 
     # Retorna o melhor preço de compra não pegged
-    def best_bid(self) -> Optional[float]:
-        best = None
-        for o in self.buys:
-            if o.pegged == "bid" or o.price is None:
-                continue
-            if best is None or o.price > best:
-                best = o.price
-        return best
+    def best_bid(self) -> Optional[int]:
+        return self.buys.best_price(Peg.BID)
 
     # Retorna o melhor preço de venda não pegged
-    def best_offer(self) -> Optional[float]:
-        best = None
-        for o in self.sells:
-            if o.pegged == "offer" or o.price is None:
-                continue
-            if best is None or o.price < best:
-                best = o.price
-        return best
+    def best_offer(self) -> Optional[int]:
+        return self.sells.best_price(Peg.OFFER)
+
+    # Confere o melhor bid/offer em cache contra uma varredura completa do livro
+    def check_invariants(self):
+        for side, peg, better in ((self.buys, Peg.BID, max), (self.sells, Peg.OFFER, min)):
+            prices = [o.price for o in side if o.pegged != peg and o.price is not None]
+            expected = better(prices) if prices else None
+            cached = side.best_price(peg)
+            if cached != expected:
+                raise AssertionError(f"best {PEG_NAMES[peg]} em cache {cached} difere do recalculado {expected}")
+            levels = []
+            for o in side:
+                if levels and levels[-1][0] == o.price:
+                    price, qty, count = levels[-1]
+                    levels[-1] = (price, qty + o.qty, count + 1)
+                else:
+                    levels.append((o.price, o.qty, 1))
+            aggregated = side.depth(len(levels))
+            if aggregated != levels:
+                raise AssertionError(f"níveis agregados {aggregated[:5]} diferem dos recalculados {levels[:5]}")
+        self.stops.check(self.last_price)
+        self.expiries.check(self.orders_by_id)
+        owned = 0
+        for owner, sides in self.owned.items():
+            for side, ids in zip(Side, sides):
+                for order_id in ids:
+                    order = self.orders_by_id.get(order_id) or self.stops.orders.get(order_id)
+                    if order is None or order.owner != owner or order.side != side:
+                        raise AssertionError(f"ordem {order_id} no índice de {owner} difere da ordem")
+                owned += len(ids)
+        expected = sum(1 for o in self.orders_by_id.values() if o.owner is not None)
+        expected += sum(1 for s in self.stops.orders.values() if s.owner is not None)
+        if owned != expected:
+            raise AssertionError(f"{expected} ordens com participante, {owned} no índice")
+        if self.risk is not None:
+            self.risk.check(self)
 
     # Imprime o livro de ordens em formato tabular
     def print_book(self):
-        buy_rows = [f"{o.qty} @ {o.price}" for o in self.buys]
-        sell_rows = [f"{o.qty} @ {o.price}" for o in self.sells]
+        px = self.ticks.to_price
+        buy_rows = [f"{o.qty} @ {px(o.price)}" for o in self.buys]
+        sell_rows = [f"{o.qty} @ {px(o.price)}" for o in self.sells]
+        self._write_table(buy_rows, sell_rows)
+
+    # Imprime os n melhores níveis agregados de cada lado: qty @ preço (nº de ordens)
+    def print_depth(self, n: int = 10):
+        px = self.ticks.to_price
+        bids, asks = self.depth(n)
+        buy_rows = [f"{qty} @ {px(price)} ({count})" for price, qty, count in bids]
+        sell_rows = [f"{qty} @ {px(price)} ({count})" for price, qty, count in asks]
+        self._write_table(buy_rows, sell_rows)
 
+    def _write_table(self, buy_rows: List[str], sell_rows: List[str]):
         rows = max(len(buy_rows), len(sell_rows), 1)
         buy_rows += [""] * (rows - len(buy_rows))
         sell_rows += [""] * (rows - len(sell_rows))
@@ -78,74 +414,319 @@ class OrderBook:
 
         sep = "+" + "-" * col1_width + "+" + "-" * col2_width + "+"
 
-        print(sep)
-        print(
+        write = self.sink.write
+        write(sep)
+        write(
             "| "
             + buy_header.ljust(col1_width - 2)
             + " | "
             + sell_header.ljust(col2_width - 2)
             + " | "
         )
-        print(sep)
+        write(sep)
         for b, s in zip(buy_rows, sell_rows):
-            print(
+            write(
                 "| "
                 + b.ljust(col1_width - 2)
                 + " | "
                 + s.ljust(col2_width - 2)
                 + " | "
             )
-        print(sep)
+        write(sep)
 
-    # Processa a entrada de uma ordem limit
-    def handle_limit(self, side: str, price: float, qty: int):
+    # Processa a entrada de uma ordem limit; expires é o prazo de uma GTD
+    def handle_limit(
+        self, side: Side, price: int, qty: int, tif: TimeInForce = TimeInForce.GTC, expires: Optional[int] = None
+    ):
         import limit, pegged
 
+        if self.journal is not None:
+            if tif == TimeInForce.GTC:
+                self.journal.log_limit(side, price, qty)
+            else:
+                self.journal.log_limit_tif(side, price, qty, tif, expires)
         ts = self._next_ts()
-        if side == "buy":
+        if tif != TimeInForce.GTC:
+            limit.match_limit_tif(self, side, price, qty, tif, expires, ts)
+        elif side == Side.BUY:
             limit.match_limit_buy(self, price, qty, ts)
         else:
             limit.match_limit_sell(self, price, qty, ts)
         pegged.update_pegged_to_bid(self)
         pegged.update_pegged_to_offer(self)
+        if self.stops.ready:
+            self._run_stops()
+        self._end_event()
+
+    # Troca o participante atual (as ordens já enviadas continuam com o seu)
+    def set_owner(self, owner: Optional[str]):
+        if owner == self.owner:
+            return
+        _check_owner(owner)
+        if self.journal is not None:
+            self.journal.log_owner(owner)
+        self.owner = owner
+
+    # Cancela de uma vez as ordens e stops do participante (owner None = o atual),
+    # de um lado ou dos dois, sem percorrer o resto do livro; as pegged são
+    # reprecificadas uma só vez no fim
+    def cancel_all(self, owner: Optional[str] = None, side: Optional[Side] = None) -> int:
+        import limit, pegged
+
+        if owner is None:
+            owner = self.owner
+        _check_owner(owner)
+        if self.journal is not None:
+            self.journal.log_cancel_all(owner, side)
+        count = limit.cancel_all(self, owner, side)
+        pegged.update_pegged_to_bid(self)
+        pegged.update_pegged_to_offer(self)
+        self._end_event()
+        return count
 
     # Cancela uma ordem existente por identificador
-    def cancel_order(self, order_id: str):
+    def cancel_order(self, order_id: Optional[int]):
         import limit, pegged
 
+        if self.journal is not None:
+            self.journal.log_cancel(order_id)
         limit.cancel_order(self, order_id)
         pegged.update_pegged_to_bid(self)
         pegged.update_pegged_to_offer(self)
+        self._end_event()
 
     # Modifica apenas a quantidade de uma ordem pegged
-    def modify_order_qty_only(self, order_id: str, new_qty: int):
+    def modify_order_qty_only(self, order_id: Optional[int], new_qty: int):
         import pegged
-        
+
+        if self.journal is not None:
+            self.journal.log_modify_qty(order_id, new_qty)
         pegged.modify_pegged_qty(self, order_id, new_qty)
+        self._end_event()
 
     # Modifica preço e quantidade de uma ordem limit existente
-    def modify_order(self, order_id: str, new_price: float, new_qty: int):
+    def modify_order(self, order_id: Optional[int], new_price: int, new_qty: int):
         import limit, pegged
 
+        if self.journal is not None:
+            self.journal.log_modify(order_id, new_price, new_qty)
         limit.modify_order(self, order_id, new_price, new_qty)
         pegged.update_pegged_to_bid(self)
         pegged.update_pegged_to_offer(self)
+        if self.stops.ready:
+            self._run_stops()
+        self._end_event()
 
     # Processa a entrada de uma ordem market
-    def handle_market(self, side: str, qty: int):
+    def handle_market(self, side: Side, qty: int):
         import market, pegged
 
+        if self.journal is not None:
+            self.journal.log_market(side, qty)
         ts = self._next_ts()
-        if side == "buy":
+        if side == Side.BUY:
             market.match_market_buy(self, qty, ts)
         else:
             market.match_market_sell(self, qty, ts)
         pegged.update_pegged_to_bid(self)
         pegged.update_pegged_to_offer(self)
+        if self.stops.ready:
+            self._run_stops()
+        self._end_event()
+
+    # Processa a entrada de uma ordem stop (limit_price None) ou stop-limit
+    def handle_stop(self, side: Side, stop_price: int, qty: int, limit_price: Optional[int] = None):
+        import stops
+
+        if self.journal is not None:
+            self.journal.log_stop(side, stop_price, qty, limit_price)
+        stops.handle_stop(self, side, stop_price, qty, limit_price, self._next_ts())
+        if self.stops.ready:
+            self._run_stops()
+        self._end_event()
+
+    # Avança o tempo lógico do livro até now, cancelando as GTD vencidas; um tempo
+    # que não avança não muda nada (nem vai ao journal)
+    def advance_time(self, now: int):
+        import limit, pegged
+
+        if now <= self.expiries.now:
+            return
+        if self.journal is not None:
+            self.journal.log_time(now)
+        expired = self.expiries.advance(now)
+        if expired:
+            limit.expire_orders(self, expired)
+            pegged.update_pegged_to_bid(self)
+            pegged.update_pegged_to_offer(self)
+        self._end_event()
+
+    # Lê o relógio injetado e avança o tempo do livro até ele
+    def sync_clock(self):
+        now = self.clock()
+        if now > self.expiries.now:
+            self.advance_time(now)
+
+    # Abre a fase de leilão: ordens se acumulam sem negociar até o uncross
+    def start_auction(self):
+        import auction
+
+        if self.auction is not None:
+            raise ValueError("leilão já em andamento")
+        if self.journal is not None:
+            self.journal.log_auction_start()
+        self.auction = auction.AuctionState()
+        self.sink.emit(auction.AuctionStarted())
+        self._end_event()
+
+    # Executa o leilão no preço de equilíbrio e volta à negociação contínua
+    def uncross_auction(self):
+        import auction, pegged
+
+        if self.auction is None:
+            raise ValueError("nenhum leilão em andamento")
+        if self.journal is not None:
+            self.journal.log_auction_uncross()
+        auction.uncross(self)
+        pegged.update_pegged_to_bid(self)
+        pegged.update_pegged_to_offer(self)
+        if self.stops.ready:
+            self._run_stops()
+        self._end_event()
 
     # Processa a entrada de uma ordem pegged
-    def handle_peg(self, reference: str, side: str, qty: int):
+    def handle_peg(self, reference: Optional[Peg], side: Optional[Side], qty: int):
         import pegged
 
+        if self.journal is not None:
+            self.journal.log_peg(reference, side, qty)
         ts = self._next_ts()
-        pegged.handle_peg(self, reference, side, qty, ts)
\ No newline at end of file
+        pegged.handle_peg(self, reference, side, qty, ts)
+        self._end_event()
+
+    # Processa uma sequência de comandos (CMD_*) com o mesmo resultado de chamar os
+    # handlers um a um. As pegged só são atualizadas quando o melhor bid/offer mudou
+    # desde a última atualização; nos demais comandos ela não mudaria nada
+    def submit_batch(self, commands: Iterable[tuple]) -> int:
+        import limit, market, pegged, stops
+
+        journal = self.journal
+        best_bid = self.best_bid
+        best_offer = self.best_offer
+        end_event = self._end_event if self.depth_feed is not None or self.shm_feed is not None or self.debug else None
+        # Ao fim de cada evento as pegged estão no melhor preço atual
+        bid_ref = best_bid()
+        offer_ref = best_offer()
+        count = 0
+        for cmd in commands:
+            count += 1
+            kind = cmd[0]
+            if kind == CMD_LIMIT:
+                _, side, price, qty = cmd
+                if journal is not None:
+                    journal.log_limit(side, price, qty)
+                ts = self._next_ts()
+                if side == Side.BUY:
+                    limit.match_limit_buy(self, price, qty, ts)
+                else:
+                    limit.match_limit_sell(self, price, qty, ts)
+            elif kind == CMD_LIMIT_TIF:
+                _, side, price, qty, tif, expires = cmd
+                if journal is not None:
+                    journal.log_limit_tif(side, price, qty, tif, expires)
+                limit.match_limit_tif(self, side, price, qty, tif, expires, self._next_ts())
+            elif kind == CMD_CANCEL_ALL:
+                _, owner, side = cmd
+                if owner is None:
+                    owner = self.owner
+                _check_owner(owner)
+                if journal is not None:
+                    journal.log_cancel_all(owner, side)
+                limit.cancel_all(self, owner, side)
+            elif kind == CMD_CANCEL:
+                if journal is not None:
+                    journal.log_cancel(cmd[1])
+                limit.cancel_order(self, cmd[1])
+            elif kind == CMD_MODIFY:
+                _, order_id, price, qty = cmd
+                if journal is not None:
+                    journal.log_modify(order_id, price, qty)
+                limit.modify_order(self, order_id, price, qty)
+            elif kind == CMD_MARKET:
+                _, side, qty = cmd
+                if journal is not None:
+                    journal.log_market(side, qty)
+                ts = self._next_ts()
+                if side == Side.BUY:
+                    market.match_market_buy(self, qty, ts)
+                else:
+                    market.match_market_sell(self, qty, ts)
+            elif kind == CMD_PEG:
+                # Entra no melhor preço atual, sem mudar a referência
+                _, reference, side, qty = cmd
+                if journal is not None:
+                    journal.log_peg(reference, side, qty)
+                pegged.handle_peg(self, reference, side, qty, self._next_ts())
+                if end_event is not None:
+                    end_event()
+                continue
+            elif kind == CMD_STOP:
+                _, side, stop_price, qty, limit_price = cmd
+                if journal is not None:
+                    journal.log_stop(side, stop_price, qty, limit_price)
+                stops.handle_stop(self, side, stop_price, qty, limit_price, self._next_ts())
+                if self.stops.ready:
+                    self._run_stops()
+                    bid_ref = best_bid()
+                    offer_ref = best_offer()
+                if end_event is not None:
+                    end_event()
+                continue
+            elif kind == CMD_MODIFY_QTY:
+                _, order_id, qty = cmd
+                if journal is not None:
+                    journal.log_modify_qty(order_id, qty)
+                pegged.modify_pegged_qty(self, order_id, qty)
+                if end_event is not None:
+                    end_event()
+                continue
+            else:
+                raise ValueError(f"comando desconhecido: {kind!r}")
+            best = best_bid()
+            if best != bid_ref:
+                pegged.update_pegged_to_bid(self)
+                bid_ref = best
+            best = best_offer()
+            if best != offer_ref:
+                pegged.update_pegged_to_offer(self)
+                offer_ref = best
+            if self.stops.ready:
+                # Cada stop executada atualiza as pegged como um comando avulso
+                self._run_stops()
+                bid_ref = best_bid()
+                offer_ref = best_offer()
+            if end_event is not None:
+                end_event()
+        return count
+
+    # Abre um batch: os comandos passam a ser acumulados em self.batch
+    def begin_batch(self):
+        if self.batch is not None:
+            raise ValueError("batch já aberto")
+        self.batch = []
+
+    # Executa os comandos acumulados, mantendo o batch aberto
+    def flush_batch(self) -> int:
+        if not self.batch:
+            return 0
+        commands = self.batch
+        self.batch = []
+        return self.submit_batch(commands)
+
+    # Fecha o batch, executando os comandos acumulados
+    def end_batch(self) -> int:
+        if self.batch is None:
+            raise ValueError("nenhum batch aberto")
+        count = self.flush_batch()
+        self.batch = None
+        return count
@@ -0,0 +1,61 @@
+# src/depth.py
+from collections import deque
+from typing import List, Optional, Tuple
+
+from book import Side
+
+# Capacidade padrão do histórico de mudanças de nível
+DEFAULT_FEED_CAPACITY = 1 << 16
+
+# Mudança de um nível: (seq, lado, preço, qty total, nº de ordens); qty 0 = nível removido
+LevelChange = Tuple[int, Side, int, int, int]
+
+# Feed incremental de profundidade (L2): ao fim de cada evento do motor, os níveis
+# tocados pelos lados (marcados em side.dirty) são publicados com um novo seq
+class DepthFeed:
+    def __init__(self, capacity: int = DEFAULT_FEED_CAPACITY):
+        if capacity <= 0:
+            raise ValueError(f"capacidade inválida: {capacity}")
+        self.capacity = capacity
+        self.seq = 0
+        self._log: "deque[LevelChange]" = deque()
+        # Maior seq com alguma mudança já descartada do histórico
+        self._evicted = 0
+
+    # Passa a acompanhar os lados do livro
+    def attach(self, book):
+        book.buys.dirty = set()
+        book.sells.dirty = set()
+
+    # Publica o estado atual dos níveis alterados no último evento
+    def publish(self, book):
+        changes = []
+        for side, book_side in ((Side.BUY, book.buys), (Side.SELL, book.sells)):
+            dirty = book_side.dirty
+            if dirty:
+                level_at = book_side.level_at
+                for price in sorted(dirty):
+                    qty, count = level_at(price)
+                    changes.append((side, price, qty, count))
+                dirty.clear()
+        if not changes:
+            return
+        self.seq += 1
+        log = self._log
+        for change in changes:
+            if len(log) >= self.capacity:
+                self._evicted = log.popleft()[0]
+            log.append((self.seq,) + change)
+
+    # Mudanças com seq maior que since, em ordem; None se parte delas já saiu do
+    # histórico (o consumidor deve refazer o estado a partir de depth())
+    def changes_since(self, since: int) -> Optional[List[LevelChange]]:
+        if since < self._evicted:
+            return None
+        out = []
+        for change in reversed(self._log):
+            if change[0] <= since:
+                break
+            out.append(change)
+        out.reverse()
+        return out
@@ -0,0 +1,125 @@
+# src/events.py
+from dataclasses import dataclass
+from typing import Optional
+from book import Side, Peg, TimeInForce
+
+# Motivos de cancelamento
+CANCEL_REQUEST = "cancel"
+CANCEL_QTY_CHANGE = "qty_change"
+CANCEL_NO_REFERENCE = "no_reference"
+CANCEL_EXPIRED = "expired"
+CANCEL_MASS = "mass"
+
+# Motivos de rejeição de um comando
+REJECT_NOT_FOUND = "not_found"
+REJECT_NOT_ACTIVE = "not_active"
+REJECT_IS_PEGGED = "is_pegged"
+REJECT_NOT_PEGGED = "not_pegged"
+REJECT_INVALID_PEG = "invalid_peg"
+REJECT_NO_BID = "no_bid"
+REJECT_NO_OFFER = "no_offer"
+REJECT_IS_STOP = "is_stop"
+REJECT_EXPIRED = "expired"
+REJECT_NO_OWNER = "no_owner"
+# Rejeições do estágio de risco (ver risk)
+REJECT_RISK_QTY = "risk_qty"
+REJECT_RISK_BAND = "risk_band"
+REJECT_RISK_POSITION = "risk_position"
+REJECT_RISK_NOTIONAL = "risk_notional"
+REJECT_RISK_RATE = "risk_rate"
+
+# Negócio fechado entre a ordem agressora e uma ordem do livro
+@dataclass(slots=True)
+class Trade:
+    price: int
+    qty: int
+
+# Ordem aceita e colocada no livro
+@dataclass(slots=True)
+class OrderAccepted:
+    side: Side
+    qty: int
+    price: int
+    order_id: int
+
+# Ordem alterada (preço e/ou quantidade)
+@dataclass(slots=True)
+class OrderModified:
+    side: Side
+    qty: int
+    price: int
+    order_id: int
+
+# Ordem modificada que foi executada por completo ao ser reprocessada
+@dataclass(slots=True)
+class OrderFilled:
+    side: Side
+    price: int
+    order_id: int
+
+# Ordem limit retirada do livro
+@dataclass(slots=True)
+class OrderCancelled:
+    order_id: int
+    reason: str = CANCEL_REQUEST
+
+# Resto de uma IOC, ou FOK inteira, descartado sem entrar no livro
+@dataclass(slots=True)
+class OrderKilled:
+    side: Side
+    qty: int
+    price: int
+    tif: TimeInForce
+
+# Fim de um cancelamento em massa: ordens e stops do participante retiradas
+# (side None = dos dois lados)
+@dataclass(slots=True)
+class MassCancelled:
+    owner: str
+    side: Optional[Side]
+    count: int
+
+# Ordem pegged retirada do livro
+@dataclass(slots=True)
+class PeggedCancelled:
+    order_id: int
+    reason: str
+    reference: Optional[Peg] = None
+
+# Comando recusado pelo motor
+@dataclass(slots=True)
+class OrderRejected:
+    reason: str
+    order_id: Optional[int] = None
+
+# Ordem stop aceita, à espera do disparo (limit_price None = stop a mercado)
+@dataclass(slots=True)
+class StopAccepted:
+    side: Side
+    qty: int
+    stop_price: int
+    limit_price: Optional[int]
+    order_id: int
+
+# Ordem stop disparada pelo último preço negociado
+@dataclass(slots=True)
+class StopTriggered:
+    order_id: int
+    last_price: int
+
+# Início da fase de leilão
+@dataclass(slots=True)
+class AuctionStarted:
+    pass
+
+# Ordem a mercado guardada para o uncross do leilão
+@dataclass(slots=True)
+class MarketQueued:
+    side: Side
+    qty: int
+
+# Fim do leilão: preço de equilíbrio e volume executado (price None = sem negócios)
+@dataclass(slots=True)
+class AuctionUncrossed:
+    price: Optional[int]
+    volume: int
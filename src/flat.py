@@ -0,0 +1,201 @@
+# src/flat.py
+from typing import List, Optional, Set, Tuple
+from book import Order, Peg
+
+# Ordens consumidas toleradas à frente da lista antes de uma compactação
+_COMPACT_MIN_HEAD = 64
+
+# Funções auxiliares de ordenação de buy
+def _buy_sort_key(o: Order):
+    p = o.price if o.price is not None else float("-inf")
+    return (-p, o.ts)
+
+# Funções auxiliares de ordenação de sell
+def _sell_sort_key(o: Order):
+    p = o.price if o.price is not None else float("inf")
+    return (p, o.ts)
+
+# Lado do livro em lista plana ordenada (backend original, O(n) por inserção).
+# As ordens vivas são _orders[_head:]: o matching consome a frente só avançando
+# _head, e a lista é compactada quando a parte consumida passa da viva
+class FlatSide:
+    # Inicializa um lado vazio (compra ou venda)
+    def __init__(self, is_buy: bool):
+        self.is_buy = is_buy
+        self._orders: List[Order] = []
+        self._head = 0
+        # Preços de níveis alterados desde a última publicação do feed de profundidade
+        self.dirty: Optional[Set[int]] = None
+
+    def __iter__(self):
+        orders = self._orders
+        if self._head == 0:
+            return iter(orders)
+        return map(orders.__getitem__, range(self._head, len(orders)))
+
+    def __len__(self) -> int:
+        return len(self._orders) - self._head
+
+    # Descarta de fato as ordens já consumidas à frente da lista
+    def _compact(self):
+        if self._head:
+            del self._orders[:self._head]
+            self._head = 0
+
+    # Retorna o preço efetivo de uma ordem
+    def price_of(self, order: Order) -> Optional[int]:
+        return order.price
+
+    # Carrega um lado vazio com ordens já em prioridade preço-tempo (snapshot)
+    def load(self, orders):
+        self._orders = list(orders)
+        self._head = 0
+
+    # Insere a ordem mantendo prioridade preço-tempo com varredura linear
+    def insert(self, order: Order):
+        orders = self._orders
+        i = self._head
+        if self.is_buy:
+            while i < len(orders):
+                o = orders[i]
+
+                if order.price > o.price:
+                    break
+                if order.price < o.price:
+                    i += 1
+                    continue
+                if order.ts < o.ts:
+                    break
+                i += 1
+        else:
+            while i < len(orders):
+                o = orders[i]
+
+                if order.price < o.price:
+                    break
+                if order.price > o.price:
+                    i += 1
+                    continue
+                if order.ts < o.ts:
+                    break
+                i += 1
+        orders.insert(i, order)
+        if self.dirty is not None:
+            self.dirty.add(order.price)
+
+    # Remove uma ordem específica; retorna False se ela não está no livro
+    def remove(self, order: Order) -> bool:
+        orders = self._orders
+        for i in range(self._head, len(orders)):
+            if orders[i] is order:
+                orders.pop(i)
+                if self.dirty is not None:
+                    self.dirty.add(order.price)
+                return True
+        return False
+
+    # Altera a quantidade de uma ordem em repouso
+    def set_qty(self, order: Order, qty: int):
+        order.qty = qty
+        if self.dirty is not None:
+            self.dirty.add(order.price)
+
+    # Quantidade total e número de ordens no preço (varredura linear)
+    def level_at(self, price: int) -> Tuple[int, int]:
+        qty = count = 0
+        for o in self:
+            if o.price == price:
+                qty += o.qty
+                count += 1
+        return qty, count
+
+    # Quantidade executável contra este lado até limit_price (None = qualquer
+    # preço), parando ao alcançar qty (varredura linear a partir do topo)
+    def executable(self, limit_price: Optional[int], qty: int) -> int:
+        total = 0
+        for o in self:
+            if total >= qty:
+                break
+            if limit_price is not None and (o.price < limit_price if self.is_buy else o.price > limit_price):
+                break
+            total += o.qty
+        return total
+
+    # Os n melhores níveis agregados (preço, qty total, nº de ordens); a lista já
+    # está em prioridade, então basta agrupar preços consecutivos
+    def depth(self, n: int) -> List[Tuple[int, int, int]]:
+        out = []
+        if n <= 0:
+            return out
+        price = None
+        qty = count = 0
+        for o in self:
+            if o.price != price:
+                if count:
+                    out.append((price, qty, count))
+                    if len(out) >= n:
+                        return out
+                price, qty, count = o.price, 0, 0
+            qty += o.qty
+            count += 1
+        if count:
+            out.append((price, qty, count))
+        return out
+
+    # Descarta as n primeiras ordens consumidas por uma varredura de matching em
+    # O(n): só avança o início; a compactação (O(ordens vivas)) é amortizada
+    def drop_front(self, n: int):
+        head = self._head
+        if self.dirty is not None:
+            self.dirty.update(o.price for o in self._orders[head:head + n])
+        head += n
+        self._head = head
+        if head > _COMPACT_MIN_HEAD and head * 2 > len(self._orders):
+            self._compact()
+
+    # Retorna o melhor preço ignorando ordens pegged na referência dada
+    def best_price(self, peg: Peg) -> Optional[int]:
+        best = None
+        if self.is_buy:
+            for o in self:
+                if o.pegged == peg or o.price is None:
+                    continue
+                if best is None or o.price > best:
+                    best = o.price
+        else:
+            for o in self:
+                if o.pegged == peg or o.price is None:
+                    continue
+                if best is None or o.price < best:
+                    best = o.price
+        return best
+
+    # Retira todas as ordens pegged do lado, na ordem do livro
+    def remove_pegged(self, peg: Peg) -> List[Order]:
+        kept = []
+        removed = []
+        for o in self:
+            if o.pegged == peg:
+                removed.append(o)
+            else:
+                kept.append(o)
+        self._orders = kept
+        self._head = 0
+        if self.dirty is not None:
+            self.dirty.update(o.price for o in removed)
+        return removed
+
+    # Reprecifica as ordens pegged e reordena o lado inteiro (se alguma mudou de preço)
+    def reprice_pegged(self, peg: Peg, price: int):
+        dirty = self.dirty
+        moved = False
+        for o in self:
+            if o.pegged == peg and o.price != price:
+                if dirty is not None:
+                    dirty.add(o.price)
+                    dirty.add(price)
+                o.price = price
+                moved = True
+        if moved:
+            self._compact()
+            self._orders.sort(key=_buy_sort_key if self.is_buy else _sell_sort_key)
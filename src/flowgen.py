@@ -0,0 +1,232 @@
+# src/flowgen.py
+# Gerador sintético e determinístico (por semente) de fluxo de ordens.
+# Uso: python flowgen.py [--count N] [--depth D] [--seed S] [--symbols K] > fluxo.txt
+import argparse
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Tuple
+
+from book import OrderBook, Side, Peg, SIDE_NAMES, PEG_NAMES, format_order_id
+from book import CMD_LIMIT, CMD_MARKET, CMD_PEG, CMD_MODIFY, CMD_MODIFY_QTY, CMD_CANCEL, CMD_STOP
+from ticks import TickSize
+
+# Tipos de comando gerados (também usados como chave nos relatórios); as tuplas
+# geradas podem ser passadas direto a OrderBook.submit_batch
+LIMIT = CMD_LIMIT
+MARKET = CMD_MARKET
+PEG = CMD_PEG
+MODIFY = CMD_MODIFY
+MODIFY_QTY = CMD_MODIFY_QTY
+CANCEL = CMD_CANCEL
+STOP = CMD_STOP
+
+# Formatos da distribuição de distância ao preço médio
+SHAPES = ("uniform", "normal", "exponential")
+
+# Pesos relativos de cada tipo de comando no fluxo
+@dataclass
+class FlowMix:
+    limit: float = 0.50
+    market: float = 0.08
+    peg: float = 0.05
+    modify: float = 0.12
+    modify_qty: float = 0.03
+    cancel: float = 0.22
+    # Stops ficam fora do fluxo padrão (peso 0 mantém os fluxos já gerados)
+    stop: float = 0.0
+
+    def weights(self) -> Tuple[Tuple[str, float], ...]:
+        return (
+            (LIMIT, self.limit),
+            (MARKET, self.market),
+            (PEG, self.peg),
+            (MODIFY, self.modify),
+            (MODIFY_QTY, self.modify_qty),
+            (CANCEL, self.cancel),
+            (STOP, self.stop),
+        )
+
+# Parâmetros do fluxo; preços em ticks
+@dataclass
+class FlowConfig:
+    seed: int = 1
+    mix: FlowMix = field(default_factory=FlowMix)
+    shape: str = "normal"
+    mid: int = 10_000
+    width: int = 500
+    cross: float = 0.05
+    qty_min: int = 1
+    qty_max: int = 100
+
+# Comandos são tuplas: (LIMIT, side, price, qty), (MARKET, side, qty),
+# (PEG, reference, side, qty), (MODIFY, id, price, qty), (MODIFY_QTY, id, qty), (CANCEL, id),
+# (STOP, side, stop, qty, limit ou None)
+Command = tuple
+
+class FlowGenerator:
+    def __init__(self, config: Optional[FlowConfig] = None):
+        self.config = config or FlowConfig()
+        if self.config.shape not in SHAPES:
+            raise ValueError(f"formato de preço inválido: {self.config.shape}")
+        self.rng = random.Random(self.config.seed)
+        weights = [(kind, weight) for kind, weight in self.config.mix.weights() if weight > 0]
+        self._kinds = [kind for kind, _ in weights]
+        self._cum = []
+        total = 0.0
+        for _, weight in weights:
+            total += weight
+            self._cum.append(total)
+        # Ids que podem ter sido criados até agora (limit e peg); alvos de modify/cancel
+        self.issued = 0
+
+    # Distância (>= 1 tick) ao preço médio segundo o formato configurado
+    def _offset(self) -> int:
+        cfg, rng = self.config, self.rng
+        if cfg.shape == "uniform":
+            return rng.randint(1, cfg.width)
+        if cfg.shape == "normal":
+            return min(cfg.width, int(abs(rng.gauss(0.0, cfg.width / 3))) + 1)
+        return min(cfg.width, int(rng.expovariate(4.0 / cfg.width)) + 1)
+
+    # Preço de uma ordem: passivo (do seu lado do médio) ou, com chance cross, agressivo
+    def _price(self, side: Side, passive: bool = False) -> int:
+        offset = self._offset()
+        aggressive = not passive and self.rng.random() < self.config.cross
+        if (side == Side.BUY) != aggressive:
+            return max(1, self.config.mid - offset)
+        return self.config.mid + offset
+
+    def _side(self) -> Side:
+        return Side.BUY if self.rng.random() < 0.5 else Side.SELL
+
+    def _qty(self) -> int:
+        return self.rng.randint(self.config.qty_min, self.config.qty_max)
+
+    def _target(self) -> int:
+        return self.rng.randint(1, max(1, self.issued))
+
+    # Ordens limit passivas que montam um livro com a profundidade pedida
+    def prefill(self, depth: int) -> Iterator[Command]:
+        for _ in range(depth):
+            side = self._side()
+            self.issued += 1
+            yield (LIMIT, side, self._price(side, passive=True), self._qty())
+
+    # Próximo comando do fluxo misto
+    def next(self) -> Command:
+        rng = self.rng
+        r = rng.random() * self._cum[-1]
+        kind = self._kinds[-1]
+        for k, bound in zip(self._kinds, self._cum):
+            if r < bound:
+                kind = k
+                break
+
+        if kind == LIMIT:
+            side = self._side()
+            self.issued += 1
+            return (LIMIT, side, self._price(side), self._qty())
+        if kind == MARKET:
+            return (MARKET, self._side(), self._qty())
+        if kind == PEG:
+            self.issued += 1
+            if rng.random() < 0.5:
+                return (PEG, Peg.BID, Side.BUY, self._qty())
+            return (PEG, Peg.OFFER, Side.SELL, self._qty())
+        if kind == MODIFY:
+            return (MODIFY, self._target(), self._price(self._side()), self._qty())
+        if kind == MODIFY_QTY:
+            return (MODIFY_QTY, self._target(), self._qty())
+        if kind == STOP:
+            # Disparo do lado oposto ao passivo (compra acima do médio); metade stop-limit
+            side = self._side()
+            self.issued += 1
+            stop_price = self._price(Side.SELL if side == Side.BUY else Side.BUY, passive=True)
+            if rng.random() < 0.5:
+                return (STOP, side, stop_price, self._qty(), None)
+            slack = self._offset() // 4
+            limit_price = stop_price + slack if side == Side.BUY else max(1, stop_price - slack)
+            return (STOP, side, stop_price, self._qty(), limit_price)
+        return (CANCEL, self._target())
+
+    def commands(self, n: int) -> Iterator[Command]:
+        for _ in range(n):
+            yield self.next()
+
+# Aplica um comando gerado diretamente no livro
+def apply_command(book: OrderBook, cmd: Command):
+    kind = cmd[0]
+    if kind == LIMIT:
+        book.handle_limit(cmd[1], cmd[2], cmd[3])
+    elif kind == MARKET:
+        book.handle_market(cmd[1], cmd[2])
+    elif kind == PEG:
+        book.handle_peg(cmd[1], cmd[2], cmd[3])
+    elif kind == MODIFY:
+        book.modify_order(cmd[1], cmd[2], cmd[3])
+    elif kind == MODIFY_QTY:
+        book.modify_order_qty_only(cmd[1], cmd[2])
+    elif kind == STOP:
+        book.handle_stop(cmd[1], cmd[2], cmd[3], cmd[4])
+    else:
+        book.cancel_order(cmd[1])
+
+# Formata um comando gerado como linha de texto do app (para --replay)
+def format_command(cmd: Command, ticks: TickSize) -> str:
+    kind = cmd[0]
+    if kind == LIMIT:
+        return f"limit {SIDE_NAMES[cmd[1]]} {ticks.to_price(cmd[2])} {cmd[3]}"
+    if kind == MARKET:
+        return f"market {SIDE_NAMES[cmd[1]]} {cmd[2]}"
+    if kind == PEG:
+        return f"peg {PEG_NAMES[cmd[1]]} {SIDE_NAMES[cmd[2]]} {cmd[3]}"
+    if kind == MODIFY:
+        return f"modify order {format_order_id(cmd[1])} {ticks.to_price(cmd[2])} {cmd[3]}"
+    if kind == MODIFY_QTY:
+        return f"modify order {format_order_id(cmd[1])} {cmd[2]}"
+    if kind == STOP:
+        if cmd[4] is None:
+            return f"stop {SIDE_NAMES[cmd[1]]} {ticks.to_price(cmd[2])} {cmd[3]}"
+        return f"stoplimit {SIDE_NAMES[cmd[1]]} {ticks.to_price(cmd[2])} {ticks.to_price(cmd[4])} {cmd[3]}"
+    return f"cancel order {format_order_id(cmd[1])}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um fluxo sintético de comandos")
+    parser.add_argument("--count", type=int, default=100_000, help="comandos do fluxo misto")
+    parser.add_argument("--depth", type=int, default=0, help="ordens passivas antes do fluxo")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--shape", choices=SHAPES, default="normal")
+    parser.add_argument("--width", type=int, default=500, help="largura da distribuição, em ticks")
+    parser.add_argument("--cross", type=float, default=0.05, help="fração de limits agressivas")
+    parser.add_argument("--tick", default=None, help="tamanho do tick de preço (padrão 0.01)")
+    parser.add_argument("--symbols", type=int, default=0, help="ativos (@S0..); 0 gera comandos sem prefixo")
+    parser.add_argument("--stops", type=float, default=0.0, help="peso das ordens stop no fluxo (padrão 0)")
+    args = parser.parse_args()
+
+    ticks = TickSize() if args.tick is None else TickSize(args.tick)
+    mix = FlowMix(stop=args.stops)
+    out = sys.stdout
+    if args.symbols <= 0:
+        gen = FlowGenerator(FlowConfig(seed=args.seed, mix=mix, shape=args.shape, width=args.width, cross=args.cross))
+        for cmd in gen.prefill(args.depth):
+            out.write(format_command(cmd, ticks) + "\n")
+        for cmd in gen.commands(args.count):
+            out.write(format_command(cmd, ticks) + "\n")
+        return
+
+    # Um gerador por ativo (ids independentes por livro); o ativo de cada linha é sorteado
+    gens = [
+        FlowGenerator(FlowConfig(seed=args.seed + i, mix=mix, shape=args.shape, width=args.width, cross=args.cross))
+        for i in range(args.symbols)
+    ]
+    for i, gen in enumerate(gens):
+        for cmd in gen.prefill(args.depth):
+            out.write(f"@S{i} {format_command(cmd, ticks)}\n")
+    pick = random.Random(args.seed).randrange
+    for _ in range(args.count):
+        i = pick(args.symbols)
+        out.write(f"@S{i} {format_command(gens[i].next(), ticks)}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+# src/fuzz.py
+# Fuzzer diferencial: gera por semente um fluxo aleatório de comandos (limit com
+# todas as TIF, market, peg, stop, modify, cancel, participantes, cancel all e
+# tempo) e o aplica em lockstep no motor de referência (reference.ReferenceBook)
+# e num candidato (OrderBook com um backend, comando a comando ou via
+# submit_batch). Depois de cada comando compara os eventos emitidos e o estado
+# do livro; na primeira diferença reduz o fluxo a um reprodutor mínimo e o
+# imprime como chamadas ao livro. Com --throughput roda os dois motores no mesmo
+# fluxo, mede o tempo de cada um e informa o ganho junto com a equivalência.
+# Uso: python fuzz.py [--seeds N] [--seed S] [--ops K] [--candidate NOME|all] [--debug]
+#      python fuzz.py --throughput [--ops K] [--depth D] [--candidate NOME|all]
+import argparse
+import random
+import sys
+import time
+from typing import Callable, List, Optional, Tuple
+
+from book import OrderBook, Side, Peg, TimeInForce
+from book import CMD_LIMIT, CMD_MARKET, CMD_PEG, CMD_MODIFY, CMD_MODIFY_QTY, CMD_CANCEL, CMD_STOP
+from book import CMD_LIMIT_TIF, CMD_CANCEL_ALL
+from reference import ReferenceBook, book_state
+from sinks import ListSink
+
+# Comandos fora do submit_batch: troca de participante e avanço do tempo
+CMD_OWNER = "owner"
+CMD_TIME = "time"
+
+# Candidatos: backend do OrderBook e se os comandos passam por submit_batch
+CANDIDATES = {
+    "ladder": ("ladder", False),
+    "list": ("list", False),
+    "ladder-batch": ("ladder", True),
+    "list-batch": ("list", True),
+}
+
+# Partes do estado comparado (mesma ordem de ReferenceBook.state)
+STATE_FIELDS = ("buys", "sells", "stops", "deadlines", "owned", "terminated", "owner", "last_price", "now")
+
+# Ordens encerradas lembradas pelos dois motores: pequeno, para o fuzzer passar
+# também pelo descarte das mais antigas
+DEFAULT_RETAIN = 64
+
+OWNERS = ("a", "b", "c")
+
+# Gerador do fluxo: preços numa faixa estreita em torno de mid (muitos
+# cruzamentos e níveis repetidos), quantidades pequenas e uma fração de comandos
+# inválidos. Uma referência acompanha o fluxo gerado para que modify e cancel
+# mirem na maioria ordens e stops vivas; o fluxo em si é uma lista fixa de tuplas
+class CommandGenerator:
+    def __init__(self, seed: int, mid: int = 100, width: int = 8):
+        self.rng = random.Random(seed)
+        self.mid = mid
+        self.width = width
+        self.now = 0
+        self._sink = ListSink()
+        self._book = ReferenceBook(self._sink, retain=DEFAULT_RETAIN)
+
+    def _side(self) -> Side:
+        return Side.BUY if self.rng.random() < 0.5 else Side.SELL
+
+    def _price(self) -> int:
+        return self.mid + self.rng.randint(-self.width, self.width)
+
+    # Preço do lado da ordem, cruzando o meio poucas vezes (o livro ganha profundidade)
+    def _limit_price(self, side: Side) -> int:
+        offset = self.rng.randint(-2, self.width)
+        return self.mid - offset if side == Side.BUY else self.mid + offset
+
+    def _qty(self) -> int:
+        return self.rng.randint(1, 12)
+
+    # Id de uma ordem ou stop viva; às vezes um já encerrado ou que não existe
+    def _target(self, pegged: bool = False) -> int:
+        rng, book = self.rng, self._book
+        r = rng.random()
+        if r < 0.8:
+            live = [o.id for o in book.buys + book.sells if (o.pegged != Peg.NONE) == pegged]
+            if not pegged or rng.random() < 0.2:
+                live += [s.id for s in book.stops]
+            if live:
+                return rng.choice(live)
+        if r < 0.95 and book._id:
+            return rng.randint(1, book._id)
+        return book._id + rng.randint(1, 5)
+
+    def _make(self) -> tuple:
+        rng = self.rng
+        r = rng.random()
+        if r < 0.32:
+            side = self._side()
+            return (CMD_LIMIT, side, self._limit_price(side), self._qty())
+        if r < 0.42:
+            side = self._side()
+            tif = rng.choice((TimeInForce.IOC, TimeInForce.FOK, TimeInForce.GTD))
+            price = self._limit_price(side) if tif == TimeInForce.GTD else self._price()
+            expires = self.now + rng.randint(-2, 40) if tif == TimeInForce.GTD else None
+            return (CMD_LIMIT_TIF, side, price, self._qty(), tif, expires)
+        if r < 0.48:
+            return (CMD_MARKET, self._side(), self._qty())
+        if r < 0.54:
+            if rng.random() < 0.1:
+                return (CMD_PEG, rng.choice((Peg.BID, Peg.OFFER)), self._side(), self._qty())
+            side = self._side()
+            return (CMD_PEG, Peg.BID if side == Side.BUY else Peg.OFFER, side, self._qty())
+        if r < 0.60:
+            limit_price = self._price() if rng.random() < 0.5 else None
+            return (CMD_STOP, self._side(), self._price(), self._qty(), limit_price)
+        if r < 0.74:
+            qty = self._qty() if rng.random() < 0.9 else 0
+            return (CMD_MODIFY, self._target(), self._price(), qty)
+        if r < 0.79:
+            qty = self._qty() if rng.random() < 0.9 else 0
+            return (CMD_MODIFY_QTY, self._target(pegged=True), qty)
+        if r < 0.90:
+            return (CMD_CANCEL, self._target())
+        if r < 0.95:
+            return (CMD_OWNER, rng.choice(OWNERS + (None,)))
+        if r < 0.99:
+            self.now += rng.randint(0, 15)
+            return (CMD_TIME, self.now)
+        return (CMD_CANCEL_ALL, rng.choice(OWNERS + (None,)), rng.choice((Side.BUY, Side.SELL, None)))
+
+    # Ordens limit passivas espalhadas em spread ticks de cada lado do meio
+    def prefill(self, depth: int, spread: int) -> List[tuple]:
+        commands = []
+        for _ in range(depth):
+            side = self._side()
+            offset = self.rng.randint(1, spread)
+            price = self.mid - offset if side == Side.BUY else self.mid + offset
+            commands.append((CMD_LIMIT, side, price, self._qty()))
+            apply_command(self._book, commands[-1])
+        self._sink.events.clear()
+        return commands
+
+    def next(self) -> tuple:
+        cmd = self._make()
+        apply_command(self._book, cmd)
+        self._sink.events.clear()
+        return cmd
+
+    def commands(self, n: int) -> List[tuple]:
+        return [self.next() for _ in range(n)]
+
+# Aplica um comando com as chamadas do livro (serve ao OrderBook e à referência)
+def apply_command(book, cmd: tuple):
+    kind = cmd[0]
+    if kind == CMD_LIMIT:
+        book.handle_limit(cmd[1], cmd[2], cmd[3])
+    elif kind == CMD_LIMIT_TIF:
+        book.handle_limit(cmd[1], cmd[2], cmd[3], cmd[4], cmd[5])
+    elif kind == CMD_MARKET:
+        book.handle_market(cmd[1], cmd[2])
+    elif kind == CMD_PEG:
+        book.handle_peg(cmd[1], cmd[2], cmd[3])
+    elif kind == CMD_STOP:
+        book.handle_stop(cmd[1], cmd[2], cmd[3], cmd[4])
+    elif kind == CMD_MODIFY:
+        book.modify_order(cmd[1], cmd[2], cmd[3])
+    elif kind == CMD_MODIFY_QTY:
+        book.modify_order_qty_only(cmd[1], cmd[2])
+    elif kind == CMD_CANCEL:
+        book.cancel_order(cmd[1])
+    elif kind == CMD_OWNER:
+        book.set_owner(cmd[1])
+    elif kind == CMD_TIME:
+        book.advance_time(cmd[1])
+    else:
+        book.cancel_all(cmd[1], cmd[2])
+
+# Mesmo efeito, mas os comandos do livro passam por submit_batch
+def apply_batched(book, cmd: tuple):
+    if cmd[0] == CMD_OWNER or cmd[0] == CMD_TIME:
+        apply_command(book, cmd)
+    else:
+        book.submit_batch((cmd,))
+
+# Livro candidato, sink e função que aplica um comando nele
+def make_candidate(name: str, debug: bool = False, retain: int = DEFAULT_RETAIN):
+    backend, batched = CANDIDATES[name]
+    sink = ListSink()
+    book = OrderBook(backend=backend, debug=debug, sink=sink, retain=retain)
+    return book, sink, apply_batched if batched else apply_command
+
+# Formata um comando como chamada ao livro (para colar num teste ou no REPL)
+def format_command(cmd: tuple) -> str:
+    def arg(value):
+        if isinstance(value, (Side, Peg, TimeInForce)):
+            return f"{type(value).__name__}.{value.name}"
+        return repr(value)
+
+    kind = cmd[0]
+    args = ", ".join(arg(value) for value in cmd[1:])
+    method = {
+        CMD_LIMIT: "handle_limit",
+        CMD_LIMIT_TIF: "handle_limit",
+        CMD_MARKET: "handle_market",
+        CMD_PEG: "handle_peg",
+        CMD_STOP: "handle_stop",
+        CMD_MODIFY: "modify_order",
+        CMD_MODIFY_QTY: "modify_order_qty_only",
+        CMD_CANCEL: "cancel_order",
+        CMD_OWNER: "set_owner",
+        CMD_TIME: "advance_time",
+        CMD_CANCEL_ALL: "cancel_all",
+    }[kind]
+    return f"book.{method}({args})"
+
+# Diferença encontrada: índice do comando e descrição
+Mismatch = Tuple[int, str]
+
+# Roda o fluxo nos dois motores em lockstep; devolve a primeira diferença ou None
+def run_lockstep(commands: List[tuple], candidate: str, debug: bool = False) -> Optional[Mismatch]:
+    ref_sink = ListSink()
+    ref = ReferenceBook(ref_sink, retain=DEFAULT_RETAIN)
+    book, sink, apply = make_candidate(candidate, debug)
+    for i, cmd in enumerate(commands):
+        apply_command(ref, cmd)
+        try:
+            apply(book, cmd)
+        except Exception as exc:
+            return i, f"candidato levantou {type(exc).__name__}: {exc}"
+        if sink.events != ref_sink.events:
+            return i, _describe_events(ref_sink.events, sink.events)
+        ref_sink.events.clear()
+        sink.events.clear()
+        expected = ref.state()
+        actual = book_state(book)
+        if actual != expected:
+            return i, _describe_state(expected, actual)
+    return None
+
+def _describe_events(expected: list, actual: list) -> str:
+    lines = ["eventos diferentes:", "  referência:"]
+    lines += [f"    {event}" for event in expected] or ["    (nenhum)"]
+    lines.append("  candidato:")
+    lines += [f"    {event}" for event in actual] or ["    (nenhum)"]
+    return "\n".join(lines)
+
+def _describe_state(expected: tuple, actual: tuple) -> str:
+    lines = []
+    for name, want, got in zip(STATE_FIELDS, expected, actual):
+        if want != got:
+            lines.append(f"estado diferente em {name}:\n  referência: {want}\n  candidato:  {got}")
+    return "\n".join(lines)
+
+# Reduz um fluxo que falha a um reprodutor mínimo (delta debugging): corta
+# depois do comando que falhou e tenta tirar blocos cada vez menores enquanto a
+# falha persistir. Os ids dos comandos não são renumerados; o fluxo reduzido só
+# precisa continuar divergindo, não pela mesma ordem
+def shrink(commands: List[tuple], fails: Callable[[List[tuple]], Optional[Mismatch]]) -> List[tuple]:
+    result = fails(commands)
+    if result is None:
+        return commands
+    commands = commands[: result[0] + 1]
+    chunk = max(1, len(commands) // 2)
+    while True:
+        i = 0
+        removed = False
+        while i < len(commands):
+            trial = commands[:i] + commands[i + chunk :]
+            result = fails(trial)
+            if result is not None:
+                commands = trial[: result[0] + 1]
+                removed = True
+            else:
+                i += chunk
+        if chunk == 1 and not removed:
+            return commands
+        if not removed:
+            chunk = max(1, chunk // 2)
+
+# Fuzzing por semente: falso na primeira divergência (já reduzida e impressa)
+def fuzz(seeds: range, ops: int, candidates: List[str], debug: bool, out=sys.stdout) -> bool:
+    for seed in seeds:
+        commands = CommandGenerator(seed).commands(ops)
+        for name in candidates:
+            result = run_lockstep(commands, name, debug)
+            if result is None:
+                continue
+            out.write(f"divergência: candidato {name}, semente {seed}, comando {result[0]}\n")
+            minimal = shrink(commands, lambda cmds: run_lockstep(cmds, name, debug))
+            index, description = run_lockstep(minimal, name, debug)
+            out.write(f"reprodutor mínimo ({len(minimal)} comandos):\n")
+            for cmd in minimal:
+                out.write(f"  {format_command(cmd)}\n")
+            out.write(f"no comando {index}: {description}\n")
+            return False
+        out.write(f"semente {seed}: {ops} comandos, {len(candidates)} candidato(s) iguais à referência\n")
+    return True
+
+# Tempo e saída de um motor num fluxo: (segundos, eventos, estado final)
+def _timed(book, sink: ListSink, apply, commands: List[tuple], state):
+    t0 = time.perf_counter()
+    for cmd in commands:
+        apply(book, cmd)
+    elapsed = time.perf_counter() - t0
+    return elapsed, sink.events, state(book)
+
+# Compara o tempo da referência e dos candidatos no mesmo fluxo; depth ordens
+# passivas montam o livro antes (fora da medição)
+def throughput(seed: int, ops: int, depth: int, candidates: List[str], out=sys.stdout) -> bool:
+    gen = CommandGenerator(seed, mid=10_000)
+    prefill = gen.prefill(depth, max(8, depth // 20))
+    commands = gen.commands(ops)
+
+    ref_sink = ListSink()
+    ref = ReferenceBook(ref_sink)
+    for cmd in prefill:
+        apply_command(ref, cmd)
+    ref_sink.events.clear()
+    base, ref_events, ref_final = _timed(ref, ref_sink, apply_command, commands, ReferenceBook.state)
+    out.write(f"fluxo: {depth:,} ordens iniciais, {ops:,} comandos, {len(ref_events):,} eventos\n")
+    out.write(f"{'motor':>14} {'us/comando':>11} {'ganho':>8}  equivalente\n")
+    out.write(f"{'referência':>14} {base / ops * 1e6:>11.2f} {'1.00x':>8}  -\n")
+    ok = True
+    for name in candidates:
+        backend, batched = CANDIDATES[name]
+        sink = ListSink()
+        book = OrderBook(backend=backend, sink=sink)
+        for cmd in prefill:
+            apply_command(book, cmd)
+        sink.events.clear()
+        apply = apply_batched if batched else apply_command
+        elapsed, events, final = _timed(book, sink, apply, commands, book_state)
+        same = events == ref_events and final == ref_final
+        ok = ok and same
+        out.write(f"{name:>14} {elapsed / ops * 1e6:>11.2f} {base / elapsed:>7.2f}x  {'sim' if same else 'NÃO'}\n")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara motores otimizados com o motor de referência")
+    parser.add_argument("--seeds", type=int, default=20, help="sementes a testar")
+    parser.add_argument("--seed", type=int, default=1, help="primeira semente")
+    parser.add_argument("--ops", type=int, default=None, help="comandos por semente (padrão 2000; 20000 em --throughput)")
+    parser.add_argument("--candidate", choices=tuple(CANDIDATES) + ("all",), default="all")
+    parser.add_argument("--debug", action="store_true", help="candidato confere os invariantes a cada evento")
+    parser.add_argument("--throughput", action="store_true", help="mede o ganho sobre a referência")
+    parser.add_argument("--depth", type=int, default=2000, help="ordens iniciais em --throughput")
+    args = parser.parse_args()
+
+    candidates = list(CANDIDATES) if args.candidate == "all" else [args.candidate]
+    if args.throughput:
+        ok = throughput(args.seed, args.ops or 20_000, args.depth, candidates)
+    else:
+        ok = fuzz(range(args.seed, args.seed + args.seeds), args.ops or 2000, candidates, args.debug)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
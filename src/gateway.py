@@ -0,0 +1,258 @@
+# src/gateway.py
+# Gateway TCP (asyncio) para o motor: várias conexões enviam comandos na mesma
+# gramática do app (uma linha por comando, com @SYM opcional), que entram numa
+# fila limitada consumida por uma única tarefa do motor, em ordem de chegada.
+#
+# Protocolo (texto, UTF-8, uma linha por mensagem):
+#   cliente -> servidor: um comando por linha; pode enviar vários sem esperar (pipelining)
+#   servidor -> cliente: a resposta de cada comando, na ordem enviada, como
+#       "= <n>" seguido das n linhas de saída do comando
+#   "subscribe trades" / "unsubscribe trades": liga/desliga o feed de negócios,
+#       enviado a todos os inscritos como "* trade @<símbolo> <preço> <qty>"
+#   "exit" / "quit": encerra a conexão
+#   "owner <nome>": participante em nome do qual a conexão envia as ordens (padrão
+#       "conn<n>"). Ao desconectar, as ordens e stops do participante são canceladas
+#       em todos os livros (cancel on disconnect); conexões com o mesmo nome
+#       compartilham as ordens. "owner none" envia sem participante (nada é cancelado)
+#   "batch begin/end" não é aceito: os livros são compartilhados entre as conexões
+#       e um batch capturaria ordens alheias (pipelining já amortiza a ida e volta)
+#   comandos que gravam arquivos no servidor (stats json <arquivo>, stats profile N
+#       <arquivo>, stats trades dump <arquivo>) são recusados
+#
+# Uso: python gateway.py [--host H] [--port P] [--queue N] [--tick T] [--keep-on-disconnect]
+import argparse
+import asyncio
+import sys
+from typing import List, Optional, Set
+
+from events import Trade
+from registry import BookRegistry, split_symbol
+from sinks import TextSink
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7001
+DEFAULT_QUEUE = 4096
+
+# Comandos consumidos por ciclo da tarefa do motor antes de ceder o loop
+_ENGINE_BATCH = 256
+
+# Bytes pendentes de envio acima dos quais um inscrito lento é desconectado
+_SLOW_CONSUMER_BYTES = 8 << 20
+
+_EXIT = frozenset(("exit", "quit"))
+_SUBSCRIBE = "subscribe trades"
+_UNSUBSCRIBE = "unsubscribe trades"
+# Fim da conexão: passa pela fila para sair depois das respostas pendentes
+_CLOSE = "close"
+# Comandos do próprio gateway (a primeira palavra filtra o caso comum)
+_CONTROL = {_SUBSCRIBE: _SUBSCRIBE, _UNSUBSCRIBE: _UNSUBSCRIBE}
+_CONTROL_HEADS = frozenset(("subscribe", "unsubscribe"))
+_BATCH = "batch"
+_BATCH_REJECTED = "Batch não suportado no gateway; envie os comandos em pipeline"
+# Comandos que gravariam arquivos com o usuário do servidor
+_FILE = "file"
+_FILE_REJECTED = "Comandos que gravam arquivos não são aceitos no gateway"
+
+# O comando grava um arquivo no servidor? (partes já sem o @SYM)
+def _writes_file(parts: List[str]) -> bool:
+    if len(parts) < 3 or parts[0].lower() != "stats":
+        return False
+    action = parts[1].lower()
+    if action == "json":
+        return len(parts) >= 3
+    if action == "profile":
+        return len(parts) >= 4
+    return action == "trades" and parts[2].lower() == "dump"
+
+# Texto do motor retido por comando; os negócios são guardados para o broadcast
+class _CaptureSink(TextSink):
+    def __init__(self):
+        super().__init__(buffer_lines=sys.maxsize)
+        self.trades: List[Trade] = []
+
+    def emit(self, event):
+        if type(event) is Trade:
+            self.trades.append(event)
+        super().emit(event)
+
+class _Connection:
+    __slots__ = ("writer", "closed", "owner")
+
+    def __init__(self, writer: asyncio.StreamWriter, owner: Optional[str]):
+        self.writer = writer
+        self.closed = False
+        self.owner = owner
+
+    def send(self, data: bytes):
+        if not self.closed:
+            self.writer.write(data)
+
+# Resposta de um comando: "= <n>" + n linhas
+def _frame(lines: List[str]) -> bytes:
+    body = "\n".join(lines)
+    if not body:
+        return b"= 0\n"
+    parts = body.split("\n")
+    return f"= {len(parts)}\n{body}\n".encode("utf-8")
+
+class Gateway:
+    def __init__(self, queue_size: int = DEFAULT_QUEUE, cancel_on_disconnect: bool = True, **book_kwargs):
+        self.sink = _CaptureSink()
+        self.registry = BookRegistry(sink=self.sink, **book_kwargs)
+        self.queue: Optional[asyncio.Queue] = None
+        self.queue_size = queue_size
+        self.cancel_on_disconnect = cancel_on_disconnect
+        self.subscribers: Set[_Connection] = set()
+        self.commands = 0
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._engine: Optional[asyncio.Task] = None
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        from app import process_line
+
+        self._process_line = process_line
+        self.queue = asyncio.Queue(self.queue_size)
+        self._engine = asyncio.create_task(self._run_engine())
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._engine is not None:
+            self._engine.cancel()
+
+    # Leitura de uma conexão: cada linha vai para a fila do motor; com a fila cheia
+    # o put espera e a conexão para de ler, propagando a contrapressão ao cliente.
+    # O fechamento é feito pelo motor, depois das respostas já enfileiradas
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        conn = _Connection(writer, f"conn{self.connections}")
+        put = self.queue.put
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8", errors="replace")
+                parts = split_symbol(line)[1].split()
+                head = parts[0].lower() if parts else ""
+                if head in _EXIT:
+                    break
+                if head in _CONTROL_HEADS:
+                    # Controles também passam pela fila para manter a ordem das respostas
+                    line = _CONTROL.get(" ".join(parts).lower(), line)
+                elif head == _BATCH:
+                    line = _BATCH
+                elif _writes_file(parts):
+                    line = _FILE
+                await put((conn, line))
+                # Cliente que não lê as respostas também é freado aqui
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        await put((conn, _CLOSE))
+
+    # Única tarefa que toca nos livros: processa os comandos na ordem da fila
+    async def _run_engine(self):
+        queue = self.queue
+        sink = self.sink
+        get_book = self.registry.get
+        process_line = self._process_line
+        while True:
+            item = await queue.get()
+            for remaining in range(_ENGINE_BATCH - 1, -1, -1):
+                conn, line = item
+                self.commands += 1
+                if line is _SUBSCRIBE:
+                    self.subscribers.add(conn)
+                    conn.send(_frame([]))
+                elif line is _UNSUBSCRIBE:
+                    self.subscribers.discard(conn)
+                    conn.send(_frame([]))
+                elif line is _CLOSE:
+                    self._disconnect(conn)
+                    if self.cancel_on_disconnect and conn.owner is not None:
+                        self._cancel_owned(conn.owner)
+                elif line is _BATCH:
+                    conn.send(_frame([_BATCH_REJECTED]))
+                elif line is _FILE:
+                    conn.send(_frame([_FILE_REJECTED]))
+                else:
+                    symbol, command = split_symbol(line)
+                    book = get_book(symbol)
+                    try:
+                        # O livro é compartilhado: as ordens vão em nome desta conexão,
+                        # que guarda o participante trocado pelo comando owner
+                        book.set_owner(conn.owner)
+                        process_line(book, command)
+                        conn.owner = book.owner
+                    except ValueError:
+                        sink.drain()
+                        sink.write(f"Comando inválido: {line.strip()}")
+                    except Exception as exc:
+                        # Um comando com erro não pode derrubar a tarefa do motor,
+                        # compartilhada por todas as conexões
+                        sink.drain()
+                        sink.write(f"Erro ao processar {line.strip()}: {type(exc).__name__}")
+                    conn.send(_frame(sink.drain()))
+                    if sink.trades:
+                        self._broadcast(symbol, book, sink.trades)
+                        sink.trades = []
+                if not remaining or queue.empty():
+                    break
+                item = queue.get_nowait()
+            # Cede o loop para as conexões lerem/escreverem entre lotes
+            await asyncio.sleep(0)
+
+    def _broadcast(self, symbol: str, book, trades: List[Trade]):
+        if not self.subscribers:
+            return
+        px = book.ticks.to_price
+        data = "".join(f"* trade @{symbol} {px(t.price)} {t.qty}\n" for t in trades).encode("utf-8")
+        for conn in list(self.subscribers):
+            if conn.writer.transport.get_write_buffer_size() > _SLOW_CONSUMER_BYTES:
+                self._disconnect(conn)
+                continue
+            conn.send(data)
+
+    # Cancela as ordens do participante em todos os livros; a saída não tem destino
+    def _cancel_owned(self, owner: str):
+        for _, book in self.registry.items():
+            if owner in book.owned:
+                book.cancel_all(owner)
+        self.sink.drain()
+
+    def _disconnect(self, conn: _Connection):
+        self.subscribers.discard(conn)
+        if not conn.closed:
+            conn.closed = True
+            conn.writer.close()
+
+async def serve(host: str, port: int, queue_size: int, cancel_on_disconnect: bool = True, **book_kwargs):
+    gateway = Gateway(queue_size, cancel_on_disconnect, **book_kwargs)
+    server = await gateway.start(host, port)
+    addresses = ", ".join(str(s.getsockname()) for s in server.sockets)
+    print(f"gateway ouvindo em {addresses}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Gateway TCP do Order Matching System")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--queue", type=int, default=DEFAULT_QUEUE, help="comandos em espera antes da contrapressão")
+    parser.add_argument("--tick", default=None, help="tamanho do tick de preço (padrão 0.01)")
+    parser.add_argument(
+        "--keep-on-disconnect", action="store_true", help="não cancela as ordens de quem desconecta"
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.queue, not args.keep_on_disconnect, tick_size=args.tick))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
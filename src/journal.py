@@ -0,0 +1,700 @@
+# src/journal.py
+# Persistência do livro: journal binário append-only dos comandos recebidos pelo
+# motor (com fsync agrupado) e snapshots compactos do livro inteiro.
+# Recuperação = último snapshot + os registros do journal posteriores a ele.
+import gc
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from itertools import repeat
+from typing import Iterator, Optional, Tuple
+
+from book import Order, OrderBook, OrderType, Side, Peg, TimeInForce
+from events import REJECT_RISK_QTY, REJECT_RISK_BAND, REJECT_RISK_POSITION, REJECT_RISK_NOTIONAL, REJECT_RISK_RATE
+
+# Nomes dos arquivos dentro do diretório de persistência
+JOURNAL_FILE = "journal.bin"
+SNAPSHOT_FILE = "snapshot.bin"
+
+# Códigos dos comandos no journal
+OP_LIMIT = 1
+OP_MARKET = 2
+OP_PEG = 3
+OP_MODIFY = 4
+OP_MODIFY_QTY = 5
+OP_CANCEL = 6
+OP_STOP = 7
+OP_STOP_LIMIT = 8
+OP_AUCTION_START = 9
+OP_AUCTION_UNCROSS = 10
+OP_LIMIT_TIF = 11
+OP_TIME = 12
+OP_OWNER = 13
+OP_CANCEL_ALL = 14
+# Não é um comando: a stop disparada foi barrada pelo risco (que não vai ao
+# journal), registrada durante o comando que a disparou
+OP_STOP_REJECTED = 15
+
+# Motivos de rejeição do risco, pelo índice gravado em OP_STOP_REJECTED
+_RISK_REASONS = (REJECT_RISK_QTY, REJECT_RISK_BAND, REJECT_RISK_POSITION, REJECT_RISK_NOTIONAL, REJECT_RISK_RATE)
+
+# Padrões do agrupamento de fsync
+DEFAULT_GROUP_SIZE = 256
+DEFAULT_GROUP_INTERVAL = 0.002
+
+# O journal é uma sequência de quadros, um por group commit:
+# <tamanho dos registros, crc32 dos registros, seq do primeiro> + registros.
+# Cada registro tem tamanho fixo por operação: <op, argumentos>; o seq é implícito.
+_FRAME = struct.Struct("<IIQ")
+_RECORDS = {
+    OP_LIMIT: struct.Struct("<BBqq"),       # side, price, qty
+    OP_MARKET: struct.Struct("<BBq"),       # side, qty
+    OP_PEG: struct.Struct("<BBBq"),         # reference, side, qty
+    OP_MODIFY: struct.Struct("<BQqq"),      # id, price, qty
+    OP_MODIFY_QTY: struct.Struct("<BQq"),   # id, qty
+    OP_CANCEL: struct.Struct("<BQ"),        # id
+    OP_STOP: struct.Struct("<BBqq"),        # side, stop, qty
+    OP_STOP_LIMIT: struct.Struct("<BBqqq"), # side, stop, qty, limit
+    OP_AUCTION_START: struct.Struct("<B"),
+    OP_AUCTION_UNCROSS: struct.Struct("<B"),
+    OP_LIMIT_TIF: struct.Struct("<BBqqBq"), # side, price, qty, tif, prazo
+    OP_TIME: struct.Struct("<Bq"),          # tempo
+    OP_OWNER: struct.Struct("<B32s"),       # participante atual
+    OP_CANCEL_ALL: struct.Struct("<B32sB"), # participante, side
+    OP_STOP_REJECTED: struct.Struct("<BQB"), # id da stop, motivo
+}
+_PACK_LIMIT = _RECORDS[OP_LIMIT].pack
+_PACK_MARKET = _RECORDS[OP_MARKET].pack
+_PACK_PEG = _RECORDS[OP_PEG].pack
+_PACK_MODIFY = _RECORDS[OP_MODIFY].pack
+_PACK_MODIFY_QTY = _RECORDS[OP_MODIFY_QTY].pack
+_PACK_CANCEL = _RECORDS[OP_CANCEL].pack
+_PACK_STOP = _RECORDS[OP_STOP].pack
+_PACK_STOP_LIMIT = _RECORDS[OP_STOP_LIMIT].pack
+_PACK_LIMIT_TIF = _RECORDS[OP_LIMIT_TIF].pack
+_PACK_TIME = _RECORDS[OP_TIME].pack
+_PACK_OWNER = _RECORDS[OP_OWNER].pack
+_PACK_CANCEL_ALL = _RECORDS[OP_CANCEL_ALL].pack
+_PACK_STOP_REJECTED = _RECORDS[OP_STOP_REJECTED].pack
+_AUCTION_START = _RECORDS[OP_AUCTION_START].pack(OP_AUCTION_START)
+_AUCTION_UNCROSS = _RECORDS[OP_AUCTION_UNCROSS].pack(OP_AUCTION_UNCROSS)
+
+# Id ausente (identificador malformado) e enum ausente (peg inválido) no journal
+_NO_ID = 0
+_NO_ENUM = 255
+
+# Participante no journal: nome em UTF-8 completado com zeros (vazio = nenhum)
+def _owner_bytes(owner: Optional[str]) -> bytes:
+    return b"" if owner is None else owner.encode("utf-8")
+
+def _owner_text(data: bytes) -> Optional[str]:
+    data = data.rstrip(b"\0")
+    return data.decode("utf-8") if data else None
+
+# Snapshot colunar: cabeçalho, tick em texto, e para cada lado (compra, venda)
+# as colunas id/ts/price/qty (int64) e order_type/pegged (uint8) das ordens em
+# prioridade preço-tempo; por fim ids/estados das ordens encerradas retidas (da
+# mais antiga à mais nova). Inteiros little-endian; cada seção alinhada em 8 bytes
+# para que a carga leia as colunas direto do mmap, sem cópia intermediária.
+# Desde a versão 3 seguem o último preço negociado e as stops em repouso, em
+# ordem de entrada: id/ts/stop/qty/limit (int64) e side/tem limite (uint8).
+# Desde a versão 4, o leilão em andamento: ts/qty (int64) das ordens a mercado
+# na fila de compra e depois na de venda.
+# Desde a versão 5, o tempo lógico do livro e os prazos das ordens GTD:
+# id/prazo (int64) em ordem de prazo.
+# Desde a versão 6, os participantes: o atual e a tabela de nomes (UTF-8
+# separados por "\n"), seguidos do índice do dono (uint32, 0 = nenhum, k = k-ésimo
+# nome) de cada ordem de compra, de venda e de cada stop, na ordem acima.
+# Desde a versão 7, a mesma coluna segue com o dono de cada ordem a mercado da
+# fila do leilão (compra e depois venda).
+_SNAP_MAGIC = b"MSEPSNAP"
+_SNAP_VERSION = 7
+_SNAP_VERSIONS = (2, 3, 4, 5, 6, 7)
+_SNAP_HEADER = struct.Struct("<8sIQQQQQQqH")
+# Último preço (se tem_último) e número de stops
+_SNAP_STOPS = struct.Struct("<QqQ")
+# Em leilão?, nº de ordens a mercado de compra e de venda na fila
+_SNAP_AUCTION = struct.Struct("<QQQ")
+# Tempo lógico e número de ordens GTD
+_SNAP_TIMERS = struct.Struct("<qQ")
+# Índice do participante atual (0 = nenhum), nº de nomes e bytes da tabela
+_SNAP_OWNERS = struct.Struct("<QQQ")
+_ALIGN = 8
+
+_ORDER_TYPES = tuple(OrderType)
+_PEGS = tuple(Peg)
+_BIG_ENDIAN = sys.byteorder == "big"
+
+# Journal append-only; os registros ficam em buffer e vão ao disco num quadro
+# (write + fsync) a cada group_size comandos ou group_interval segundos, o que
+# vier antes. O prazo também é cobrado com o motor parado: uma thread grava o
+# quadro pendente quando ele passa de group_interval sem novos comandos.
+# Comandos ainda no buffer se perdem numa queda: é a janela do group commit.
+class Journal:
+    def __init__(
+        self,
+        path: str,
+        seq: int = 0,
+        group_size: int = DEFAULT_GROUP_SIZE,
+        group_interval: float = DEFAULT_GROUP_INTERVAL,
+        fsync: bool = True,
+        snapshot_path: Optional[str] = None,
+        snapshot_every: int = 0,
+    ):
+        self.path = path
+        # Seq do último comando registrado
+        self.seq = seq
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self.fsync = fsync
+        self.snapshot_path = snapshot_path
+        self.snapshot_every = snapshot_every
+        self.book: Optional[OrderBook] = None
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._buf = bytearray()
+        self._pending = 0
+        # Comandos registrados desde o último snapshot (os registros que não são
+        # comandos, como OP_STOP_REJECTED, não contam)
+        self._since_snapshot = 0
+        self._last_sync = time.monotonic()
+        # O buffer é compartilhado com a thread do prazo
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer = None
+        if 0 < group_interval < float("inf"):
+            self._timer = threading.Thread(target=self._run_timer, daemon=True)
+            self._timer.start()
+
+    # Recebe o livro cujos comandos são registrados (usado nos snapshots)
+    def bind(self, book: OrderBook):
+        self.book = book
+
+    # Registra um comando. O snapshot só é gravado aqui, antes do comando ser
+    # aplicado, quando o livro está entre dois comandos
+    def _add(self, record: bytes):
+        if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+            self.checkpoint()
+        self._since_snapshot += 1
+        self._append(record)
+
+    def _append(self, record: bytes):
+        with self._lock:
+            self.seq += 1
+            self._buf += record
+            self._pending += 1
+            due = self._pending >= self.group_size or time.monotonic() - self._last_sync >= self.group_interval
+        if due:
+            self.commit()
+
+    # Grava o quadro pendente que passou do prazo sem um comando novo para levá-lo
+    def _run_timer(self):
+        interval = self.group_interval
+        while not self._stop.wait(interval):
+            if self._pending and time.monotonic() - self._last_sync >= interval:
+                self.commit()
+
+    def log_limit(self, side: Side, price: int, qty: int):
+        self._add(_PACK_LIMIT(OP_LIMIT, side, price, qty))
+
+    def log_market(self, side: Side, qty: int):
+        self._add(_PACK_MARKET(OP_MARKET, side, qty))
+
+    def log_peg(self, reference: Optional[Peg], side: Optional[Side], qty: int):
+        self._add(_PACK_PEG(
+            OP_PEG,
+            _NO_ENUM if reference is None else reference,
+            _NO_ENUM if side is None else side,
+            qty,
+        ))
+
+    def log_modify(self, order_id: Optional[int], price: int, qty: int):
+        self._add(_PACK_MODIFY(OP_MODIFY, order_id or _NO_ID, price, qty))
+
+    def log_modify_qty(self, order_id: Optional[int], qty: int):
+        self._add(_PACK_MODIFY_QTY(OP_MODIFY_QTY, order_id or _NO_ID, qty))
+
+    def log_cancel(self, order_id: Optional[int]):
+        self._add(_PACK_CANCEL(OP_CANCEL, order_id or _NO_ID))
+
+    def log_stop(self, side: Side, stop_price: int, qty: int, limit_price: Optional[int]):
+        if limit_price is None:
+            self._add(_PACK_STOP(OP_STOP, side, stop_price, qty))
+        else:
+            self._add(_PACK_STOP_LIMIT(OP_STOP_LIMIT, side, stop_price, qty, limit_price))
+
+    def log_limit_tif(self, side: Side, price: int, qty: int, tif: TimeInForce, expires: Optional[int]):
+        self._add(_PACK_LIMIT_TIF(OP_LIMIT_TIF, side, price, qty, tif, expires or 0))
+
+    def log_time(self, now: int):
+        self._add(_PACK_TIME(OP_TIME, now))
+
+    def log_owner(self, owner: Optional[str]):
+        self._add(_PACK_OWNER(OP_OWNER, _owner_bytes(owner)))
+
+    def log_cancel_all(self, owner: Optional[str], side: Optional[Side]):
+        self._add(_PACK_CANCEL_ALL(OP_CANCEL_ALL, _owner_bytes(owner), _NO_ENUM if side is None else side))
+
+    def log_stop_rejected(self, order_id: int, reason: str):
+        # Gravado no meio do comando que disparou a stop: nunca antecede um snapshot
+        self._append(_PACK_STOP_REJECTED(OP_STOP_REJECTED, order_id, _RISK_REASONS.index(reason)))
+
+    def log_auction_start(self):
+        self._add(_AUCTION_START)
+
+    def log_auction_uncross(self):
+        self._add(_AUCTION_UNCROSS)
+
+    # Grava os registros em buffer como um quadro e, se configurado, força-o ao disco
+    def commit(self):
+        with self._lock:
+            if self._pending:
+                buf = self._buf
+                frame = _FRAME.pack(len(buf), zlib.crc32(buf), self.seq - self._pending + 1)
+                view = memoryview(frame + buf)
+                while view:
+                    view = view[os.write(self._fd, view):]
+                view.release()
+                buf.clear()
+                self._pending = 0
+                if self.fsync:
+                    _fdatasync(self._fd)
+            self._last_sync = time.monotonic()
+
+    # Snapshot do estado atual; o journal anterior a ele deixa de ser necessário
+    def checkpoint(self):
+        self.commit()
+        if self.book is None or self.snapshot_path is None:
+            return
+        write_snapshot(self.book, self.snapshot_path, self.seq)
+        os.ftruncate(self._fd, 0)
+        self._since_snapshot = 0
+
+    def close(self):
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.join()
+        self.commit()
+        os.close(self._fd)
+
+def _fdatasync(fd: int):
+    if hasattr(os, "fdatasync"):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)
+
+# Percorre os registros íntegros do journal: (fim do quadro, seq, op, argumentos).
+# Para no primeiro quadro truncado ou corrompido (cauda de uma escrita interrompida)
+def _iter_records(data) -> Iterator[Tuple[int, int, int, tuple]]:
+    offset = 0
+    end = len(data)
+    frame_size = _FRAME.size
+    while offset + frame_size <= end:
+        size, crc, seq = _FRAME.unpack_from(data, offset)
+        start = offset + frame_size
+        stop = start + size
+        if stop > end or zlib.crc32(data[start:stop]) != crc:
+            return
+        records = []
+        pos = start
+        while pos < stop:
+            record = _RECORDS.get(data[pos])
+            if record is None or pos + record.size > stop:
+                return
+            records.append(record.unpack_from(data, pos))
+            pos += record.size
+        for op, *args in records:
+            yield stop, seq, op, args
+            seq += 1
+        offset = stop
+
+# Lê os comandos íntegros de um arquivo de journal: (seq, op, argumentos)
+def read_journal(path: str) -> Iterator[Tuple[int, int, tuple]]:
+    with open(path, "rb") as f:
+        data = f.read()
+    for _, seq, op, args in _iter_records(data):
+        yield seq, op, args
+
+# Reaplica um comando do journal no livro
+def apply_record(book: OrderBook, op: int, args):
+    if op == OP_LIMIT:
+        book.handle_limit(Side(args[0]), args[1], args[2])
+    elif op == OP_MARKET:
+        book.handle_market(Side(args[0]), args[1])
+    elif op == OP_PEG:
+        reference, side, qty = args
+        book.handle_peg(
+            None if reference == _NO_ENUM else Peg(reference),
+            None if side == _NO_ENUM else Side(side),
+            qty,
+        )
+    elif op == OP_MODIFY:
+        book.modify_order(args[0] or None, args[1], args[2])
+    elif op == OP_MODIFY_QTY:
+        book.modify_order_qty_only(args[0] or None, args[1])
+    elif op == OP_CANCEL:
+        book.cancel_order(args[0] or None)
+    elif op == OP_STOP:
+        book.handle_stop(Side(args[0]), args[1], args[2])
+    elif op == OP_STOP_LIMIT:
+        book.handle_stop(Side(args[0]), args[1], args[2], args[3])
+    elif op == OP_AUCTION_START:
+        book.start_auction()
+    elif op == OP_AUCTION_UNCROSS:
+        book.uncross_auction()
+    elif op == OP_LIMIT_TIF:
+        side, price, qty, tif, expires = args
+        tif = TimeInForce(tif)
+        book.handle_limit(Side(side), price, qty, tif, expires if tif == TimeInForce.GTD else None)
+    elif op == OP_TIME:
+        book.advance_time(args[0])
+    elif op == OP_OWNER:
+        book.set_owner(_owner_text(args[0]))
+    elif op == OP_CANCEL_ALL:
+        owner, side = args
+        book.cancel_all(_owner_text(owner), None if side == _NO_ENUM else Side(side))
+    elif op == OP_STOP_REJECTED:
+        # Aplicado pelo _ReplayedRisk de recover quando a stop dispara
+        pass
+    else:
+        raise ValueError(f"operação desconhecida no journal: {op}")
+
+def _padding(size: int) -> bytes:
+    return b"\0" * (-size % _ALIGN)
+
+def _pack_column(typecode: str, values) -> bytes:
+    column = array(typecode, values)
+    if _BIG_ENDIAN:
+        column.byteswap()
+    return column.tobytes()
+
+# Colunas de um lado do livro; percorrê-lo materializa o preço das pegged
+def _pack_side(side) -> Tuple[int, bytes]:
+    orders = list(side)
+    data = b"".join((
+        _pack_column("q", [o.id for o in orders]),
+        _pack_column("q", [o.ts for o in orders]),
+        _pack_column("q", [o.price for o in orders]),
+        _pack_column("q", [o.qty for o in orders]),
+        _pack_column("B", [o.order_type for o in orders]),
+        _pack_column("B", [o.pegged for o in orders]),
+    ))
+    return len(orders), data + _padding(len(data))
+
+# Último preço e colunas das stops em repouso
+def _pack_stops(book: OrderBook) -> bytes:
+    stops = list(book.stops)
+    last = book.last_price
+    return b"".join((
+        _SNAP_STOPS.pack(last is not None, last or 0, len(stops)),
+        _pack_column("q", [s.id for s in stops]),
+        _pack_column("q", [s.ts for s in stops]),
+        _pack_column("q", [s.stop_price for s in stops]),
+        _pack_column("q", [s.qty for s in stops]),
+        _pack_column("q", [s.limit_price or 0 for s in stops]),
+        _pack_column("B", [s.side for s in stops]),
+        _pack_column("B", [s.limit_price is not None for s in stops]),
+    ))
+
+# Estado do leilão: fila de ordens a mercado por lado
+def _pack_auction(book: OrderBook) -> bytes:
+    state = book.auction
+    buys = state.market_buys if state is not None else []
+    sells = state.market_sells if state is not None else []
+    return b"".join((
+        _SNAP_AUCTION.pack(state is not None, len(buys), len(sells)),
+        _pack_column("q", [value for ts, qty, _ in buys for value in (ts, qty)]),
+        _pack_column("q", [value for ts, qty, _ in sells for value in (ts, qty)]),
+    ))
+
+# Carrega o leilão em andamento; retorna os bytes consumidos
+def _load_auction(book: OrderBook, view) -> int:
+    in_auction, n_buys, n_sells = _SNAP_AUCTION.unpack_from(view)
+    size = _SNAP_AUCTION.size + 16 * (n_buys + n_sells)
+    if in_auction:
+        from auction import AuctionState
+
+        pairs = _column(view[_SNAP_AUCTION.size:size], "q")
+        # Os donos vêm depois, com os participantes (versão 7)
+        book.auction = AuctionState(
+            [(pairs[2 * k], pairs[2 * k + 1], None) for k in range(n_buys)],
+            [(pairs[2 * k], pairs[2 * k + 1], None) for k in range(n_buys, n_buys + n_sells)],
+        )
+    return size
+
+# Tempo lógico e prazos das ordens GTD
+def _pack_timers(book: OrderBook) -> bytes:
+    items = book.expiries.items()
+    return b"".join((
+        _SNAP_TIMERS.pack(book.expiries.now, len(items)),
+        _pack_column("q", [order_id for order_id, _ in items]),
+        _pack_column("q", [deadline for _, deadline in items]),
+    ))
+
+# Carrega o tempo e os prazos; retorna os bytes consumidos
+def _load_timers(book: OrderBook, view) -> int:
+    now, n = _SNAP_TIMERS.unpack_from(view)
+    book.expiries.now = now
+    view = view[_SNAP_TIMERS.size:]
+    add = book.expiries.add
+    for order_id, deadline in zip(_column(view[:8 * n], "q"), _column(view[8 * n:16 * n], "q")):
+        add(order_id, deadline)
+    return _SNAP_TIMERS.size + 16 * n
+
+# Participante atual e dono de cada ordem e stop, na ordem em que o livro as
+# percorre, e de cada ordem a mercado da fila do leilão
+def _pack_owners(book: OrderBook) -> bytes:
+    index = {}
+    items = [o.owner for o in book.buys] + [o.owner for o in book.sells] + [s.owner for s in book.stops]
+    if book.auction is not None:
+        items += [owner for _, _, owner in book.auction.market_buys + book.auction.market_sells]
+    columns = [0 if owner is None else index.setdefault(owner, len(index) + 1) for owner in items]
+    current = 0 if book.owner is None else index.setdefault(book.owner, len(index) + 1)
+    names = "\n".join(index).encode("utf-8")
+    return b"".join((
+        _SNAP_OWNERS.pack(current, len(index), len(names)),
+        names,
+        _padding(len(names)),
+        _pack_column("I", columns),
+    ))
+
+def _load_owners(book: OrderBook, view, version: int):
+    current, n_names, names_len = _SNAP_OWNERS.unpack_from(view)
+    offset = _SNAP_OWNERS.size
+    names = (None,)
+    if n_names:
+        names += tuple(bytes(view[offset:offset + names_len]).decode("utf-8").split("\n"))
+    offset += names_len + (-names_len % _ALIGN)
+    book.owner = names[current]
+    items = list(book.buys) + list(book.sells) + list(book.stops)
+    state = book.auction
+    markets = [] if state is None or version < 7 else state.market_buys + state.market_sells
+    column = _column(view[offset:offset + 4 * (len(items) + len(markets))], "I")
+    owned = []
+    for item, k in zip(items, column):
+        if k:
+            item.owner = names[k]
+            owned.append(item)
+    if markets:
+        owners = [names[k] for k in column[len(items):]]
+        n_buys = len(state.market_buys)
+        state.market_buys = [(ts, qty, owner) for (ts, qty, _), owner in zip(state.market_buys, owners)]
+        state.market_sells = [(ts, qty, owner) for (ts, qty, _), owner in zip(state.market_sells, owners[n_buys:])]
+    # O índice fica em ordem de entrada (ids crescentes), como no livro original
+    owned.sort(key=lambda item: item.id)
+    own = book._own
+    for item in owned:
+        own(item.owner, item.side, item.id)
+
+# Carrega o último preço e as stops; retorna os bytes consumidos
+def _load_stops(book: OrderBook, view) -> int:
+    from stops import StopOrder
+
+    has_last, last, n = _SNAP_STOPS.unpack_from(view)
+    if has_last:
+        book.last_price = last
+    view = view[_SNAP_STOPS.size:]
+    w = 8 * n
+    columns = [_column(view[k * w:(k + 1) * w], "q") for k in range(5)]
+    sides = view[5 * w:5 * w + n]
+    has_limit = view[5 * w + n:5 * w + 2 * n]
+    add = book.stops.add
+    for order_id, ts, stop_price, qty, limit_price, side, limited in zip(*columns, sides, has_limit):
+        add(StopOrder(Side(side), qty, stop_price, limit_price if limited else None, ts, order_id))
+    size = _SNAP_STOPS.size + 5 * w + 2 * n
+    return size + (-size % _ALIGN)
+
+# Grava o livro inteiro (ordens, contadores, pegged e ordens retidas) de forma
+# atômica: arquivo temporário + fsync + rename
+def write_snapshot(book: OrderBook, path: str, seq: int):
+    n_buys, buys = _pack_side(book.buys)
+    n_sells, sells = _pack_side(book.sells)
+    terminated = list(book.terminated.items())
+    tick = str(book.ticks).encode("ascii")
+    header = _SNAP_HEADER.pack(
+        _SNAP_MAGIC, _SNAP_VERSION, seq, book._ts_counter, book._id_counter,
+        n_buys, n_sells, len(terminated), book.terminated.capacity, len(tick),
+    )
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(tick)
+        f.write(_padding(len(header) + len(tick)))
+        f.write(buys)
+        f.write(sells)
+        f.write(_pack_column("q", [order_id for order_id, _ in terminated]))
+        f.write(_pack_column("B", [status for _, status in terminated]))
+        f.write(_padding(len(terminated)))
+        stops = _pack_stops(book)
+        f.write(stops)
+        f.write(_padding(len(stops)))
+        f.write(_pack_auction(book))
+        f.write(_pack_timers(book))
+        f.write(_pack_owners(book))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+# Coluna lida do mmap; só copia se a máquina não for little-endian
+def _column(view, typecode: str):
+    column = view.cast(typecode)
+    if _BIG_ENDIAN:
+        column = array(typecode, column)
+        column.byteswap()
+    return column
+
+# Monta as ordens de um lado a partir das colunas; retorna os bytes consumidos
+def _load_side(side, side_enum: Side, view, n: int, by_id: dict) -> int:
+    w = 8 * n
+    # Uma lista só de ids serve às ordens e ao índice, sem criar os ints duas vezes
+    ids = list(_column(view[0:w], "q"))
+    orders = list(map(
+        Order,
+        map(_ORDER_TYPES.__getitem__, view[4 * w:4 * w + n]),
+        repeat(side_enum, n),
+        _column(view[3 * w:4 * w], "q"),
+        _column(view[2 * w:3 * w], "q"),
+        _column(view[w:2 * w], "q"),
+        ids,
+        map(_PEGS.__getitem__, view[4 * w + n:4 * w + 2 * n]),
+    ))
+    side.load(orders)
+    by_id.update(zip(ids, orders))
+    size = 4 * w + 2 * n
+    return size + (-size % _ALIGN)
+
+# Carrega um snapshot (leitura via mmap) num livro novo; retorna (livro, seq)
+def load_snapshot(path: str, **book_kwargs) -> Tuple[OrderBook, int]:
+    # Milhões de objetos novos disparariam o GC cíclico várias vezes sem achar lixo
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _load_snapshot(path, memoryview(mm), book_kwargs)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def _load_snapshot(path: str, view, book_kwargs: dict) -> Tuple[OrderBook, int]:
+    (magic, version, seq, ts_counter, id_counter,
+     n_buys, n_sells, n_terminated, capacity, tick_len) = _SNAP_HEADER.unpack_from(view)
+    if magic != _SNAP_MAGIC or version not in _SNAP_VERSIONS:
+        raise ValueError(f"snapshot inválido: {path}")
+    offset = _SNAP_HEADER.size
+    tick = bytes(view[offset:offset + tick_len]).decode("ascii")
+    offset += tick_len
+    offset += -offset % _ALIGN
+
+    requested = book_kwargs.pop("tick_size", None)
+    if requested is not None and str(OrderBook(tick_size=requested).ticks) != tick:
+        raise ValueError(f"tick do snapshot ({tick}) difere do pedido ({requested})")
+    book_kwargs.setdefault("retain", capacity)
+    book = OrderBook(tick_size=tick, **book_kwargs)
+    book._ts_counter = ts_counter
+    book._id_counter = id_counter
+
+    offset += _load_side(book.buys, Side.BUY, view[offset:], n_buys, book.orders_by_id)
+    offset += _load_side(book.sells, Side.SELL, view[offset:], n_sells, book.orders_by_id)
+
+    ids = _column(view[offset:offset + 8 * n_terminated], "q")
+    statuses = view[offset + 8 * n_terminated:offset + 9 * n_terminated]
+    add = book.terminated.add
+    for order_id, status in zip(ids, statuses):
+        add(order_id, status)
+    if version >= 3:
+        offset += 9 * n_terminated
+        offset += -offset % _ALIGN
+        offset += _load_stops(book, view[offset:])
+    if version >= 4:
+        offset += _load_auction(book, view[offset:])
+    if version >= 5:
+        offset += _load_timers(book, view[offset:])
+    if version >= 6:
+        _load_owners(book, view[offset:], version)
+    return book, seq
+
+# Na recuperação, faz o papel do estágio de risco só para barrar de novo as
+# stops disparadas que ele barrou (os limites não estão no journal)
+class _ReplayedRisk:
+    def __init__(self, rejected: dict):
+        self.rejected = rejected
+
+    def check_triggered(self, stop):
+        return self.rejected.get(stop.id)
+
+    def fill(self, owner, side, qty):
+        pass
+
+    def check(self, book):
+        pass
+
+# Reconstrói o livro do diretório: snapshot (se houver) + cauda do journal.
+# A cauda corrompida de uma escrita interrompida é descartada do arquivo.
+# Eventos da reaplicação não são emitidos; o sink pedido é ligado ao final.
+def recover(directory: str, **book_kwargs) -> Tuple[OrderBook, int]:
+    from sinks import NullSink, TextSink
+
+    sink = book_kwargs.pop("sink", None)
+    snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+    journal_path = os.path.join(directory, JOURNAL_FILE)
+
+    if os.path.exists(snapshot_path):
+        book, seq = load_snapshot(snapshot_path, sink=NullSink(), **book_kwargs)
+    else:
+        book, seq = OrderBook(sink=NullSink(), **book_kwargs), 0
+
+    if os.path.exists(journal_path):
+        with open(journal_path, "rb") as f:
+            data = f.read()
+        rejected = {
+            args[0]: _RISK_REASONS[args[1]]
+            for _, record_seq, op, args in _iter_records(data)
+            if op == OP_STOP_REJECTED and record_seq > seq
+        }
+        if rejected:
+            book.risk = _ReplayedRisk(rejected)
+        valid = 0
+        for valid, record_seq, op, args in _iter_records(data):
+            if record_seq > seq:
+                apply_record(book, op, args)
+                seq = record_seq
+        book.risk = None
+        if valid < len(data):
+            os.truncate(journal_path, valid)
+
+    book.sink = sink if sink is not None else TextSink()
+    book.sink.bind(book.ticks)
+    return book, seq
+
+# Livro persistente no diretório: recupera o estado e passa a registrar os comandos
+def open_book(
+    directory: str,
+    group_size: int = DEFAULT_GROUP_SIZE,
+    group_interval: float = DEFAULT_GROUP_INTERVAL,
+    fsync: bool = True,
+    snapshot_every: int = 0,
+    **book_kwargs,
+) -> OrderBook:
+    os.makedirs(directory, exist_ok=True)
+    book, seq = recover(directory, **book_kwargs)
+    journal = Journal(
+        os.path.join(directory, JOURNAL_FILE),
+        seq=seq,
+        group_size=group_size,
+        group_interval=group_interval,
+        fsync=fsync,
+        snapshot_path=os.path.join(directory, SNAPSHOT_FILE),
+        snapshot_every=snapshot_every,
+    )
+    book.attach_journal(journal)
+    return book
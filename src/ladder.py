@@ -0,0 +1,347 @@
+# src/ladder.py
+from bisect import insort
+from itertools import islice
+from typing import Dict, List, Optional, Set, Tuple
+from book import Order, Peg
+
+# Níveis vazios tolerados no índice antes de uma compactação
+_COMPACT_MIN_EMPTY = 64
+
+# Nível de preço: fila FIFO intrusiva (prev/next nas ordens), ordenada por ts,
+# com a quantidade total e o número de ordens agregados
+class _Level:
+    __slots__ = ("price", "head", "tail", "count", "qty")
+
+    def __init__(self, price: Optional[int]):
+        self.price = price
+        self.head: Optional[Order] = None
+        self.tail: Optional[Order] = None
+        self.count = 0
+        self.qty = 0
+
+    def __iter__(self):
+        o = self.head
+        while o is not None:
+            yield o
+            o = o.next
+
+    # Enfileira a ordem respeitando o ts (append no caso comum)
+    def push(self, order: Order):
+        after = self.tail
+        while after is not None and after.ts > order.ts:
+            after = after.prev
+        before = self.head if after is None else after.next
+        order.prev = after
+        order.next = before
+        if after is None:
+            self.head = order
+        else:
+            after.next = order
+        if before is None:
+            self.tail = order
+        else:
+            before.prev = order
+        order.level = self
+        self.count += 1
+        self.qty += order.qty
+
+    # Desliga a ordem da fila em O(1) usando seus próprios ponteiros
+    def unlink(self, order: Order):
+        prev = order.prev
+        nxt = order.next
+        if prev is None:
+            self.head = nxt
+        else:
+            prev.next = nxt
+        if nxt is None:
+            self.tail = prev
+        else:
+            nxt.prev = prev
+        order.prev = order.next = order.level = None
+        self.count -= 1
+        self.qty -= order.qty
+
+# Intercala por ts as ordens de um nível com as pegged presas ao mesmo preço
+def _merge(level: _Level, pool: _Level):
+    a = level.head
+    b = pool.head
+    price = pool.price
+    while a is not None or b is not None:
+        if b is None or (a is not None and a.ts < b.ts):
+            yield a
+            a = a.next
+        else:
+            b.price = price
+            yield b
+            b = b.next
+
+# Lado do livro em escada de níveis de preço indexados por bisect
+class LadderSide:
+    # Inicializa um lado vazio (compra ou venda)
+    def __init__(self, is_buy: bool):
+        self.is_buy = is_buy
+        # Chaves crescentes com o melhor preço no fim: preço na compra, -preço na venda
+        self._keys: List[int] = []
+        # Os níveis guardam só ordens não pegged, então o topo é sempre o melhor preço
+        self._levels: Dict[int, _Level] = {}
+        # Níveis que esvaziaram fora do topo e seguem no índice até a compactação
+        self._empty = 0
+        # Pool das ordens pegged em ordem de ts; seu preço é a referência atual
+        self._pegged = _Level(None)
+        self._count = 0
+        # Preços de níveis alterados desde a última publicação do feed de profundidade
+        self.dirty: Optional[Set[int]] = None
+
+    # Percorre o lado em prioridade preço-tempo, encaixando o pool pegged no seu preço
+    def __iter__(self):
+        levels = self._levels
+        pool = self._pegged
+        if pool.count == 0:
+            for key in reversed(self._keys):
+                yield from levels[key]
+            return
+        ref = self._key(pool.price)
+        pending = True
+        for key in reversed(self._keys):
+            if pending and key <= ref:
+                pending = False
+                if key == ref:
+                    yield from _merge(levels[key], pool)
+                    continue
+                yield from self._pool_orders()
+            yield from levels[key]
+        if pending:
+            yield from self._pool_orders()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _key(self, price: int) -> int:
+        return price if self.is_buy else -price
+
+    # Percorre o pool pegged materializando o preço de referência nas ordens
+    def _pool_orders(self):
+        pool = self._pegged
+        price = pool.price
+        for o in pool:
+            o.price = price
+            yield o
+
+    # Retorna o preço efetivo de uma ordem (a referência, se ela está no pool)
+    def price_of(self, order: Order) -> Optional[int]:
+        level = order.level
+        return order.price if level is None else level.price
+
+    # Insere a ordem no nível do seu preço (ou no pool, se pegged)
+    def insert(self, order: Order):
+        self._count += 1
+        if order.pegged:
+            pool = self._pegged
+            if pool.count == 0:
+                pool.price = order.price
+            pool.push(order)
+            if self.dirty is not None:
+                self.dirty.add(pool.price)
+            return
+        key = self._key(order.price)
+        level = self._levels.get(key)
+        if level is None:
+            level = _Level(order.price)
+            self._levels[key] = level
+            insort(self._keys, key)
+        elif level.count == 0:
+            self._empty -= 1
+        # Compartilha o int do preço do nível em vez de manter um por ordem
+        order.price = level.price
+        level.push(order)
+        if self.dirty is not None:
+            self.dirty.add(level.price)
+
+    # Carrega um lado vazio com ordens já em prioridade preço-tempo (snapshot);
+    # dentro de cada nível elas chegam em ordem de ts, então basta encadear no fim
+    def load(self, orders):
+        levels = self._levels
+        pool = self._pegged
+        keys = []
+        level = None
+        price = None
+        tail = None
+        for o in orders:
+            if o.pegged:
+                pool.price = o.price
+                pool.push(o)
+                continue
+            if o.price != price:
+                if level is not None:
+                    level.tail = tail
+                price = o.price
+                level = _Level(price)
+                key = price if self.is_buy else -price
+                levels[key] = level
+                keys.append(key)
+                level.head = o
+                tail = None
+            else:
+                tail.next = o
+            o.prev = tail
+            o.price = price
+            o.level = level
+            level.count += 1
+            level.qty += o.qty
+            tail = o
+        if level is not None:
+            level.tail = tail
+        # Chegam do melhor para o pior; o índice guarda o melhor no fim
+        keys.reverse()
+        self._keys = keys
+        self._count = len(orders)
+
+    # Retira do topo do índice os níveis vazios
+    def _trim(self):
+        keys = self._keys
+        levels = self._levels
+        while keys and levels[keys[-1]].count == 0:
+            del levels[keys.pop()]
+            self._empty -= 1
+
+    # Reconstrói o índice sem os níveis vazios acumulados
+    def _compact(self):
+        levels = self._levels
+        kept = []
+        for key in self._keys:
+            if levels[key].count:
+                kept.append(key)
+            else:
+                del levels[key]
+        self._keys = kept
+        self._empty = 0
+
+    # Remove uma ordem específica em O(1); retorna False se ela não está no livro
+    def remove(self, order: Order) -> bool:
+        level = order.level
+        if level is None:
+            return False
+        self._count -= 1
+        if self.dirty is not None:
+            self.dirty.add(level.price)
+        if level is self._pegged:
+            order.price = level.price
+            level.unlink(order)
+            return True
+        level.unlink(order)
+        if level.count == 0:
+            self._empty += 1
+            if self._levels[self._keys[-1]] is level:
+                self._trim()
+            elif self._empty > _COMPACT_MIN_EMPTY and self._empty * 2 > len(self._keys):
+                self._compact()
+        return True
+
+    # Altera a quantidade de uma ordem em repouso mantendo o agregado do nível
+    def set_qty(self, order: Order, qty: int):
+        level = order.level
+        if level is not None:
+            level.qty += qty - order.qty
+            if self.dirty is not None:
+                self.dirty.add(level.price)
+        order.qty = qty
+
+    # Quantidade total e número de ordens no preço (pegged presas a ele incluídas)
+    def level_at(self, price: int) -> Tuple[int, int]:
+        level = self._levels.get(self._key(price))
+        qty, count = (level.qty, level.count) if level is not None else (0, 0)
+        pool = self._pegged
+        if pool.count and pool.price == price:
+            qty += pool.qty
+            count += pool.count
+        return qty, count
+
+    # Quantidade executável contra este lado até limit_price (None = qualquer
+    # preço), parando ao alcançar qty: soma os agregados dos níveis percorridos
+    def executable(self, limit_price: Optional[int], qty: int) -> int:
+        total = 0
+        pool = self._pegged
+        bound = None if limit_price is None else self._key(limit_price)
+        if pool.count and (bound is None or self._key(pool.price) >= bound):
+            total = pool.qty
+        levels = self._levels
+        for key in reversed(self._keys):
+            if total >= qty or (bound is not None and key < bound):
+                break
+            total += levels[key].qty
+        return total
+
+    # Os n melhores níveis agregados (preço, qty total, nº de ordens), em O(n)
+    # mais os níveis vazios ainda não compactados pelo caminho
+    def depth(self, n: int) -> List[Tuple[int, int, int]]:
+        out = []
+        if n <= 0:
+            return out
+        levels = self._levels
+        pool = self._pegged
+        ref = self._key(pool.price) if pool.count else None
+        for key in reversed(self._keys):
+            level = levels[key]
+            if ref is not None and key <= ref:
+                if key == ref:
+                    out.append((pool.price, level.qty + pool.qty, level.count + pool.count))
+                    ref = None
+                    if len(out) >= n:
+                        break
+                    continue
+                out.append((pool.price, pool.qty, pool.count))
+                ref = None
+                if len(out) >= n:
+                    break
+            if level.count:
+                out.append((level.price, level.qty, level.count))
+                if len(out) >= n:
+                    break
+        if ref is not None and len(out) < n:
+            out.append((pool.price, pool.qty, pool.count))
+        return out
+
+    # Descarta as n primeiras ordens consumidas por uma varredura de matching em
+    # O(n): sem pegged, desliga direto da frente dos níveis do topo
+    def drop_front(self, n: int):
+        if self._pegged.count:
+            for o in list(islice(self, n)):
+                self.remove(o)
+            return
+        levels = self._levels
+        keys = self._keys
+        dirty = self.dirty
+        self._count -= n
+        while n:
+            level = levels[keys[-1]]
+            if dirty is not None:
+                dirty.add(level.price)
+            while n and level.head is not None:
+                level.unlink(level.head)
+                n -= 1
+            if level.count == 0:
+                self._empty += 1
+                self._trim()
+
+    # Retorna o melhor preço não pegged em O(1): o preço do nível do topo
+    def best_price(self, peg: Peg) -> Optional[int]:
+        keys = self._keys
+        return self._levels[keys[-1]].price if keys else None
+
+    # Esvazia o pool pegged, devolvendo as ordens em ordem de ts
+    def remove_pegged(self, peg: Peg) -> List[Order]:
+        if self.dirty is not None and self._pegged.count:
+            self.dirty.add(self._pegged.price)
+        removed = list(self._pool_orders())
+        for o in removed:
+            self._pegged.unlink(o)
+        self._count -= len(removed)
+        return removed
+
+    # Prende o pool pegged ao novo preço de referência em O(1)
+    def reprice_pegged(self, peg: Peg, price: int):
+        pool = self._pegged
+        if self.dirty is not None and pool.count and pool.price != price:
+            self.dirty.add(pool.price)
+            self.dirty.add(price)
+        pool.price = price
@@ -1,191 +1,251 @@
 # src/limit.py
-from typing import Optional
-from book import Order
+from typing import List, Optional
+from book import Order, OrderType, Side, TimeInForce
+from retention import FILLED, CANCELLED
+from sweep import sweep
+from events import (
+    OrderAccepted,
+    OrderModified,
+    OrderFilled,
+    OrderCancelled,
+    OrderRejected,
+    OrderKilled,
+    MassCancelled,
+    CANCEL_QTY_CHANGE,
+    CANCEL_EXPIRED,
+    CANCEL_MASS,
+    REJECT_NOT_ACTIVE,
+    REJECT_IS_PEGGED,
+    REJECT_EXPIRED,
+    REJECT_NO_OWNER,
+)
 
-# Insere ordem de compra na lista mantendo ordenação
+# Insere ordem de compra no livro mantendo ordenação
 def add_buy_limit(book, order: Order):
-    i = 0
-    while i < len(book.buys):
-        o = book.buys[i]
+    book.buys.insert(order)
 
-        if order.price > o.price:
-            break
-        if order.price < o.price:
-            i += 1
-            continue
-        if order.ts < o.ts:
-            break
-        i += 1
-    book.buys.insert(i, order)
-
-# Insere ordem de venda na lista mantendo ordenação
+# Insere ordem de venda no livro mantendo ordenação
 def add_sell_limit(book, order: Order):
-    i = 0
-    while i < len(book.sells):
-        o = book.sells[i]
-
-        if order.price < o.price:
-            break
-        if order.price > o.price:
-            i += 1
-            continue
-        if order.ts < o.ts:
-            break
-        i += 1
-    book.sells.insert(i, order)
-
-# Processa uma ordem limit de compra
-def match_limit_buy(book, price: float, qty: int, ts: int, existing_order: Optional[Order] = None):
-    i = 0
-    sells = book.sells
-    while qty > 0 and i < len(sells) and sells[i].price <= price:
-        best = sells[i]
-        trade_qty = min(qty, best.qty)
-        trade_price = best.price
-        print(f"Trade, price: {trade_price}, qty: {trade_qty}")
+    book.sells.insert(order)
 
-        qty -= trade_qty
-        best.qty -= trade_qty
-        if best.qty == 0:
-            i += 1
-        else:
-            break
-    if i > 0:
-        book.sells = sells[i:]
+# Processa uma ordem limit de compra; retorna a ordem nova que ficou no livro
+def match_limit_buy(
+    book, price: int, qty: int, ts: int, existing_order: Optional[Order] = None, order_id: Optional[int] = None
+) -> Optional[Order]:
+    emit = book.sink.emit
+    # Em leilão as ordens só se acumulam no livro, mesmo cruzadas
+    if book.auction is None:
+        # Uma ordem modificada negocia em nome do seu dono, não do participante corrente
+        owner = existing_order.owner if existing_order is not None else None
+        qty = sweep(book, book.sells, qty, price, True, owner)
     if qty > 0:
         if existing_order is None:
-            order_id = book._next_id()
+            if order_id is None:
+                order_id = book._next_id()
             new_order = Order(
-                order_type="limit",
-                side="buy",
+                order_type=OrderType.LIMIT,
+                side=Side.BUY,
                 qty=qty,
                 price=price,
                 ts=ts,
                 id=order_id,
+                owner=book.owner,
             )
             add_buy_limit(book, new_order)
             book.orders_by_id[order_id] = new_order
-            print(f"Order created: buy {qty} @ {price} {order_id}")
+            if book.owner is not None:
+                book._own(book.owner, Side.BUY, order_id)
+            emit(OrderAccepted(Side.BUY, qty, price, order_id))
+            return new_order
         else:
             existing_order.price = price
             existing_order.qty = qty
             existing_order.ts = ts
             add_buy_limit(book, existing_order)
-            print(f"Order modified: buy {qty} @ {price} {existing_order.id}")
+            emit(OrderModified(Side.BUY, qty, price, existing_order.id))
     else:
         if existing_order is not None:
-            book.orders_by_id.pop(existing_order.id, None)
-            print(f"Order fully filled: buy {price} {existing_order.id}")
-
-# Processa uma ordem limit de venda
-def match_limit_sell(book, price: float, qty: int, ts: int, existing_order: Optional[Order] = None):
-    i = 0
-    buys = book.buys
-    while qty > 0 and i < len(buys) and buys[i].price >= price:
-        best = buys[i]
-        trade_qty = min(qty, best.qty)
-        trade_price = best.price
-        print(f"Trade, price: {trade_price}, qty: {trade_qty}")
+            book._retire(existing_order, FILLED)
+            emit(OrderFilled(Side.BUY, price, existing_order.id))
+    return None
 
-        qty -= trade_qty
-        best.qty -= trade_qty
-        if best.qty == 0:
-            i += 1
-        else:
-            break
-    if i > 0:
-        book.buys = buys[i:]
+# Processa uma ordem limit de venda; retorna a ordem nova que ficou no livro
+def match_limit_sell(
+    book, price: int, qty: int, ts: int, existing_order: Optional[Order] = None, order_id: Optional[int] = None
+) -> Optional[Order]:
+    emit = book.sink.emit
+    # Em leilão as ordens só se acumulam no livro, mesmo cruzadas
+    if book.auction is None:
+        # Uma ordem modificada negocia em nome do seu dono, não do participante corrente
+        owner = existing_order.owner if existing_order is not None else None
+        qty = sweep(book, book.buys, qty, price, False, owner)
     if qty > 0:
         if existing_order is None:
-            order_id = book._next_id()
+            if order_id is None:
+                order_id = book._next_id()
             new_order = Order(
-                order_type="limit",
-                side="sell",
+                order_type=OrderType.LIMIT,
+                side=Side.SELL,
                 qty=qty,
                 price=price,
                 ts=ts,
                 id=order_id,
+                owner=book.owner,
             )
             add_sell_limit(book, new_order)
             book.orders_by_id[order_id] = new_order
-            print(f"Order created: sell {qty} @ {price} {order_id}")
+            if book.owner is not None:
+                book._own(book.owner, Side.SELL, order_id)
+            emit(OrderAccepted(Side.SELL, qty, price, order_id))
+            return new_order
         else:
             existing_order.price = price
             existing_order.qty = qty
             existing_order.ts = ts
             add_sell_limit(book, existing_order)
-            print(f"Order modified: sell {qty} @ {price} {existing_order.id}")
+            emit(OrderModified(Side.SELL, qty, price, existing_order.id))
     else:
         if existing_order is not None:
-            book.orders_by_id.pop(existing_order.id, None)
-            print(f"Order fully filled: sell {price} {existing_order.id}")
+            book._retire(existing_order, FILLED)
+            emit(OrderFilled(Side.SELL, price, existing_order.id))
+    return None
+
+# Processa uma ordem limit com validade diferente de GTC. IOC negocia o que puder
+# e descarta o resto; FOK confere antes, pelos níveis agregados do lado oposto,
+# se a quantidade inteira é executável até o preço, e senão é descartada sem
+# negociar; GTD entra como uma limit comum e, se ficar no livro, é agendada para
+# expirar em expires (precisa estar no futuro do tempo do livro)
+def match_limit_tif(
+    book, side: Side, price: int, qty: int, tif: TimeInForce, expires: Optional[int], ts: int
+):
+    is_buy = side == Side.BUY
+    if tif == TimeInForce.GTD:
+        if expires is None or expires <= book.expiries.now:
+            book.sink.emit(OrderRejected(REJECT_EXPIRED))
+            return
+        match = match_limit_buy if is_buy else match_limit_sell
+        order = match(book, price, qty, ts)
+        if order is not None:
+            book.expiries.add(order.id, expires)
+        return
+    resting = book.sells if is_buy else book.buys
+    # Em leilão nada negocia na entrada: a IOC e a FOK são descartadas inteiras
+    if book.auction is None:
+        if tif == TimeInForce.FOK and resting.executable(price, qty) < qty:
+            book.sink.emit(OrderKilled(side, qty, price, tif))
+            return
+        qty = sweep(book, resting, qty, price, is_buy)
+    if qty > 0:
+        book.sink.emit(OrderKilled(side, qty, price, tif))
+
+# Cancela as ordens GTD cujo prazo venceu, na ordem dada
+def expire_orders(book, order_ids: List[int]):
+    emit = book.sink.emit
+    for order_id in order_ids:
+        order = book.orders_by_id.get(order_id)
+        if order is None:
+            continue
+        book_side = book.buys if order.side == Side.BUY else book.sells
+        book_side.remove(order)
+        book._retire(order, CANCELLED)
+        emit(OrderCancelled(order_id, CANCEL_EXPIRED))
 
 # Cancela uma ordem limit ativa
-def cancel_order(book, order_id: str):
-    order = book.orders_by_id.pop(order_id, None)
+def cancel_order(book, order_id: Optional[int]):
+    order = book.orders_by_id.get(order_id)
     if order is None:
-        print("Order not found")
+        stop = book.stops.remove(order_id)
+        if stop is not None:
+            book.terminated.add(order_id, CANCELLED)
+            if stop.owner is not None:
+                book._disown(stop.owner, stop.side, order_id)
+            book.sink.emit(OrderCancelled(order_id))
+            return
+        book.sink.emit(OrderRejected(book._missing_reason(order_id), order_id))
         return
-    book_list = book.buys if order.side == "buy" else book.sells
-    for i, o in enumerate(book_list):
-        if o is order:
-            book_list.pop(i)
-            print("Order cancelled")
-            break
+    book._retire(order, CANCELLED)
+    book_side = book.buys if order.side == Side.BUY else book.sells
+    if book_side.remove(order):
+        book.sink.emit(OrderCancelled(order_id))
     else:
-        print("Order already filled or not active")
+        book.sink.emit(OrderRejected(REJECT_NOT_ACTIVE, order_id))
+
+# Cancela as ordens vivas e stops em repouso do participante, só de um lado
+# (side) ou dos dois, em ordem de entrada por lado: O(k) pelo índice do
+# participante, sem tocar no resto do livro; retorna quantas foram canceladas
+def cancel_all(book, owner: Optional[str], side: Optional[Side]) -> int:
+    emit = book.sink.emit
+    if owner is None:
+        emit(OrderRejected(REJECT_NO_OWNER))
+        return 0
+    sides = book.owned.get(owner)
+    count = 0
+    if sides is not None:
+        orders_by_id = book.orders_by_id
+        for order_side in (Side.BUY, Side.SELL) if side is None else (side,):
+            book_side = book.buys if order_side == Side.BUY else book.sells
+            for order_id in list(sides[order_side]):
+                order = orders_by_id.get(order_id)
+                if order is not None:
+                    book_side.remove(order)
+                    book._retire(order, CANCELLED)
+                else:
+                    book.stops.remove(order_id)
+                    book.terminated.add(order_id, CANCELLED)
+                    book._disown(owner, order_side, order_id)
+                emit(OrderCancelled(order_id, CANCEL_MASS))
+                count += 1
+    if book.auction is not None:
+        # Ordens a mercado na fila do leilão não têm id: entram só na contagem
+        import auction
+
+        count += auction.cancel_markets(book.auction, owner, side)
+    emit(MassCancelled(owner, side, count))
+    return count
 
 # Altera preço e quantidade de uma ordem limit existente
-def modify_order(book, order_id: str, new_price: float, new_qty: int):
+def modify_order(book, order_id: Optional[int], new_price: int, new_qty: int):
     order = book.orders_by_id.get(order_id)
     if order is None:
-        print("Order not found")
+        book.sink.emit(OrderRejected(book._missing_reason(order_id), order_id))
         return
-    if order.pegged is not None:
-        print("Ordem é pegged. Use: modify order <id> <qty> para alterar ordens pegged.")
+    if order.pegged:
+        book.sink.emit(OrderRejected(REJECT_IS_PEGGED, order_id))
         return
     old_price = order.price
     old_qty = order.qty
     side = order.side
     if new_qty <= 0:
-        book_list = book.buys if side == "buy" else book.sells
-        for i, o in enumerate(book_list):
-            if o is order:
-                book_list.pop(i)
-                break
-        book.orders_by_id.pop(order_id, None)
-        print("Order cancelled by qty change")
+        book_side = book.buys if side == Side.BUY else book.sells
+        book_side.remove(order)
+        book._retire(order, CANCELLED)
+        book.sink.emit(OrderCancelled(order_id, CANCEL_QTY_CHANGE))
         return
     if new_price == old_price:
         if new_qty <= old_qty:
-            order.qty = new_qty
-            print(f"Order modified: {side} {new_qty} @ {new_price} {order_id}")
+            book_side = book.buys if side == Side.BUY else book.sells
+            book_side.set_qty(order, new_qty)
+            book.sink.emit(OrderModified(side, new_qty, new_price, order_id))
             return
         else:
-            book_list = book.buys if side == "buy" else book.sells
-            for i, o in enumerate(book_list):
-                if o is order:
-                    book_list.pop(i)
-                    break
+            book_side = book.buys if side == Side.BUY else book.sells
+            book_side.remove(order)
 
             order.qty = new_qty
             order.ts = book._next_ts()
 
-            if side == "buy":
+            if side == Side.BUY:
                 add_buy_limit(book, order)
             else:
                 add_sell_limit(book, order)
 
-            print(f"Order modified: {side} {new_qty} @ {new_price} {order_id}")
+            book.sink.emit(OrderModified(side, new_qty, new_price, order_id))
             return
 
-    book_list = book.buys if side == "buy" else book.sells
-    for i, o in enumerate(book_list):
-        if o is order:
-            book_list.pop(i)
-            break
+    book_side = book.buys if side == Side.BUY else book.sells
+    book_side.remove(order)
     ts = book._next_ts()
-    if side == "buy":
+    if side == Side.BUY:
         match_limit_buy(book, new_price, new_qty, ts, existing_order=order)
     else:
         match_limit_sell(book, new_price, new_qty, ts, existing_order=order)
\ No newline at end of file
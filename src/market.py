@@ -1,38 +1,21 @@
 # src/market.py
+from book import Side
+from sweep import sweep
+
 # Processa uma ordem market de compra
 def match_market_buy(book, qty: int, ts: int):
-    i = 0
-    sells = book.sells 
-    while qty > 0 and i < len(sells):
-        best = sells[i]
-        trade_qty = min(qty, best.qty)
-        trade_price = best.price
-        print(f"Trade, price: {trade_price}, qty: {trade_qty}")
+    if book.auction is not None:
+        import auction
 
-        qty -= trade_qty
-        best.qty -= trade_qty
-        if best.qty == 0:
-            i += 1
-        else:
-            break
-    if i > 0:
-        book.sells = sells[i:]
+        auction.queue_market(book, Side.BUY, qty, ts)
+        return
+    sweep(book, book.sells, qty, None, True)
 
 # Processa uma ordem market de venda
 def match_market_sell(book, qty: int, ts: int):
-    i = 0
-    buys = book.buys  
-    while qty > 0 and i < len(buys):
-        best = buys[i]
-        trade_qty = min(qty, best.qty)
-        trade_price = best.price
-        print(f"Trade, price: {trade_price}, qty: {trade_qty}")
+    if book.auction is not None:
+        import auction
 
-        qty -= trade_qty
-        best.qty -= trade_qty
-        if best.qty == 0:
-            i += 1
-        else:
-            break
-    if i > 0:
-        book.buys = buys[i:]
+        auction.queue_market(book, Side.SELL, qty, ts)
+        return
+    sweep(book, book.buys, qty, None, False)
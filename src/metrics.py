@@ -0,0 +1,366 @@
+# src/metrics.py
+# Instrumentação do motor: latência por operação e por fase em histogramas de
+# tamanho fixo, contadores de negócios/níveis/ordens por chamada e perfil
+# (cProfile) de uma janela de comandos. Nada disso existe num livro sem
+# book.enable_metrics(): os wrappers são instalados no próprio livro (atributos
+# de instância por cima dos métodos) e removidos em disable_metrics().
+import cProfile
+import io
+import json
+import pstats
+from time import perf_counter_ns
+from typing import Dict, List, Optional
+
+from events import Trade
+
+# Precisão dos histogramas: 2^SUB_BITS baldes por potência de 2 (erro < 1/64)
+SUB_BITS = 6
+# Maior valor distinguível (~18 min em ns); acima disso cai no último balde
+MAX_BITS = 40
+_SUB = 1 << SUB_BITS
+_EXACT = 2 * _SUB
+_BUCKETS = ((MAX_BITS - SUB_BITS) << SUB_BITS) + _EXACT
+_MAX_VALUE = (1 << MAX_BITS) - 1
+
+# Operações do livro medidas (nome exibido, método do OrderBook)
+OPS = (
+    ("limit", "handle_limit"),
+    ("market", "handle_market"),
+    ("peg", "handle_peg"),
+    ("stop", "handle_stop"),
+    ("modify", "modify_order"),
+    ("modify_qty", "modify_order_qty_only"),
+    ("cancel", "cancel_order"),
+    ("batch", "submit_batch"),
+    ("auction_start", "start_auction"),
+    ("auction_uncross", "uncross_auction"),
+    ("time", "advance_time"),
+)
+
+# Fases internas; podem se aninhar (match inclui o insert do resto e a saída dos
+# seus eventos, stops inclui o match das stops disparadas)
+PHASES = ("parse", "match", "insert", "pegged", "stops", "output")
+
+# Histograma log-linear (estilo HDR): valores < 2^(SUB_BITS+1) exatos, acima
+# disso baldes de largura 2^e dentro de cada potência de 2. Tamanho fixo,
+# registro O(1) sem alocação
+class Histogram:
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = _MAX_VALUE
+        self.max = 0
+
+    def record(self, value: int):
+        if value < _EXACT:
+            if value < 0:
+                value = 0
+            index = value
+        else:
+            if value > _MAX_VALUE:
+                value = _MAX_VALUE
+            e = value.bit_length() - SUB_BITS - 1
+            index = (e << SUB_BITS) + (value >> e)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if value < self.min:
+            self.min = value
+
+    # Maior valor equivalente ao balde que contém o quantil q (0..1)
+    def percentile(self, q: float) -> int:
+        if self.count == 0:
+            return 0
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                e = max(0, (index >> SUB_BITS) - 1)
+                high = ((index - (e << SUB_BITS)) << e) + (1 << e) - 1
+                return min(high, self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": round(self.mean(), 1),
+            "min": self.min if self.count else 0,
+            "p50": self.percentile(0.50),
+            "p99": self.percentile(0.99),
+            "p999": self.percentile(0.999),
+            "max": self.max,
+        }
+
+# Sink do livro com métricas: mede a fase de saída e conta os negócios de cada chamada
+class _MeteredSink:
+    def __init__(self, inner, metrics: "Metrics"):
+        self.inner = inner
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def emit(self, event):
+        metrics = self.metrics
+        if type(event) is Trade:
+            metrics.trades += 1
+            metrics.traded_qty += event.qty
+            if event.price != metrics._last_price:
+                metrics.levels += 1
+                metrics._last_price = event.price
+        t0 = perf_counter_ns()
+        self.inner.emit(event)
+        metrics.phases["output"].record(perf_counter_ns() - t0)
+
+    def write(self, text: str):
+        t0 = perf_counter_ns()
+        self.inner.write(text)
+        self.metrics.phases["output"].record(perf_counter_ns() - t0)
+
+# Métricas de um livro
+class Metrics:
+    def __init__(self):
+        self.ops: Dict[str, Histogram] = {name: Histogram() for name, _ in OPS}
+        self.phases: Dict[str, Histogram] = {name: Histogram() for name in PHASES}
+        # Por chamada de operação: negócios, níveis de preço percorridos e ordens
+        # em repouso examinadas pelo matching
+        self.per_call: Dict[str, Histogram] = {name: Histogram() for name in ("trades", "levels", "scanned")}
+        self.trades = 0
+        self.traded_qty = 0
+        self.levels = 0
+        self.scanned = 0
+        self._last_price: Optional[int] = None
+        # Profundidade de chamadas de operação (só a de fora é medida) e tempo
+        # gasto dentro delas, para separar o parse feito pelo app
+        self._depth = 0
+        self.busy_ns = 0
+        self._profile: Optional[cProfile.Profile] = None
+        self._profile_left = 0
+        self._profile_done = None
+        self._book = None
+        self._sink = None
+        self._proxy = None
+        # (objeto, atributo, wrapper, valor anterior no __dict__ ou None)
+        self._wrapped = []
+
+    # Passa a medir o livro: troca o sink e cobre os métodos medidos
+    def attach(self, book):
+        _install_hooks()
+        self._book = book
+        self._sink = book.sink
+        book.sink = self._proxy = _MeteredSink(book.sink, self)
+        for name, method in OPS:
+            self._wrap(book, method, self._timed_op(name, getattr(book, method)))
+        self._wrap(book, "_run_stops", self._timed_phase("stops", book._run_stops))
+        for side in (book.buys, book.sells):
+            self._wrap(side, "insert", self._timed_phase("insert", side.insert))
+
+    def _wrap(self, obj, name: str, wrapper):
+        self._wrapped.append((obj, name, wrapper, obj.__dict__.get(name)))
+        setattr(obj, name, wrapper)
+
+    # Desfaz attach, devolvendo o livro ao caminho sem instrumentação
+    def detach(self):
+        book = self._book
+        if book is None:
+            return
+        self.stop_profile()
+        # Se outro destino foi encaixado por cima depois, o proxy fica na cadeia
+        if book.sink is self._proxy:
+            book.sink = self._sink
+        # Idem para os métodos cobertos depois por outra camada (ex.: risk): o
+        # wrapper fica, mas só repassa a chamada
+        for obj, name, wrapper, previous in reversed(self._wrapped):
+            if obj.__dict__.get(name) is wrapper:
+                if previous is None:
+                    del obj.__dict__[name]
+                else:
+                    obj.__dict__[name] = previous
+        self._wrapped = []
+        self._book = None
+
+    def _timed_op(self, name: str, method):
+        hist = self.ops[name]
+        trades_hist = self.per_call["trades"]
+        levels_hist = self.per_call["levels"]
+        scanned_hist = self.per_call["scanned"]
+
+        def timed(*args, **kwargs):
+            if self._depth or self._book is None:
+                return method(*args, **kwargs)
+            self._depth = 1
+            self.trades = self.levels = self.scanned = 0
+            self._last_price = None
+            t0 = perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - t0
+                self._depth = 0
+                self.busy_ns += elapsed
+                hist.record(elapsed)
+                trades_hist.record(self.trades)
+                levels_hist.record(self.levels)
+                scanned_hist.record(self.scanned)
+                if self._profile is not None:
+                    self._count_profiled()
+
+        return timed
+
+    def _timed_phase(self, name: str, method):
+        hist = self.phases[name]
+
+        def timed(*args, **kwargs):
+            if self._book is None:
+                return method(*args, **kwargs)
+            t0 = perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                hist.record(perf_counter_ns() - t0)
+
+        return timed
+
+    # Tempo de parse de uma linha: o total do app menos o que passou no livro
+    def record_line(self, elapsed_ns: int, busy_before: int):
+        self.phases["parse"].record(elapsed_ns - (self.busy_ns - busy_before))
+
+    # Perfila (cProfile) os próximos n comandos; done(stats) é chamado no fim
+    # com o pstats.Stats da janela
+    def start_profile(self, n: int, done):
+        if n <= 0:
+            raise ValueError(f"janela inválida: {n}")
+        self.stop_profile()
+        self._profile = cProfile.Profile()
+        self._profile_left = n
+        self._profile_done = done
+        self._profile.enable()
+
+    def _count_profiled(self):
+        self._profile_left -= 1
+        if self._profile_left <= 0:
+            self.stop_profile()
+
+    # Encerra a janela de perfil em andamento (se houver) e entrega o resultado
+    def stop_profile(self):
+        profile = self._profile
+        if profile is None:
+            return
+        profile.disable()
+        self._profile = None
+        done = self._profile_done
+        self._profile_done = None
+        done(pstats.Stats(profile, stream=io.StringIO()))
+
+    def reset(self):
+        for group in (self.ops, self.phases, self.per_call):
+            for h in group.values():
+                h.clear()
+        self.busy_ns = 0
+
+    # Métricas em dicionário (latências em ns); só operações e fases com amostras
+    def to_dict(self) -> dict:
+        return {
+            "ops": {name: h.to_dict() for name, h in self.ops.items() if h.count},
+            "phases": {name: h.to_dict() for name, h in self.phases.items() if h.count},
+            "per_call": {name: h.to_dict() for name, h in self.per_call.items()},
+        }
+
+    # Grava as métricas em JSON no arquivo (ou stream) dado
+    def dump_json(self, target):
+        data = self.to_dict()
+        if isinstance(target, str):
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+        else:
+            json.dump(data, target, indent=2)
+
+    # Tabela de texto para o comando stats (latências em us)
+    def report(self) -> List[str]:
+        lines = [f"{'operação':<16}{'n':>10}{'média':>10}{'p50':>10}{'p99':>10}{'p99.9':>10}{'máx':>10}  (us)"]
+        for title, group in (("", self.ops), ("fase ", self.phases)):
+            for name, h in group.items():
+                if not h.count:
+                    continue
+                lines.append(
+                    f"{title + name:<16}{h.count:>10}{h.mean() / 1000:>10.2f}{h.percentile(0.5) / 1000:>10.2f}"
+                    f"{h.percentile(0.99) / 1000:>10.2f}{h.percentile(0.999) / 1000:>10.2f}{h.max / 1000:>10.2f}"
+                )
+        lines.append(f"{'por chamada':<16}{'total':>10}{'média':>10}{'p50':>10}{'p99':>10}{'p99.9':>10}{'máx':>10}")
+        for name, h in self.per_call.items():
+            lines.append(
+                f"{name:<16}{h.total:>10}{h.mean():>10.2f}{h.percentile(0.5):>10}"
+                f"{h.percentile(0.99):>10}{h.percentile(0.999):>10}{h.max:>10}"
+            )
+        return lines
+
+# Matchers e atualização das pegged são funções de módulo chamadas por vários
+# caminhos (handlers, batch, stops): são cobertos uma vez, no primeiro
+# enable_metrics, e só medem livros com métricas ligadas
+_hooks_installed = False
+
+def _install_hooks():
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    import limit, market, pegged
+
+    # Posição da quantidade agressora nos argumentos depois do livro
+    for module, name, opposite, qty_arg in (
+        (limit, "match_limit_buy", "sells", 1),
+        (limit, "match_limit_sell", "buys", 1),
+        (market, "match_market_buy", "sells", 0),
+        (market, "match_market_sell", "buys", 0),
+    ):
+        setattr(module, name, _metered_match(getattr(module, name), opposite, qty_arg))
+    for name in ("update_pegged_to_bid", "update_pegged_to_offer"):
+        setattr(pegged, name, _metered_pegged(getattr(pegged, name)))
+    _hooks_installed = True
+
+# Além do tempo, conta as ordens examinadas: uma por negócio, mais a do topo que
+# encerrou o matching pelo preço (sobrou quantidade e o outro lado não acabou)
+def _metered_match(fn, opposite: str, qty_arg: int):
+    def match(book, *args, **kwargs):
+        metrics = book.metrics
+        if metrics is None:
+            return fn(book, *args, **kwargs)
+        trades = metrics.trades
+        traded_qty = metrics.traded_qty
+        t0 = perf_counter_ns()
+        try:
+            return fn(book, *args, **kwargs)
+        finally:
+            metrics.phases["match"].record(perf_counter_ns() - t0)
+            metrics.scanned += metrics.trades - trades
+            left = args[qty_arg] - (metrics.traded_qty - traded_qty)
+            if left > 0 and book.auction is None and len(getattr(book, opposite)):
+                metrics.scanned += 1
+
+    match.__wrapped__ = fn
+    return match
+
+def _metered_pegged(fn):
+    def update(book):
+        metrics = book.metrics
+        if metrics is None:
+            return fn(book)
+        t0 = perf_counter_ns()
+        try:
+            return fn(book)
+        finally:
+            metrics.phases["pegged"].record(perf_counter_ns() - t0)
+
+    update.__wrapped__ = fn
+    return update
@@ -0,0 +1,453 @@
+# src/reference.py
+# Motor de referência congelado: a semântica do livro em listas planas escrita
+# do jeito mais direto possível, sem índices, caches nem atalhos, para servir de
+# oráculo ao fuzzer (ver fuzz). Cada lado é uma lista em prioridade preço-tempo,
+# toda busca é linear e as pegged vivem na mesma lista, reordenada a cada
+# reprecificação. Não depende de nenhum módulo do motor além dos eventos e dos
+# enums, então otimizações em ladder, flat, limit, pegged, stops, sweep ou
+# timers não mudam a referência. Este arquivo não deve ser otimizado: mudança
+# de semântica aqui é mudança de especificação.
+#
+# Cobre limit (GTC/IOC/FOK/GTD), market, peg, stop/stop-limit, modify, cancel,
+# participantes, cancel all e o tempo lógico. O leilão fica de fora.
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from book import Side, Peg, TimeInForce
+from events import (
+    Trade,
+    OrderAccepted,
+    OrderModified,
+    OrderFilled,
+    OrderCancelled,
+    OrderKilled,
+    MassCancelled,
+    PeggedCancelled,
+    OrderRejected,
+    StopAccepted,
+    StopTriggered,
+    CANCEL_QTY_CHANGE,
+    CANCEL_NO_REFERENCE,
+    CANCEL_EXPIRED,
+    CANCEL_MASS,
+    REJECT_NOT_FOUND,
+    REJECT_NOT_ACTIVE,
+    REJECT_IS_PEGGED,
+    REJECT_NOT_PEGGED,
+    REJECT_INVALID_PEG,
+    REJECT_NO_BID,
+    REJECT_NO_OFFER,
+    REJECT_IS_STOP,
+    REJECT_EXPIRED,
+    REJECT_NO_OWNER,
+)
+
+# Estados finais das ordens encerradas (os mesmos de retention)
+FILLED = 1
+CANCELLED = 2
+
+# Ordens encerradas lembradas (as mais antigas são esquecidas, como no motor)
+DEFAULT_RETAIN = 100_000
+
+# Ordem em repouso (pegged: Peg.BID/OFFER; price é o da referência atual)
+class _Order:
+    __slots__ = ("side", "price", "qty", "ts", "id", "pegged", "owner")
+
+    def __init__(self, side, price, qty, ts, order_id, pegged, owner):
+        self.side = side
+        self.price = price
+        self.qty = qty
+        self.ts = ts
+        self.id = order_id
+        self.pegged = pegged
+        self.owner = owner
+
+# Stop em repouso ou disparada
+class _Stop:
+    __slots__ = ("side", "qty", "stop_price", "limit_price", "ts", "id", "owner")
+
+    def __init__(self, side, qty, stop_price, limit_price, ts, order_id, owner):
+        self.side = side
+        self.qty = qty
+        self.stop_price = stop_price
+        self.limit_price = limit_price
+        self.ts = ts
+        self.id = order_id
+        self.owner = owner
+
+# Livro de referência com a mesma interface de comandos do OrderBook
+class ReferenceBook:
+    def __init__(self, sink, retain: int = DEFAULT_RETAIN):
+        self.sink = sink
+        self.buys: List[_Order] = []
+        self.sells: List[_Order] = []
+        self.stops: List[_Stop] = []
+        self.ready: List[_Stop] = []
+        self.deadlines: Dict[int, int] = {}
+        self.terminated: "OrderedDict[int, int]" = OrderedDict()
+        self.retain = retain
+        self.owned: Dict[str, Tuple[Dict[int, None], Dict[int, None]]] = {}
+        self.owner: Optional[str] = None
+        self.last_price: Optional[int] = None
+        self.now = 0
+        self._ts = 0
+        self._id = 0
+
+    # Utilitários
+
+    def _next_ts(self) -> int:
+        self._ts += 1
+        return self._ts
+
+    def _next_id(self) -> int:
+        self._id += 1
+        return self._id
+
+    def _side(self, side: Side) -> List[_Order]:
+        return self.buys if side == Side.BUY else self.sells
+
+    def _find(self, order_id) -> Optional[_Order]:
+        for order in self.buys + self.sells:
+            if order.id == order_id:
+                return order
+        return None
+
+    # Insere na posição de prioridade: preço melhor primeiro, depois ts menor
+    def _insert(self, order: _Order):
+        orders = self._side(order.side)
+        for i, other in enumerate(orders):
+            if order.side == Side.BUY:
+                ahead = order.price > other.price
+            else:
+                ahead = order.price < other.price
+            if ahead or (order.price == other.price and order.ts < other.ts):
+                orders.insert(i, order)
+                return
+        orders.append(order)
+
+    def _own(self, owner: Optional[str], side: Side, order_id: int):
+        if owner is not None:
+            self.owned.setdefault(owner, ({}, {}))[side][order_id] = None
+
+    def _disown(self, owner: Optional[str], side: Side, order_id: int):
+        sides = self.owned.get(owner)
+        if sides is not None:
+            sides[side].pop(order_id, None)
+            if not sides[0] and not sides[1]:
+                del self.owned[owner]
+
+    def _terminate(self, order_id: int, status: int):
+        if self.retain <= 0:
+            return
+        self.terminated[order_id] = status
+        self.terminated.move_to_end(order_id)
+        if len(self.terminated) > self.retain:
+            self.terminated.popitem(last=False)
+
+    # Tira a ordem do livro (se ainda estiver) e guarda o estado final
+    def _retire(self, order: _Order, status: int):
+        orders = self._side(order.side)
+        if order in orders:
+            orders.remove(order)
+        self._terminate(order.id, status)
+        self._disown(order.owner, order.side, order.id)
+        self.deadlines.pop(order.id, None)
+
+    def _missing_reason(self, order_id) -> str:
+        if any(stop.id == order_id for stop in self.stops):
+            return REJECT_IS_STOP
+        return REJECT_NOT_ACTIVE if order_id in self.terminated else REJECT_NOT_FOUND
+
+    # Melhor preço de um lado sem as pegged dele
+    def best_bid(self) -> Optional[int]:
+        prices = [o.price for o in self.buys if o.pegged == Peg.NONE]
+        return max(prices) if prices else None
+
+    def best_offer(self) -> Optional[int]:
+        prices = [o.price for o in self.sells if o.pegged == Peg.NONE]
+        return min(prices) if prices else None
+
+    # Matching
+
+    # Negocia qty contra o lado oposto a partir do topo, até limit_price (None =
+    # qualquer preço); devolve o que sobrou. Dispara as stops cruzadas
+    def _sweep(self, side: Side, qty: int, limit_price: Optional[int]) -> int:
+        resting = self.sells if side == Side.BUY else self.buys
+        prices = []
+        while qty > 0 and resting:
+            best = resting[0]
+            if limit_price is not None and (
+                best.price > limit_price if side == Side.BUY else best.price < limit_price
+            ):
+                break
+            trade_qty = min(qty, best.qty)
+            self.sink.emit(Trade(best.price, trade_qty))
+            prices.append(best.price)
+            qty -= trade_qty
+            best.qty -= trade_qty
+            if best.qty == 0:
+                self._retire(best, FILLED)
+        if prices:
+            self.last_price = prices[-1]
+            low = min(prices[0], prices[-1])
+            high = max(prices[0], prices[-1])
+            for stop in list(self.stops):
+                if stop.side == Side.BUY and stop.stop_price <= high or stop.side == Side.SELL and stop.stop_price >= low:
+                    self.stops.remove(stop)
+                    self.ready.append(stop)
+        return qty
+
+    # Limit GTC; com order_id (stop-limit disparada) a ordem usa esse id.
+    # Retorna a ordem que ficou no livro
+    def _limit(self, side: Side, price: int, qty: int, ts: int, order_id: Optional[int] = None):
+        qty = self._sweep(side, qty, price)
+        if qty <= 0:
+            return None
+        if order_id is None:
+            order_id = self._next_id()
+        order = _Order(side, price, qty, ts, order_id, Peg.NONE, self.owner)
+        self._insert(order)
+        self._own(self.owner, side, order_id)
+        self.sink.emit(OrderAccepted(side, qty, price, order_id))
+        return order
+
+    # Atualiza as pegged dos dois lados: reprecifica no melhor preço atual ou,
+    # sem referência, cancela todas as do lado
+    def _update_pegged(self):
+        for orders, peg, best in ((self.buys, Peg.BID, self.best_bid()), (self.sells, Peg.OFFER, self.best_offer())):
+            pegged = [o for o in orders if o.pegged == peg]
+            if best is None:
+                for order in pegged:
+                    self._retire(order, CANCELLED)
+                    self.sink.emit(PeggedCancelled(order.id, CANCEL_NO_REFERENCE, peg))
+            elif any(o.price != best for o in pegged):
+                for order in pegged:
+                    order.price = best
+                orders.sort(key=lambda o: (-o.price if peg == Peg.BID else o.price, o.ts))
+
+    # Executa as stops disparadas pela ordem de entrada (as que disparam no
+    # caminho entram na mesma fila)
+    def _run_stops(self):
+        while self.ready:
+            stop = min(self.ready, key=lambda s: (s.ts, s.id))
+            self.ready.remove(stop)
+            self.sink.emit(StopTriggered(stop.id, self.last_price))
+            ts = self._next_ts()
+            owner = self.owner
+            self.owner = stop.owner
+            if stop.limit_price is None:
+                self._sweep(stop.side, stop.qty, None)
+                rested = False
+            else:
+                rested = self._limit(stop.side, stop.limit_price, stop.qty, ts, stop.id) is not None
+            self.owner = owner
+            if not rested:
+                self._terminate(stop.id, FILLED)
+                self._disown(stop.owner, stop.side, stop.id)
+            self._update_pegged()
+
+    def _after_trading(self):
+        self._update_pegged()
+        self._run_stops()
+
+    # Comandos (mesmos nomes e argumentos do OrderBook)
+
+    def handle_limit(self, side: Side, price: int, qty: int, tif: TimeInForce = TimeInForce.GTC, expires=None):
+        ts = self._next_ts()
+        if tif == TimeInForce.GTC:
+            self._limit(side, price, qty, ts)
+        elif tif == TimeInForce.GTD:
+            if expires is None or expires <= self.now:
+                self.sink.emit(OrderRejected(REJECT_EXPIRED))
+            else:
+                order = self._limit(side, price, qty, ts)
+                if order is not None:
+                    self.deadlines[order.id] = expires
+        else:
+            resting = self.sells if side == Side.BUY else self.buys
+            available = sum(
+                o.qty for o in resting if (o.price <= price if side == Side.BUY else o.price >= price)
+            )
+            if tif == TimeInForce.FOK and available < qty:
+                self.sink.emit(OrderKilled(side, qty, price, tif))
+            else:
+                left = self._sweep(side, qty, price)
+                if left > 0:
+                    self.sink.emit(OrderKilled(side, left, price, tif))
+        self._after_trading()
+
+    def handle_market(self, side: Side, qty: int):
+        self._next_ts()
+        self._sweep(side, qty, None)
+        self._after_trading()
+
+    def handle_peg(self, reference: Optional[Peg], side: Optional[Side], qty: int):
+        ts = self._next_ts()
+        if reference == Peg.BID and side == Side.BUY:
+            best, missing = self.best_bid(), REJECT_NO_BID
+        elif reference == Peg.OFFER and side == Side.SELL:
+            best, missing = self.best_offer(), REJECT_NO_OFFER
+        else:
+            self.sink.emit(OrderRejected(REJECT_INVALID_PEG))
+            return
+        if best is None:
+            self.sink.emit(OrderRejected(missing))
+            return
+        order_id = self._next_id()
+        self._insert(_Order(side, best, qty, ts, order_id, reference, self.owner))
+        self._own(self.owner, side, order_id)
+        self.sink.emit(OrderAccepted(side, qty, best, order_id))
+
+    def handle_stop(self, side: Side, stop_price: int, qty: int, limit_price: Optional[int] = None):
+        ts = self._next_ts()
+        order_id = self._next_id()
+        stop = _Stop(side, qty, stop_price, limit_price, ts, order_id, self.owner)
+        self._own(self.owner, side, order_id)
+        self.sink.emit(StopAccepted(side, qty, stop_price, limit_price, order_id))
+        last = self.last_price
+        if last is not None and (last >= stop_price if side == Side.BUY else last <= stop_price):
+            self.ready.append(stop)
+        else:
+            self.stops.append(stop)
+        self._run_stops()
+
+    def cancel_order(self, order_id: Optional[int]):
+        order = self._find(order_id)
+        if order is not None:
+            self._retire(order, CANCELLED)
+            self.sink.emit(OrderCancelled(order_id))
+        else:
+            stop = next((s for s in self.stops if s.id == order_id), None)
+            if stop is not None:
+                self.stops.remove(stop)
+                self._terminate(order_id, CANCELLED)
+                self._disown(stop.owner, stop.side, order_id)
+                self.sink.emit(OrderCancelled(order_id))
+            else:
+                self.sink.emit(OrderRejected(self._missing_reason(order_id), order_id))
+        self._update_pegged()
+
+    # Mesmo preço e qty menor mantém a prioridade; qty maior perde (ts novo); outro
+    # preço reentra como agressora e pode negociar
+    def modify_order(self, order_id: Optional[int], new_price: int, new_qty: int):
+        order = self._find(order_id)
+        if order is None:
+            self.sink.emit(OrderRejected(self._missing_reason(order_id), order_id))
+        elif order.pegged != Peg.NONE:
+            self.sink.emit(OrderRejected(REJECT_IS_PEGGED, order_id))
+        elif new_qty <= 0:
+            self._retire(order, CANCELLED)
+            self.sink.emit(OrderCancelled(order_id, CANCEL_QTY_CHANGE))
+        elif new_price == order.price and new_qty <= order.qty:
+            order.qty = new_qty
+            self.sink.emit(OrderModified(order.side, new_qty, new_price, order_id))
+        elif new_price == order.price:
+            self._side(order.side).remove(order)
+            order.qty = new_qty
+            order.ts = self._next_ts()
+            self._insert(order)
+            self.sink.emit(OrderModified(order.side, new_qty, new_price, order_id))
+        else:
+            self._side(order.side).remove(order)
+            order.ts = self._next_ts()
+            left = self._sweep(order.side, new_qty, new_price)
+            if left > 0:
+                order.price = new_price
+                order.qty = left
+                self._insert(order)
+                self.sink.emit(OrderModified(order.side, left, new_price, order_id))
+            else:
+                self._retire(order, FILLED)
+                self.sink.emit(OrderFilled(order.side, new_price, order_id))
+        self._after_trading()
+
+    # Mesmas regras de prioridade do modify, só para pegged (o preço não muda)
+    def modify_order_qty_only(self, order_id: Optional[int], new_qty: int):
+        order = self._find(order_id)
+        if order is None:
+            self.sink.emit(OrderRejected(self._missing_reason(order_id), order_id))
+        elif order.pegged == Peg.NONE:
+            self.sink.emit(OrderRejected(REJECT_NOT_PEGGED, order_id))
+        elif new_qty <= 0:
+            self._retire(order, CANCELLED)
+            self.sink.emit(PeggedCancelled(order_id, CANCEL_QTY_CHANGE))
+        elif new_qty <= order.qty:
+            order.qty = new_qty
+            self.sink.emit(OrderModified(order.side, new_qty, order.price, order_id))
+        else:
+            self._side(order.side).remove(order)
+            order.qty = new_qty
+            order.ts = self._next_ts()
+            self._insert(order)
+            self.sink.emit(OrderModified(order.side, new_qty, order.price, order_id))
+
+    def set_owner(self, owner: Optional[str]):
+        self.owner = owner
+
+    # Ordens e stops do participante, por lado e em ordem de entrada no índice
+    def cancel_all(self, owner: Optional[str] = None, side: Optional[Side] = None) -> int:
+        if owner is None:
+            owner = self.owner
+        count = 0
+        if owner is None:
+            self.sink.emit(OrderRejected(REJECT_NO_OWNER))
+        else:
+            for order_side in (Side.BUY, Side.SELL) if side is None else (side,):
+                sides = self.owned.get(owner)
+                for order_id in list(sides[order_side]) if sides is not None else ():
+                    order = self._find(order_id)
+                    if order is not None:
+                        self._retire(order, CANCELLED)
+                    else:
+                        self.stops = [s for s in self.stops if s.id != order_id]
+                        self._terminate(order_id, CANCELLED)
+                        self._disown(owner, order_side, order_id)
+                    self.sink.emit(OrderCancelled(order_id, CANCEL_MASS))
+                    count += 1
+            self.sink.emit(MassCancelled(owner, side, count))
+        self._update_pegged()
+        return count
+
+    # Avança o tempo e cancela as GTD vencidas, por prazo e depois id
+    def advance_time(self, now: int):
+        if now <= self.now:
+            return
+        self.now = now
+        due = sorted((deadline, order_id) for order_id, deadline in self.deadlines.items() if deadline <= now)
+        for _, order_id in due:
+            self._retire(self._find(order_id), CANCELLED)
+            self.sink.emit(OrderCancelled(order_id, CANCEL_EXPIRED))
+        if due:
+            self._update_pegged()
+
+    # Estado comparável com book_state: lados em prioridade, stops, prazos,
+    # índice de participantes, ordens encerradas e escalares
+    def state(self) -> tuple:
+        return (
+            [(o.id, o.price, o.qty, int(o.pegged), o.owner) for o in self.buys],
+            [(o.id, o.price, o.qty, int(o.pegged), o.owner) for o in self.sells],
+            sorted((s.id, int(s.side), s.stop_price, s.limit_price, s.qty, s.owner) for s in self.stops),
+            sorted(self.deadlines.items()),
+            {owner: (list(sides[0]), list(sides[1])) for owner, sides in self.owned.items()},
+            dict(self.terminated),
+            self.owner,
+            self.last_price,
+            self.now,
+        )
+
+# O mesmo estado de ReferenceBook.state para um OrderBook
+def book_state(book) -> tuple:
+    sides = []
+    for side in (book.buys, book.sells):
+        sides.append([(o.id, side.price_of(o), o.qty, int(o.pegged), o.owner) for o in side])
+    return (
+        sides[0],
+        sides[1],
+        sorted((s.id, int(s.side), s.stop_price, s.limit_price, s.qty, s.owner) for s in book.stops.orders.values()),
+        sorted(book.expiries.deadlines.items()),
+        {owner: (list(ids[0]), list(ids[1])) for owner, ids in book.owned.items()},
+        dict(book.terminated.items()),
+        book.owner,
+        book.last_price,
+        book.expiries.now,
+    )
@@ -0,0 +1,58 @@
+# src/registry.py
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from book import OrderBook
+
+# Símbolo usado por comandos sem prefixo @SYM (modo de um ativo só)
+DEFAULT_SYMBOL = ""
+
+# Separa o prefixo "@SYM" de uma linha de comando: "@PETR4 limit buy 10 5"
+# Linhas sem prefixo vão para o símbolo padrão
+def split_symbol(line: str) -> Tuple[str, str]:
+    stripped = line.lstrip()
+    if not stripped.startswith("@"):
+        return DEFAULT_SYMBOL, line
+    parts = stripped.split(None, 1)
+    return parts[0][1:], parts[1] if len(parts) > 1 else ""
+
+# Livros por símbolo, criados sob demanda com os mesmos parâmetros
+# (backend, sink compartilhado, tick, retenção) repassados ao OrderBook.
+# factory(symbol, **book_kwargs), se dada, cria o livro no lugar do OrderBook
+# (ex.: livros persistentes com journal)
+class BookRegistry:
+    def __init__(self, factory: Optional[Callable[..., OrderBook]] = None, **book_kwargs):
+        self.factory = factory
+        self.book_kwargs = book_kwargs
+        self._books: Dict[str, OrderBook] = {}
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._books
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._books)
+
+    # Livro do símbolo, criado na primeira referência
+    def get(self, symbol: str) -> OrderBook:
+        book = self._books.get(symbol)
+        if book is None:
+            if self.factory is None:
+                book = OrderBook(**self.book_kwargs)
+            else:
+                book = self.factory(symbol, **self.book_kwargs)
+            self._books[symbol] = book
+        return book
+
+    def items(self):
+        return self._books.items()
+
+    # Grava o que estiver pendente nos journals dos livros e remove os blocos
+    # de memória compartilhada dos feeds
+    def close(self):
+        for book in self._books.values():
+            if book.journal is not None:
+                book.journal.close()
+            if book.shm_feed is not None:
+                book.shm_feed.close()
@@ -0,0 +1,41 @@
+# src/retention.py
+from collections import OrderedDict
+from typing import Optional
+
+# Estados finais guardados para ordens que saíram do livro
+FILLED = 1
+CANCELLED = 2
+
+# Capacidade padrão do registro de ordens encerradas
+DEFAULT_RETAIN = 100_000
+
+# Registro limitado (LRU) de ordens encerradas recentemente: guarda só id -> estado,
+# para responder a comandos sobre ordens já executadas sem manter os objetos vivos
+class TerminatedOrders:
+    def __init__(self, capacity: int = DEFAULT_RETAIN):
+        self.capacity = capacity
+        self._status: "OrderedDict[int, int]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._status)
+
+    def __contains__(self, order_id) -> bool:
+        return order_id in self._status
+
+    # Registra o estado final de uma ordem, descartando a mais antiga se cheio
+    def add(self, order_id: int, status: int):
+        if self.capacity <= 0:
+            return
+        status_by_id = self._status
+        status_by_id[order_id] = status
+        status_by_id.move_to_end(order_id)
+        if len(status_by_id) > self.capacity:
+            status_by_id.popitem(last=False)
+
+    # Pares (id, estado) do mais antigo ao mais recente
+    def items(self):
+        return self._status.items()
+
+    # Retorna o estado final guardado para o id, se ainda retido
+    def get(self, order_id) -> Optional[int]:
+        return self._status.get(order_id)
@@ -0,0 +1,423 @@
+# src/risk.py
+# Controle de risco pré-negociação na frente do livro: cada ordem nova (limit,
+# market, peg, stop) e cada modify passa por limites por participante antes de
+# chegar ao motor, e as que violam algum são rejeitadas sem tocar no livro.
+# Os agregados de cada participante (qty em aberto e nocional por lado, posição
+# executada, balde de mensagens) são mantidos incrementalmente: os métodos dos
+# lados do livro que mudam quantidades em repouso (insert, remove, set_qty,
+# remove_pegged) são cobertos, e o matching avisa cada execução (fill). Assim a
+# checagem é O(1) por ordem, sem varrer orders_by_id.
+#
+# Stops passam pelos limites de qty e de mensagens na entrada e pelos de banda,
+# posição e nocional quando disparam (stops.execute_stop), antes de chegar ao
+# motor. Limitação: a posição começa em zero no enable_risk (as ordens já no
+# livro entram nos agregados em aberto).
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from book import Side, Peg, CMD_LIMIT, CMD_LIMIT_TIF, CMD_MARKET, CMD_PEG, CMD_MODIFY, CMD_MODIFY_QTY, CMD_STOP
+from events import (
+    OrderRejected,
+    REJECT_RISK_QTY,
+    REJECT_RISK_BAND,
+    REJECT_RISK_POSITION,
+    REJECT_RISK_NOTIONAL,
+    REJECT_RISK_RATE,
+)
+
+# Limites por participante; None desliga o limite
+@dataclass
+class RiskLimits:
+    # Quantidade máxima de uma ordem
+    max_order_qty: Optional[int] = None
+    # Distância máxima, em ticks, do preço da ordem ao melhor bid (abaixo) e ao
+    # melhor offer (acima); sem um dos lados vale o último negócio
+    price_band: Optional[int] = None
+    # Posição máxima em módulo, contando a executada e tudo que está em aberto
+    # do mesmo lado (o pior caso se tudo for executado)
+    max_position: Optional[int] = None
+    # Nocional máximo em aberto (qty x preço em ticks), somando os dois lados
+    max_notional: Optional[int] = None
+    # Mensagens por segundo (balde de fichas) e tamanho do balde
+    rate: Optional[float] = None
+    burst: int = 100
+
+# Agregados de um participante; listas indexadas por Side
+@dataclass(slots=True)
+class Account:
+    # Qty em aberto por lado (pegged incluídas)
+    open_qty: List[int] = field(default_factory=lambda: [0, 0])
+    # Nocional em aberto das ordens não pegged por lado; as pegged entram pelo
+    # preço de referência atual, a partir de pegged_qty
+    notional: List[int] = field(default_factory=lambda: [0, 0])
+    pegged_qty: List[int] = field(default_factory=lambda: [0, 0])
+    # Posição executada: compras - vendas
+    position: int = 0
+    tokens: float = 0.0
+    stamp: float = 0.0
+    rejected: int = 0
+
+# Métodos do livro checados antes do motor
+_CHECKED = (
+    "handle_limit", "handle_market", "handle_peg", "handle_stop",
+    "modify_order", "modify_order_qty_only", "submit_batch",
+)
+
+# Estágio de risco de um livro (ver OrderBook.enable_risk)
+class Risk:
+    def __init__(self, limits: Optional[RiskLimits] = None, clock=time.monotonic):
+        self.limits = limits if limits is not None else RiskLimits()
+        self.clock = clock
+        self.accounts: Dict[Optional[str], Account] = {}
+        self.rejected = 0
+        self._book = None
+        # (objeto, atributo, wrapper, valor anterior no __dict__ ou None)
+        self._wrapped = []
+
+    # Agregados do participante, criados no primeiro uso com o balde cheio
+    def account(self, owner: Optional[str]) -> Account:
+        acc = self.accounts.get(owner)
+        if acc is None:
+            acc = self.accounts[owner] = Account(tokens=float(self.limits.burst), stamp=self.clock())
+        return acc
+
+    # Passa a checar o livro: soma as ordens já em repouso e cobre os métodos
+    def attach(self, book):
+        self._book = book
+        for side in (book.buys, book.sells):
+            for order in side:
+                self._open(order, order.qty)
+        for name in _CHECKED:
+            self._wrap(book, name, getattr(self, "_" + name)(getattr(book, name)))
+        for side in (book.buys, book.sells):
+            self._wrap(side, "insert", self._insert(side.insert))
+            self._wrap(side, "remove", self._remove(side.remove))
+            self._wrap(side, "set_qty", self._set_qty(side.set_qty))
+            self._wrap(side, "remove_pegged", self._remove_pegged(side.remove_pegged))
+
+    # Desfaz attach. Um wrapper coberto depois por outra camada fica na cadeia,
+    # mas passa a só repassar a chamada
+    def detach(self):
+        for obj, name, wrapper, previous in reversed(self._wrapped):
+            if obj.__dict__.get(name) is wrapper:
+                if previous is None:
+                    del obj.__dict__[name]
+                else:
+                    obj.__dict__[name] = previous
+        self._wrapped = []
+        self._book = None
+
+    def _wrap(self, obj, name: str, wrapper):
+        self._wrapped.append((obj, name, wrapper, obj.__dict__.get(name)))
+        setattr(obj, name, wrapper)
+
+    # Soma qty (negativa ao sair) aos agregados em aberto do dono da ordem
+    def _open(self, order, qty: int):
+        acc = self.accounts.get(order.owner) or self.account(order.owner)
+        side = order.side
+        acc.open_qty[side] += qty
+        if order.pegged:
+            acc.pegged_qty[side] += qty
+        else:
+            acc.notional[side] += qty * order.price
+
+    # Execução de qty por uma ordem do participante; chamada pelo matching
+    def fill(self, owner: Optional[str], side: Side, qty: int):
+        acc = self.accounts.get(owner) or self.account(owner)
+        acc.position += qty if side == Side.BUY else -qty
+
+    # Nocional em aberto do participante, com as pegged no preço de referência atual
+    def open_notional(self, acc: Account) -> int:
+        total = acc.notional[0] + acc.notional[1]
+        book = self._book
+        if acc.pegged_qty[0]:
+            total += acc.pegged_qty[0] * (book.best_bid() or 0)
+        if acc.pegged_qty[1]:
+            total += acc.pegged_qty[1] * (book.best_offer() or 0)
+        return total
+
+    # Consome uma ficha do balde de mensagens do participante; False se vazio
+    def admit(self, acc: Account) -> bool:
+        limits = self.limits
+        if limits.rate is None:
+            return True
+        now = self.clock()
+        tokens = acc.tokens + (now - acc.stamp) * limits.rate
+        if tokens > limits.burst:
+            tokens = float(limits.burst)
+        acc.stamp = now
+        if tokens < 1.0:
+            acc.tokens = tokens
+            return False
+        acc.tokens = tokens - 1.0
+        return True
+
+    # Motivo de rejeição de uma ordem, ou None. price None = ordem a mercado (sem
+    # banda; nocional pelo melhor preço oposto). Num modify, added_qty e
+    # added_notional são o aumento em aberto; posição e nocional só barram
+    # aumentos, então um modify que reduz sempre passa
+    def check_order(
+        self,
+        owner: Optional[str],
+        side: Side,
+        price: Optional[int],
+        qty: int,
+        added_qty: Optional[int] = None,
+        added_notional: Optional[int] = None,
+    ):
+        acc = self.accounts.get(owner) or self.account(owner)
+        if not self.admit(acc):
+            return REJECT_RISK_RATE
+        return self.check_limits(acc, side, price, qty, added_qty, added_notional)
+
+    # Limites de qty, banda, posição e nocional (check_order sem o balde de mensagens)
+    def check_limits(
+        self,
+        acc: Account,
+        side: Side,
+        price: Optional[int],
+        qty: int,
+        added_qty: Optional[int] = None,
+        added_notional: Optional[int] = None,
+    ):
+        limits = self.limits
+        if limits.max_order_qty is not None and qty > limits.max_order_qty:
+            return REJECT_RISK_QTY
+        book = self._book
+        if limits.price_band is not None and price is not None:
+            bid = book.best_bid()
+            offer = book.best_offer()
+            last = book.last_price
+            low = bid if bid is not None else (offer if offer is not None else last)
+            high = offer if offer is not None else (bid if bid is not None else last)
+            if low is not None and not low - limits.price_band <= price <= high + limits.price_band:
+                return REJECT_RISK_BAND
+        if added_qty is None:
+            added_qty = qty
+        if limits.max_position is not None and added_qty > 0:
+            if side == Side.BUY:
+                worst = acc.position + acc.open_qty[Side.BUY] + added_qty
+            else:
+                worst = acc.open_qty[Side.SELL] + added_qty - acc.position
+            if worst > limits.max_position:
+                return REJECT_RISK_POSITION
+        if limits.max_notional is not None:
+            if added_notional is None:
+                if price is None:
+                    price = (book.best_offer() if side == Side.BUY else book.best_bid()) or 0
+                added_notional = qty * price
+            if added_notional > 0 and self.open_notional(acc) + added_notional > limits.max_notional:
+                return REJECT_RISK_NOTIONAL
+        return None
+
+    # Motivo de rejeição de um stop: só quantidade e mensagens, já que ele não
+    # fica em aberto até disparar
+    def check_stop(self, owner: Optional[str], qty: int):
+        acc = self.accounts.get(owner) or self.account(owner)
+        if not self.admit(acc):
+            return REJECT_RISK_RATE
+        if self.limits.max_order_qty is not None and qty > self.limits.max_order_qty:
+            return REJECT_RISK_QTY
+        return None
+
+    # Motivo de rejeição de uma stop que disparou, checada como a ordem que vai
+    # virar (market ou limit); a mensagem já foi cobrada na entrada
+    def check_triggered(self, stop):
+        acc = self.accounts.get(stop.owner) or self.account(stop.owner)
+        reason = self.check_limits(acc, stop.side, stop.limit_price, stop.qty)
+        if reason is not None:
+            self.rejected += 1
+            acc.rejected += 1
+        return reason
+
+    # Motivo de rejeição de um modify (pelo aumento de qty e de nocional), ou None;
+    # price None = modify só de quantidade (pegged)
+    def check_modify(self, order_id, price: Optional[int], qty: int):
+        book = self._book
+        order = book.orders_by_id.get(order_id)
+        if order is None:
+            # O motor rejeita; só conta a mensagem
+            return None if self.admit(self.account(book.owner)) else REJECT_RISK_RATE
+        old_price = (book.buys if order.side == Side.BUY else book.sells).price_of(order)
+        if price is None:
+            price = old_price
+        return self.check_order(order.owner, order.side, price, qty, qty - order.qty, qty * price - order.qty * old_price)
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        self.account(self._book.owner).rejected += 1
+        self._book.sink.emit(OrderRejected(reason))
+
+    # Handlers do livro checados; ordens rejeitadas não chegam ao motor (nem ao journal)
+
+    def _handle_limit(self, method):
+        def handle_limit(side, price, qty, *args, **kwargs):
+            if self._book is not None:
+                reason = self.check_order(self._book.owner, side, price, qty)
+                if reason is not None:
+                    return self._reject(reason)
+            return method(side, price, qty, *args, **kwargs)
+
+        return handle_limit
+
+    def _handle_market(self, method):
+        def handle_market(side, qty):
+            if self._book is not None:
+                reason = self.check_order(self._book.owner, side, None, qty)
+                if reason is not None:
+                    return self._reject(reason)
+            return method(side, qty)
+
+        return handle_market
+
+    def _handle_peg(self, method):
+        def handle_peg(reference, side, qty):
+            if self._book is not None and side is not None and reference is not None:
+                price = self._book.best_bid() if reference == Peg.BID else self._book.best_offer()
+                reason = self.check_order(self._book.owner, side, price, qty)
+                if reason is not None:
+                    return self._reject(reason)
+            return method(reference, side, qty)
+
+        return handle_peg
+
+    def _handle_stop(self, method):
+        def handle_stop(side, stop_price, qty, limit_price=None):
+            if self._book is not None:
+                reason = self.check_stop(self._book.owner, qty)
+                if reason is not None:
+                    return self._reject(reason)
+            return method(side, stop_price, qty, limit_price)
+
+        return handle_stop
+
+    def _modify_order(self, method):
+        def modify_order(order_id, price, qty):
+            if self._book is not None:
+                reason = self.check_modify(order_id, price, qty)
+                if reason is not None:
+                    return self._reject(reason)
+            return method(order_id, price, qty)
+
+        return modify_order
+
+    def _modify_order_qty_only(self, method):
+        def modify_order_qty_only(order_id, qty):
+            if self._book is not None:
+                reason = self.check_modify(order_id, None, qty)
+                if reason is not None:
+                    return self._reject(reason)
+            return method(order_id, qty)
+
+        return modify_order_qty_only
+
+    # Batch: cada comando é checado quando o motor vai executá-lo, com os
+    # agregados já atualizados pelos anteriores
+    def _submit_batch(self, method):
+        def submit_batch(commands):
+            if self._book is None:
+                return method(commands)
+            rejected = [0]
+            count = method(self._filter(commands, rejected))
+            return count + rejected[0]
+
+        return submit_batch
+
+    def _filter(self, commands, rejected: List[int]):
+        book = self._book
+        for cmd in commands:
+            kind = cmd[0]
+            if kind == CMD_LIMIT or kind == CMD_LIMIT_TIF:
+                reason = self.check_order(book.owner, cmd[1], cmd[2], cmd[3])
+            elif kind == CMD_MARKET:
+                reason = self.check_order(book.owner, cmd[1], None, cmd[2])
+            elif kind == CMD_PEG:
+                _, reference, side, qty = cmd
+                reason = None
+                if side is not None and reference is not None:
+                    price = book.best_bid() if reference == Peg.BID else book.best_offer()
+                    reason = self.check_order(book.owner, side, price, qty)
+            elif kind == CMD_MODIFY:
+                reason = self.check_modify(cmd[1], cmd[2], cmd[3])
+            elif kind == CMD_MODIFY_QTY:
+                reason = self.check_modify(cmd[1], None, cmd[2])
+            elif kind == CMD_STOP:
+                reason = self.check_stop(book.owner, cmd[3])
+            else:
+                reason = None
+            if reason is None:
+                yield cmd
+            else:
+                rejected[0] += 1
+                self._reject(reason)
+
+    # Métodos dos lados do livro: mantêm os agregados em aberto
+
+    def _insert(self, method):
+        def insert(order):
+            method(order)
+            if self._book is not None:
+                self._open(order, order.qty)
+
+        return insert
+
+    def _remove(self, method):
+        def remove(order):
+            removed = method(order)
+            if removed and self._book is not None:
+                self._open(order, -order.qty)
+            return removed
+
+        return remove
+
+    def _set_qty(self, method):
+        def set_qty(order, qty):
+            delta = qty - order.qty
+            method(order, qty)
+            if self._book is not None:
+                self._open(order, delta)
+
+        return set_qty
+
+    def _remove_pegged(self, method):
+        def remove_pegged(peg):
+            removed = method(peg)
+            if self._book is not None:
+                for order in removed:
+                    self._open(order, -order.qty)
+            return removed
+
+        return remove_pegged
+
+    # Confere os agregados em aberto contra as ordens em repouso no livro
+    def check(self, book):
+        expected: Dict[Optional[str], Account] = {}
+        for side in (book.buys, book.sells):
+            for order in side:
+                acc = expected.get(order.owner)
+                if acc is None:
+                    acc = expected[order.owner] = Account()
+                acc.open_qty[order.side] += order.qty
+                if order.pegged:
+                    acc.pegged_qty[order.side] += order.qty
+                else:
+                    acc.notional[order.side] += order.qty * order.price
+        for owner, acc in self.accounts.items():
+            want = expected.pop(owner, None) or Account()
+            for name in ("open_qty", "notional", "pegged_qty"):
+                if getattr(acc, name) != getattr(want, name):
+                    raise AssertionError(f"risco de {owner}: {name} {getattr(acc, name)} != {getattr(want, name)}")
+        if expected:
+            raise AssertionError(f"ordens em repouso sem agregados de risco: {sorted(map(str, expected))}")
+
+    # Agregados de um participante como dicionário (para exibição)
+    def to_dict(self, owner: Optional[str]) -> dict:
+        acc = self.account(owner)
+        return {
+            "open_buy_qty": acc.open_qty[Side.BUY],
+            "open_sell_qty": acc.open_qty[Side.SELL],
+            "open_notional": self.open_notional(acc),
+            "position": acc.position,
+            "rejected": acc.rejected,
+        }
@@ -0,0 +1,148 @@
+# src/shard.py
+# Replay multi-ativo distribuído entre processos: cada símbolo é atribuído
+# (por hash estável) a um único worker, que é dono exclusivo dos seus livros.
+# A saída de cada comando volta marcada com o número da linha e é intercalada
+# na ordem da entrada, igual à de um replay sequencial.
+import heapq
+import multiprocessing
+import queue
+import sys
+import zlib
+from typing import Dict, List, TextIO
+
+from registry import BookRegistry, split_symbol
+from sinks import TextSink
+
+# Linhas lidas da entrada por bloco enviado aos workers
+DEFAULT_BLOCK_LINES = 1 << 14
+
+# Blocos em processamento ao mesmo tempo antes de esperar pelo mais antigo
+_MAX_IN_FLIGHT = 4
+
+_EXIT = frozenset(("exit", "quit"))
+
+# Espera máxima por resultados antes de conferir se os workers continuam vivos
+_POLL_SECONDS = 1.0
+
+# Worker do símbolo; crc32 é estável entre processos (hash() de str não é)
+def shard_of(symbol: str, workers: int) -> int:
+    return zlib.crc32(symbol.encode("utf-8")) % workers
+
+# Laço de um worker: processa blocos de (seq, símbolo, comando) e devolve
+# a saída de cada comando que produziu texto. Um comando com erro vira uma
+# mensagem na saída em vez de derrubar o worker (e o replay inteiro)
+def _worker(index: int, inbox, outbox, book_kwargs: dict):
+    from app import process_line
+
+    sink = TextSink(buffer_lines=sys.maxsize)
+    registry = BookRegistry(sink=sink, **book_kwargs)
+    while True:
+        block = inbox.get()
+        if block is None:
+            break
+        block_id, items = block
+        results = []
+        for seq, symbol, line in items:
+            try:
+                process_line(registry.get(symbol), line)
+            except Exception as exc:
+                sink.drain()
+                sink.write(f"Erro ao processar {line.strip()}: {type(exc).__name__}")
+            lines = sink.drain()
+            if lines:
+                results.append((seq, "\n".join(lines)))
+        outbox.put((block_id, index, results))
+
+class ShardedRunner:
+    def __init__(self, workers: int, out: TextIO, **book_kwargs):
+        if workers < 1:
+            raise ValueError(f"número de workers inválido: {workers}")
+        self.workers = workers
+        self.out = out
+        self._outbox = multiprocessing.Queue()
+        self._inboxes = []
+        self._procs = []
+        for index in range(workers):
+            inbox = multiprocessing.Queue()
+            proc = multiprocessing.Process(
+                target=_worker, args=(index, inbox, self._outbox, book_kwargs), daemon=True
+            )
+            proc.start()
+            self._inboxes.append(inbox)
+            self._procs.append(proc)
+        self._next_block = 0
+        self._next_write = 0
+        self._pending: Dict[int, List[list]] = {}
+        self._shard_cache: Dict[str, int] = {}
+
+    # Distribui um bloco de linhas (com números de sequência) entre os workers;
+    # devolve quantas linhas foram enviadas, parando antes de um exit/quit
+    def _dispatch(self, first_seq: int, lines: List[str]) -> int:
+        per_worker = [[] for _ in range(self.workers)]
+        cache = self._shard_cache
+        sent = len(lines)
+        for offset, line in enumerate(lines):
+            symbol, command = split_symbol(line)
+            head = command.lstrip()[:4].lower()
+            if head in _EXIT and command.split(None, 1)[0].lower() in _EXIT:
+                sent = offset
+                break
+            shard = cache.get(symbol)
+            if shard is None:
+                shard = cache[symbol] = shard_of(symbol, self.workers)
+            per_worker[shard].append((first_seq + offset, symbol, command))
+        block_id = self._next_block
+        self._next_block += 1
+        for inbox, items in zip(self._inboxes, per_worker):
+            inbox.put((block_id, items))
+        return sent
+
+    # Recebe resultados até o bloco mais antigo estar completo e o escreve; se
+    # um worker morreu, falha em vez de esperar para sempre pela parte dele
+    def _drain_one(self):
+        while True:
+            parts = self._pending.get(self._next_write)
+            if parts is not None and all(p is not None for p in parts):
+                break
+            try:
+                block_id, index, results = self._outbox.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                for index, proc in enumerate(self._procs):
+                    if not proc.is_alive():
+                        raise RuntimeError(f"worker {index} terminou (código {proc.exitcode})")
+                continue
+            slots = self._pending.setdefault(block_id, [None] * self.workers)
+            slots[index] = results
+        parts = self._pending.pop(self._next_write)
+        self._next_write += 1
+        merged = [text for _, text in heapq.merge(*parts)]
+        if merged:
+            self.out.write("\n".join(merged) + "\n")
+
+    # Processa a entrada inteira; para no primeiro exit/quit, como o replay
+    def run(self, stream, block_lines: int = DEFAULT_BLOCK_LINES) -> int:
+        count = 0
+        while True:
+            lines = stream.readlines(block_lines * 32)
+            if not lines:
+                break
+            for start in range(0, len(lines), block_lines):
+                block = lines[start:start + block_lines]
+                sent = self._dispatch(count, block)
+                count += sent
+                if self._next_block - self._next_write >= _MAX_IN_FLIGHT:
+                    self._drain_one()
+                if sent < len(block):
+                    return self._finish(count)
+        return self._finish(count)
+
+    def _finish(self, count: int) -> int:
+        while self._next_write < self._next_block:
+            self._drain_one()
+        return count
+
+    def close(self):
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for proc in self._procs:
+            proc.join()
@@ -0,0 +1,262 @@
+# src/shmfeed.py
+# Topo do livro e negócios em memória compartilhada para consumidores na mesma
+# máquina. O motor publica melhor bid/offer (preço, qty, nº de ordens), último
+# negócio e um número de sequência num bloco protegido por seqlock, e cada
+# negócio num anel de tamanho fixo; os leitores (TopOfBookReader, TradeReader)
+# fazem polling direto no buffer, sem cópias do bloco nem chamadas ao sistema.
+#
+# Layout (inteiros little-endian de 64 bits, blocos alinhados em 64 bytes):
+#   0    cabeçalho: magic, versão, capacidade do anel, tick (texto ASCII)
+#   64   topo: seq, flags, bid px/qty/n, offer px/qty/n, último px/qty, negócios
+#   192  cabeça do anel: total de negócios escritos
+#   256  anel: capacidade x (seq, px, qty, versão do topo que já inclui o negócio)
+#
+# Seqlock: o escritor torna seq ímpar, grava os campos e torna seq par; o leitor
+# só aceita a leitura se viu o mesmo seq par antes e depois. Cada posição do
+# anel tem o mesmo protocolo, com seq = 2n para o n-ésimo negócio: um leitor que
+# foi ultrapassado pelo escritor vê outro seq e conta o negócio como perdido.
+# A ordem das escritas vale em x86 (TSO); o CPython não emite barreiras.
+import struct
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+from events import Trade
+
+_MAGIC = b"MSEPSHM1"
+_VERSION = 1
+# Capacidade padrão do anel de negócios
+DEFAULT_CAPACITY = 1 << 16
+
+_HEADER = struct.Struct("<8sIIQ16s")
+_TOP = 64
+_SEQ = struct.Struct("<Q")
+# flags, bid px/qty/n, offer px/qty/n, último px/qty, negócios até aqui
+_TOP_FIELDS = struct.Struct("<Qqqqqqqqqq")
+_RING_HEAD = 192
+_RING = 256
+# Posição: seq e px, qty, versão do topo que já inclui o negócio
+_SLOT_SIZE = 32
+_SLOT_FIELDS = struct.Struct("<qqq")
+
+HAS_BID = 1
+HAS_OFFER = 2
+HAS_LAST = 4
+
+# Leitura consistente do topo do livro; preços em ticks (ver tick)
+@dataclass(slots=True)
+class TopOfBook:
+    version: int
+    bid_price: Optional[int]
+    bid_qty: int
+    bid_count: int
+    offer_price: Optional[int]
+    offer_qty: int
+    offer_count: int
+    last_price: Optional[int]
+    last_qty: int
+    trades: int
+
+# Negócio lido do anel: n-ésimo negócio do livro; version é a primeira versão
+# do topo que já o inclui (o evento publica o topo depois dos seus negócios)
+@dataclass(slots=True)
+class FeedTrade:
+    n: int
+    price: int
+    qty: int
+    version: int
+
+def _size(capacity: int) -> int:
+    return _RING + capacity * _SLOT_SIZE
+
+# Abre um bloco existente sem registrá-lo no resource_tracker do processo leitor
+# (senão o segmento seria removido quando o leitor terminasse). Antes do
+# Python 3.13 não há track=False: o registro é suprimido durante a abertura, já
+# que desfazê-lo depois confundiria o tracker compartilhado com o produtor
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        pass
+    from multiprocessing import resource_tracker
+
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+# Publicador de um livro: cria o bloco e é chamado pelo livro ao fim de cada evento
+class ShmFeed:
+    def __init__(self, name: Optional[str] = None, capacity: int = DEFAULT_CAPACITY, tick: str = ""):
+        if capacity <= 0:
+            raise ValueError(f"capacidade inválida: {capacity}")
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(name, create=True, size=_size(capacity))
+        self.name = self.shm.name
+        self._buf = self.shm.buf
+        _HEADER.pack_into(self._buf, 0, _MAGIC, _VERSION, 0, capacity, tick.encode("ascii"))
+        self._seq = 0
+        self.trades = 0
+        self._last_qty = 0
+        self._published = None
+
+    # Passa a receber os negócios do livro (via sink) e publica o estado atual
+    def attach(self, book):
+        book.sink = _TradeTap(book.sink, self)
+        self.publish(book)
+
+    # Negócio recém-emitido pelo motor: vai para o anel na hora
+    def add_trade(self, price: int, qty: int):
+        buf = self._buf
+        n = self.trades + 1
+        slot = _RING + ((n - 1) % self.capacity) * _SLOT_SIZE
+        _SEQ.pack_into(buf, slot, 2 * n - 1)
+        _SLOT_FIELDS.pack_into(buf, slot + 8, price, qty, (self._seq >> 1) + 1)
+        _SEQ.pack_into(buf, slot, 2 * n)
+        _SEQ.pack_into(buf, _RING_HEAD, n)
+        self.trades = n
+        self._last_qty = qty
+
+    # Publica o topo do livro se mudou desde a última publicação
+    def publish(self, book):
+        bids = book.buys.depth(1)
+        offers = book.sells.depth(1)
+        state = (bids, offers, book.last_price, self._last_qty, self.trades)
+        if state == self._published:
+            return
+        self._published = state
+        flags = 0
+        bid_price = bid_qty = bid_count = 0
+        offer_price = offer_qty = offer_count = 0
+        last_price = 0
+        if bids:
+            flags |= HAS_BID
+            bid_price, bid_qty, bid_count = bids[0]
+        if offers:
+            flags |= HAS_OFFER
+            offer_price, offer_qty, offer_count = offers[0]
+        if book.last_price is not None:
+            flags |= HAS_LAST
+            last_price = book.last_price
+        buf = self._buf
+        seq = self._seq + 1
+        _SEQ.pack_into(buf, _TOP, seq)
+        _TOP_FIELDS.pack_into(
+            buf, _TOP + 8, flags, bid_price, bid_qty, bid_count,
+            offer_price, offer_qty, offer_count, last_price, self._last_qty, self.trades,
+        )
+        self._seq = seq + 1
+        _SEQ.pack_into(buf, _TOP, self._seq)
+
+    # Versão do topo publicada por último
+    @property
+    def version(self) -> int:
+        return self._seq >> 1
+
+    # Fecha o bloco; unlink remove o segmento (os leitores abertos continuam lendo)
+    def close(self, unlink: bool = True):
+        self._buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+# Repassa tudo ao sink do livro, copiando os negócios para o anel
+class _TradeTap:
+    def __init__(self, inner, feed: ShmFeed):
+        self.inner = inner
+        self.feed = feed
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def emit(self, event):
+        if type(event) is Trade:
+            self.feed.add_trade(event.price, event.qty)
+        self.inner.emit(event)
+
+    def write(self, text: str):
+        self.inner.write(text)
+
+# Base dos leitores: abre o bloco pelo nome e confere o cabeçalho
+class _Reader:
+    def __init__(self, name: str):
+        self.shm = _attach(name)
+        self._buf = self.shm.buf
+        magic, version, _, capacity, tick = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f"bloco {name} não é um feed do motor (versão {version})")
+        self.capacity = capacity
+        # Tamanho do tick para converter os preços (ticks.TickSize(reader.tick))
+        self.tick = tick.rstrip(b"\0").decode("ascii")
+
+    def close(self):
+        self._buf = None
+        self.shm.close()
+
+# Leitor do topo do livro
+class TopOfBookReader(_Reader):
+    # Versão atual do topo, sem ler os campos (barato para polling)
+    def version(self) -> int:
+        return _SEQ.unpack_from(self._buf, _TOP)[0] >> 1
+
+    # Leitura consistente: repete enquanto o escritor estiver no meio de uma publicação
+    def read(self) -> TopOfBook:
+        buf = self._buf
+        seq_of = _SEQ.unpack_from
+        fields_of = _TOP_FIELDS.unpack_from
+        while True:
+            seq = seq_of(buf, _TOP)[0]
+            if seq & 1:
+                continue
+            fields = fields_of(buf, _TOP + 8)
+            if seq_of(buf, _TOP)[0] == seq:
+                break
+        flags, bid_price, bid_qty, bid_count, offer_price, offer_qty, offer_count, last_price, last_qty, trades = fields
+        return TopOfBook(
+            seq >> 1,
+            bid_price if flags & HAS_BID else None, bid_qty, bid_count,
+            offer_price if flags & HAS_OFFER else None, offer_qty, offer_count,
+            last_price if flags & HAS_LAST else None, last_qty, trades,
+        )
+
+# Leitor do anel de negócios: cada poll devolve os negócios novos desde o anterior.
+# Se o escritor der a volta no anel antes da leitura, os negócios sobrescritos
+# são contados em lost e a leitura continua a partir do mais antigo disponível
+class TradeReader(_Reader):
+    def __init__(self, name: str, from_start: bool = False):
+        super().__init__(name)
+        head = _SEQ.unpack_from(self._buf, _RING_HEAD)[0]
+        # Próximo negócio a ler: só os novos, ou os que ainda estão no anel
+        self.next = max(1, head - self.capacity + 1) if from_start else head + 1
+        self.lost = 0
+
+    def poll(self, limit: Optional[int] = None) -> List[FeedTrade]:
+        buf = self._buf
+        head = _SEQ.unpack_from(buf, _RING_HEAD)[0]
+        n = self.next
+        capacity = self.capacity
+        if head - n + 1 > capacity:
+            self.lost += head - capacity + 1 - n
+            n = head - capacity + 1
+        if limit is not None:
+            head = min(head, n + limit - 1)
+        out = []
+        seq_of = _SEQ.unpack_from
+        fields_of = _SLOT_FIELDS.unpack_from
+        while n <= head:
+            slot = _RING + ((n - 1) % capacity) * _SLOT_SIZE
+            expected = 2 * n
+            if seq_of(buf, slot)[0] == expected:
+                price, qty, version = fields_of(buf, slot + 8)
+                if seq_of(buf, slot)[0] == expected:
+                    out.append(FeedTrade(n, price, qty, version))
+                    n += 1
+                    continue
+            # Sobrescrito durante a leitura: o escritor já passou deste ponto
+            self.lost += 1
+            n += 1
+        self.next = n
+        return out
@@ -0,0 +1,304 @@
+# src/sinks.py
+import json
+import sys
+import threading
+from typing import List, Optional, TextIO
+
+from book import SIDE_NAMES, PEG_NAMES, TIF_NAMES, TimeInForce, format_order_id
+from ticks import TickSize
+
+from events import (
+    Trade,
+    OrderAccepted,
+    OrderModified,
+    OrderFilled,
+    OrderCancelled,
+    OrderKilled,
+    MassCancelled,
+    PeggedCancelled,
+    OrderRejected,
+    StopAccepted,
+    StopTriggered,
+    AuctionStarted,
+    MarketQueued,
+    AuctionUncrossed,
+    CANCEL_QTY_CHANGE,
+    CANCEL_NO_REFERENCE,
+    CANCEL_EXPIRED,
+    CANCEL_MASS,
+    REJECT_NOT_FOUND,
+    REJECT_NOT_ACTIVE,
+    REJECT_IS_PEGGED,
+    REJECT_NOT_PEGGED,
+    REJECT_INVALID_PEG,
+    REJECT_NO_BID,
+    REJECT_NO_OFFER,
+    REJECT_IS_STOP,
+    REJECT_EXPIRED,
+    REJECT_NO_OWNER,
+    REJECT_RISK_QTY,
+    REJECT_RISK_BAND,
+    REJECT_RISK_POSITION,
+    REJECT_RISK_NOTIONAL,
+    REJECT_RISK_RATE,
+)
+
+# Mensagens fixas das rejeições, idênticas às do motor original
+REJECT_MESSAGES = {
+    REJECT_NOT_FOUND: "Order not found",
+    REJECT_NOT_ACTIVE: "Order already filled or not active",
+    REJECT_IS_PEGGED: "Ordem é pegged. Use: modify order <id> <qty> para alterar ordens pegged.",
+    REJECT_NOT_PEGGED: "Ordem não é pegged. Use: modify order <id> <price> <qty> para ordens limit.",
+    REJECT_INVALID_PEG: "Combinação de peg inválida. Use: peg bid buy <qty> ou peg offer sell <qty>",
+    REJECT_NO_BID: "Não há bid para fazer peg.",
+    REJECT_NO_OFFER: "Não há offer para fazer peg.",
+    REJECT_IS_STOP: "Ordem é stop. Cancele e envie uma nova para alterá-la.",
+    REJECT_EXPIRED: "Prazo da ordem GTD já passou.",
+    REJECT_NO_OWNER: "Nenhum participante. Use: owner <nome> ou cancel all <participante>",
+    REJECT_RISK_QTY: "Risco: quantidade acima do máximo por ordem.",
+    REJECT_RISK_BAND: "Risco: preço fora da banda em torno do melhor bid/offer.",
+    REJECT_RISK_POSITION: "Risco: posição máxima excedida.",
+    REJECT_RISK_NOTIONAL: "Risco: nocional em aberto acima do máximo.",
+    REJECT_RISK_RATE: "Risco: limite de mensagens por segundo excedido.",
+}
+
+def _format_cancelled(e: OrderCancelled, px) -> str:
+    if e.reason == CANCEL_QTY_CHANGE:
+        return "Order cancelled by qty change"
+    if e.reason == CANCEL_EXPIRED:
+        return f"Order expired {format_order_id(e.order_id)}"
+    if e.reason == CANCEL_MASS:
+        return f"Order cancelled {format_order_id(e.order_id)}"
+    return "Order cancelled"
+
+def _format_killed(e: OrderKilled, px) -> str:
+    if e.tif == TimeInForce.FOK:
+        return f"FOK order killed: {SIDE_NAMES[e.side]} {e.qty} @ {px(e.price)}"
+    return f"IOC remainder cancelled: {SIDE_NAMES[e.side]} {e.qty} @ {px(e.price)}"
+
+def _format_pegged_cancelled(e: PeggedCancelled, px) -> str:
+    if e.reason == CANCEL_NO_REFERENCE:
+        return f"Pegged order cancelled (no {PEG_NAMES[e.reference]} reference) {format_order_id(e.order_id)}"
+    return f"Pegged order cancelled by qty change {format_order_id(e.order_id)}"
+
+def _format_stop_accepted(e: StopAccepted, px) -> str:
+    if e.limit_price is None:
+        return f"Stop order created: {SIDE_NAMES[e.side]} {e.qty} @ stop {px(e.stop_price)} {format_order_id(e.order_id)}"
+    return (
+        f"Stop-limit order created: {SIDE_NAMES[e.side]} {e.qty} @ {px(e.limit_price)} "
+        f"stop {px(e.stop_price)} {format_order_id(e.order_id)}"
+    )
+
+def _format_uncrossed(e: AuctionUncrossed, px) -> str:
+    if e.price is None:
+        return "Auction ended without trades"
+    return f"Auction uncrossed at {px(e.price)}, volume {e.volume}"
+
+def _format_mass_cancelled(e: MassCancelled, px) -> str:
+    sides = "buy/sell" if e.side is None else SIDE_NAMES[e.side]
+    return f"Mass cancel: {e.count} orders of {e.owner} ({sides})"
+
+# Formatadores por tipo de evento; px converte ticks no preço exibido
+_FORMATTERS = {
+    Trade: lambda e, px: f"Trade, price: {px(e.price)}, qty: {e.qty}",
+    OrderAccepted: lambda e, px: (
+        f"Order created: {SIDE_NAMES[e.side]} {e.qty} @ {px(e.price)} {format_order_id(e.order_id)}"
+    ),
+    OrderModified: lambda e, px: (
+        f"Order modified: {SIDE_NAMES[e.side]} {e.qty} @ {px(e.price)} {format_order_id(e.order_id)}"
+    ),
+    OrderFilled: lambda e, px: (
+        f"Order fully filled: {SIDE_NAMES[e.side]} {px(e.price)} {format_order_id(e.order_id)}"
+    ),
+    OrderCancelled: _format_cancelled,
+    OrderKilled: _format_killed,
+    MassCancelled: _format_mass_cancelled,
+    PeggedCancelled: _format_pegged_cancelled,
+    OrderRejected: lambda e, px: REJECT_MESSAGES[e.reason],
+    StopAccepted: _format_stop_accepted,
+    StopTriggered: lambda e, px: (
+        f"Stop order triggered: {format_order_id(e.order_id)} (last {px(e.last_price)})"
+    ),
+    AuctionStarted: lambda e, px: "Auction started",
+    MarketQueued: lambda e, px: f"Market order queued for auction: {SIDE_NAMES[e.side]} {e.qty}",
+    AuctionUncrossed: _format_uncrossed,
+}
+
+# Campos em ticks convertidos para preço na saída estruturada
+_PRICE_FIELDS = frozenset(("price", "stop_price", "limit_price", "last_price"))
+
+# Conversões dos campos internos (ticks, enums, ids inteiros) na saída estruturada
+_JSON_FIELDS = {
+    "side": SIDE_NAMES.__getitem__,
+    "reference": PEG_NAMES.__getitem__,
+    "tif": TIF_NAMES.__getitem__,
+    "order_id": format_order_id,
+}
+
+# Formata um evento na mensagem de texto do motor
+def format_event(event, ticks: TickSize) -> str:
+    return _FORMATTERS[type(event)](event, ticks.to_price)
+
+# Interface dos destinos de eventos do motor
+class Sink:
+    ticks = TickSize()
+
+    # Recebe do livro a grade de preços usada para exibir ticks
+    def bind(self, ticks: TickSize):
+        self.ticks = ticks
+
+    # Recebe um evento tipado
+    def emit(self, event):
+        raise NotImplementedError
+
+    # Recebe texto livre (livro impresso, mensagens de uso)
+    def write(self, text: str):
+        raise NotImplementedError
+
+    # Entrega o que estiver em buffer
+    def flush(self):
+        pass
+
+    # Encerra o destino, entregando o que restar
+    def close(self):
+        self.flush()
+
+# Descarta tudo; útil para benchmarks
+class NullSink(Sink):
+    def emit(self, event):
+        pass
+
+    def write(self, text: str):
+        pass
+
+# Guarda os eventos tipados numa lista (o texto livre vai para texts); usado pelo
+# fuzzer para comparar a saída de dois motores
+class ListSink(Sink):
+    def __init__(self):
+        self.events: List[object] = []
+        self.texts: List[str] = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+    def write(self, text: str):
+        self.texts.append(text)
+
+# Texto com as mensagens originais, acumulado em buffer até flush
+# stream None usa o sys.stdout corrente no momento do flush
+class TextSink(Sink):
+    def __init__(self, stream: Optional[TextIO] = None, buffer_lines: int = 4096):
+        self.stream = stream
+        self.buffer_lines = buffer_lines
+        self._lines: List[str] = []
+
+    def emit(self, event):
+        self._lines.append(_FORMATTERS[type(event)](event, self.ticks.to_price))
+        if len(self._lines) >= self.buffer_lines:
+            self.flush()
+
+    def write(self, text: str):
+        self._lines.append(text)
+        if len(self._lines) >= self.buffer_lines:
+            self.flush()
+
+    def flush(self):
+        if not self._lines:
+            return
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write("\n".join(self._lines) + "\n")
+        self._lines.clear()
+
+    # Retira as linhas em buffer sem escrevê-las (saída capturada por comando)
+    def drain(self) -> List[str]:
+        lines = self._lines
+        self._lines = []
+        return lines
+
+# Um objeto JSON por linha: {"type": <evento>, ...campos}
+class JsonLinesSink(Sink):
+    def __init__(self, stream: Optional[TextIO] = None, buffer_lines: int = 4096):
+        self.stream = stream
+        self.buffer_lines = buffer_lines
+        self._lines: List[str] = []
+        self._dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    def _append(self, record: dict):
+        self._lines.append(self._dumps(record))
+        if len(self._lines) >= self.buffer_lines:
+            self.flush()
+
+    def emit(self, event):
+        record = {"type": type(event).__name__}
+        for name in event.__slots__:
+            value = getattr(event, name)
+            if value is not None:
+                if name in _PRICE_FIELDS:
+                    value = self.ticks.to_price(value)
+                elif name in _JSON_FIELDS:
+                    value = _JSON_FIELDS[name](value)
+            record[name] = value
+        self._append(record)
+
+    def write(self, text: str):
+        self._append({"type": "Text", "text": text})
+
+    def flush(self):
+        if not self._lines:
+            return
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write("\n".join(self._lines) + "\n")
+        self._lines.clear()
+
+# Agrupa eventos e repassa ao destino interno a cada N eventos ou a cada intervalo
+class BatchedSink(Sink):
+    def __init__(self, inner: Sink, max_events: int = 1024, interval: Optional[float] = None):
+        self.inner = inner
+        self.max_events = max_events
+        self._batch: List[tuple] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer = None
+        if interval is not None:
+            self._timer = threading.Thread(target=self._run_timer, args=(interval,), daemon=True)
+            self._timer.start()
+
+    def bind(self, ticks: TickSize):
+        self.ticks = ticks
+        self.inner.bind(ticks)
+
+    def _run_timer(self, interval: float):
+        while not self._stop.wait(interval):
+            self.flush()
+
+    def emit(self, event):
+        with self._lock:
+            self._batch.append((True, event))
+            full = len(self._batch) >= self.max_events
+        if full:
+            self.flush()
+
+    def write(self, text: str):
+        with self._lock:
+            self._batch.append((False, text))
+            full = len(self._batch) >= self.max_events
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch = self._batch
+            self._batch = []
+            for is_event, item in batch:
+                if is_event:
+                    self.inner.emit(item)
+                else:
+                    self.inner.write(item)
+            self.inner.flush()
+
+    def close(self):
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.join()
+        self.flush()
+        self.inner.close()
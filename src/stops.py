@@ -0,0 +1,152 @@
+# src/stops.py
+import heapq
+import sys
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from book import Side
+from retention import FILLED, CANCELLED
+from events import StopAccepted, StopTriggered, OrderRejected
+import limit
+import market
+
+# Ordem stop em repouso: vira market (limit_price None) ou limit ao disparar
+@dataclass(slots=True)
+class StopOrder:
+    side: Side
+    qty: int
+    stop_price: int
+    limit_price: Optional[int]
+    ts: int
+    id: int
+    # Participante que enviou a stop; a ordem disparada continua em seu nome
+    owner: Optional[str] = None
+
+# Ordens stop indexadas pelo preço de disparo. A compra dispara quando um negócio
+# sai a preço >= stop e a venda quando sai a <= stop; cada lado é uma lista
+# ordenada de (stop, ts, id), e o disparo por uma faixa de preços negociados é
+# um recorte por bisect, sem olhar as stops que não foram cruzadas
+class StopBook:
+    def __init__(self):
+        self._buys: List[Tuple[int, int, int]] = []
+        self._sells: List[Tuple[int, int, int]] = []
+        self.orders: Dict[int, StopOrder] = {}
+        # Disparadas e ainda não executadas: heap de (ts de entrada, id, ordem)
+        self.ready: List[Tuple[int, int, StopOrder]] = []
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def __contains__(self, order_id) -> bool:
+        return order_id in self.orders
+
+    # Stops em repouso em ordem de entrada
+    def __iter__(self) -> Iterator[StopOrder]:
+        return iter(sorted(self.orders.values(), key=lambda s: s.ts))
+
+    def add(self, stop: StopOrder):
+        insort(self._buys if stop.side == Side.BUY else self._sells, (stop.stop_price, stop.ts, stop.id))
+        self.orders[stop.id] = stop
+
+    # Retira uma stop em repouso pelo id (None se não houver)
+    def remove(self, order_id: Optional[int]) -> Optional[StopOrder]:
+        stop = self.orders.pop(order_id, None)
+        if stop is None:
+            return None
+        keys = self._buys if stop.side == Side.BUY else self._sells
+        key = (stop.stop_price, stop.ts, stop.id)
+        del keys[bisect_left(keys, key)]
+        return stop
+
+    # Move para a fila de execução as stops cruzadas por negócios entre low e high
+    def trigger(self, low: int, high: int):
+        ready = self.ready
+        orders = self.orders
+        buys = self._buys
+        k = bisect_right(buys, (high, sys.maxsize))
+        if k:
+            for _, ts, order_id in buys[:k]:
+                heapq.heappush(ready, (ts, order_id, orders.pop(order_id)))
+            del buys[:k]
+        sells = self._sells
+        k = bisect_left(sells, (low,))
+        if k < len(sells):
+            for _, ts, order_id in sells[k:]:
+                heapq.heappush(ready, (ts, order_id, orders.pop(order_id)))
+            del sells[k:]
+
+    # Próxima stop disparada, pela ordem de entrada
+    def pop_ready(self) -> StopOrder:
+        return heapq.heappop(self.ready)[2]
+
+    # Confere o índice contra as ordens e o último preço negociado
+    def check(self, last_price: Optional[int]):
+        for keys, side in ((self._buys, Side.BUY), (self._sells, Side.SELL)):
+            if keys != sorted(keys):
+                raise AssertionError(f"índice de stops de {side.name} fora de ordem")
+            for price, _, order_id in keys:
+                stop = self.orders.get(order_id)
+                if stop is None or stop.side != side or stop.stop_price != price:
+                    raise AssertionError(f"stop {order_id} do índice difere da ordem")
+                if last_price is not None and _crossed(side, price, last_price):
+                    raise AssertionError(f"stop {order_id} cruzada por {last_price} sem disparar")
+        if len(self._buys) + len(self._sells) != len(self.orders):
+            raise AssertionError("stops fora do índice")
+
+def _crossed(side: Side, stop_price: int, last_price: int) -> bool:
+    return last_price >= stop_price if side == Side.BUY else last_price <= stop_price
+
+# Processa a entrada de uma ordem stop; se o último negócio já cruzou o preço de
+# disparo, ela vai direto para a fila de execução
+def handle_stop(book, side: Side, stop_price: int, qty: int, limit_price: Optional[int], ts: int):
+    order_id = book._next_id()
+    stop = StopOrder(side, qty, stop_price, limit_price, ts, order_id, book.owner)
+    if book.owner is not None:
+        book._own(book.owner, side, order_id)
+    book.sink.emit(StopAccepted(side, qty, stop_price, limit_price, order_id))
+    if book.last_price is not None and _crossed(side, stop_price, book.last_price):
+        heapq.heappush(book.stops.ready, (ts, order_id, stop))
+    else:
+        book.stops.add(stop)
+
+# Executa uma stop disparada como market ou limit com o mesmo id e o mesmo
+# participante; se não ficar no livro, o id passa às ordens encerradas. Com o
+# estágio de risco, a ordem disparada passa pelos limites antes do motor e, se
+# rejeitada, a stop termina cancelada
+def execute_stop(book, stop: StopOrder):
+    book.sink.emit(StopTriggered(stop.id, book.last_price))
+    risk = book.risk
+    if risk is not None:
+        reason = risk.check_triggered(stop)
+        if reason is not None:
+            if book.journal is not None:
+                book.journal.log_stop_rejected(stop.id, reason)
+            book.sink.emit(OrderRejected(reason, stop.id))
+            book.terminated.add(stop.id, CANCELLED)
+            if stop.owner is not None:
+                book._disown(stop.owner, stop.side, stop.id)
+            return
+    ts = book._next_ts()
+    owner = book.owner
+    book.owner = stop.owner
+    try:
+        _execute(book, stop, ts)
+    finally:
+        book.owner = owner
+    if stop.id not in book.orders_by_id:
+        book.terminated.add(stop.id, FILLED)
+        if stop.owner is not None:
+            book._disown(stop.owner, stop.side, stop.id)
+
+# Envia a stop disparada como market (sem limite) ou limit
+def _execute(book, stop: StopOrder, ts: int):
+    if stop.limit_price is None:
+        if stop.side == Side.BUY:
+            market.match_market_buy(book, stop.qty, ts)
+        else:
+            market.match_market_sell(book, stop.qty, ts)
+    elif stop.side == Side.BUY:
+        limit.match_limit_buy(book, stop.limit_price, stop.qty, ts, order_id=stop.id)
+    else:
+        limit.match_limit_sell(book, stop.limit_price, stop.qty, ts, order_id=stop.id)
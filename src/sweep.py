@@ -0,0 +1,50 @@
+# src/sweep.py
+from typing import Optional
+from book import Side
+from events import Trade
+from retention import FILLED
+
+# Varredura do lado oposto por uma ordem agressora, usada pelos matchers de
+# limit e market: negocia a partir do topo até acabar a quantidade, o lado ou,
+# com limit_price, o preço aceitável (compra até limit_price, venda a partir
+# dele). As ordens consumidas saem de uma vez no fim (drop_front), sem copiar o
+# resto do lado; devolve a quantidade que sobrou. Com o estágio de risco ligado
+# (book.risk), cada execução atualiza a posição dos participantes; owner é o dono
+# da ordem agressora (None usa o participante corrente, book.owner)
+def sweep(book, resting, qty: int, limit_price: Optional[int], is_buy: bool, owner: Optional[str] = None) -> int:
+    emit = book.sink.emit
+    retire = book._retire
+    set_qty = resting.set_qty
+    risk = book.risk
+    if owner is None:
+        owner = book.owner
+    filled = 0
+    first_price = None
+    for best in resting:
+        if qty <= 0:
+            break
+        if limit_price is not None and (best.price > limit_price if is_buy else best.price < limit_price):
+            break
+        trade_qty = min(qty, best.qty)
+        trade_price = best.price
+        emit(Trade(trade_price, trade_qty))
+        if first_price is None:
+            first_price = trade_price
+
+        if risk is not None:
+            # Posição dos dois lados: o dono da ordem em repouso e o agressor
+            risk.fill(best.owner, best.side, trade_qty)
+            risk.fill(owner, Side.BUY if is_buy else Side.SELL, trade_qty)
+
+        qty -= trade_qty
+        set_qty(best, best.qty - trade_qty)
+        if best.qty == 0:
+            retire(best, FILLED)
+            filled += 1
+        else:
+            break
+    if filled > 0:
+        resting.drop_front(filled)
+    if first_price is not None:
+        book._traded(first_price, trade_price)
+    return qty
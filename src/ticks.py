@@ -0,0 +1,53 @@
+# src/ticks.py
+from decimal import Decimal
+from typing import Dict, Union
+
+# Tamanho de tick padrão dos preços
+DEFAULT_TICK = "0.01"
+
+# Preços circulam no motor como inteiros de ticks
+Ticks = int
+
+# Maior preço em ticks, em módulo: cabe num int64 (registros do journal)
+MAX_TICKS = (1 << 63) - 1
+
+# Entradas distintas mantidas no cache de formatação
+_CACHE_LIMIT = 1 << 16
+
+# Converte preços entre texto/float (bordas) e inteiros de ticks (motor)
+class TickSize:
+    def __init__(self, tick: Union[str, Decimal] = DEFAULT_TICK):
+        self.tick = Decimal(str(tick))
+        if not self.tick.is_finite() or self.tick <= 0:
+            raise ValueError(f"tick inválido: {tick}")
+        self._prices: Dict[int, float] = {}
+
+    def __str__(self) -> str:
+        return str(self.tick)
+
+    # Converte o texto de um preço em ticks; rejeita preços fora da grade ou de
+    # +-MAX_TICKS
+    def to_ticks(self, text: str) -> Ticks:
+        # Expoentes enormes (1e999999) estouram o contexto decimal no divmod
+        try:
+            value = Decimal(text)
+            if not value.is_finite():
+                raise ValueError(f"preço inválido: {text}")
+            ticks, rest = divmod(value, self.tick)
+        except ArithmeticError:
+            raise ValueError(f"preço inválido: {text}") from None
+        if rest:
+            raise ValueError(f"preço {text} fora do tick {self.tick}")
+        if abs(ticks) > MAX_TICKS:
+            raise ValueError(f"preço {text} fora do intervalo")
+        return int(ticks)
+
+    # Converte ticks no preço exibido (float, como no motor original)
+    def to_price(self, ticks: Ticks) -> float:
+        price = self._prices.get(ticks)
+        if price is None:
+            if len(self._prices) >= _CACHE_LIMIT:
+                self._prices.clear()
+            price = float(ticks * self.tick)
+            self._prices[ticks] = price
+        return price
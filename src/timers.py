@@ -0,0 +1,121 @@
+# src/timers.py
+# Roda de tempo hierárquica para a validade das ordens GTD. Cada nível tem 64
+# posições; um prazo fica no nível do dígito (base 64) mais alto em que difere do
+# tempo atual e na posição desse dígito, então os prazos de um nível vêm sempre
+# antes dos de níveis acima. Avançar o tempo visita só as posições ocupadas
+# (máscara de bits por nível): cada posição vencida ou dispara seus prazos ou os
+# redistribui nos níveis de baixo. Inserir é O(1); cada prazo desce no máximo
+# um nível por redistribuição, sem varrer o livro atrás de ordens vencidas.
+from typing import Dict, List, Tuple
+
+_BITS = 6
+_MASK = (1 << _BITS) - 1
+# 11 níveis de 6 bits cobrem qualquer prazo int64
+_LEVELS = 11
+
+# Prazos de validade por id de ordem, no tempo lógico do livro
+class TimingWheel:
+    def __init__(self, now: int = 0):
+        self.now = now
+        # Prazo de cada ordem agendada; as entradas das posições cujo id já saiu
+        # daqui (ordem executada ou cancelada) são descartadas ao vencer
+        self.deadlines: Dict[int, int] = {}
+        self._slots: List[Dict[int, List[Tuple[int, int]]]] = [{} for _ in range(_LEVELS)]
+        self._occupied = [0] * _LEVELS
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    def __contains__(self, order_id) -> bool:
+        return order_id in self.deadlines
+
+    # Agenda a expiração da ordem; o prazo precisa estar no futuro
+    def add(self, order_id: int, deadline: int):
+        if deadline <= self.now:
+            raise ValueError(f"prazo {deadline} não é posterior ao tempo atual {self.now}")
+        if deadline >> (_BITS * _LEVELS):
+            raise ValueError(f"prazo {deadline} fora do alcance da roda de tempo")
+        self.deadlines[order_id] = deadline
+        self._place(deadline, order_id)
+
+    # Desagenda a ordem (a entrada na posição fica até vencer)
+    def discard(self, order_id):
+        self.deadlines.pop(order_id, None)
+
+    def _place(self, deadline: int, order_id: int):
+        level = ((deadline ^ self.now).bit_length() - 1) // _BITS
+        slot = (deadline >> (level * _BITS)) & _MASK
+        slots = self._slots[level]
+        entries = slots.get(slot)
+        if entries is None:
+            slots[slot] = [(deadline, order_id)]
+            self._occupied[level] |= 1 << slot
+        else:
+            entries.append((deadline, order_id))
+
+    # Próxima posição ocupada: (nível, posição, início da sua faixa de tempo)
+    def _next_slot(self):
+        now = self.now
+        for level in range(_LEVELS):
+            occupied = self._occupied[level]
+            if not occupied:
+                continue
+            shift = level * _BITS
+            # Num nível, as posições ocupadas estão à frente do dígito atual
+            occupied &= -1 << ((now >> shift) & _MASK)
+            slot = (occupied & -occupied).bit_length() - 1
+            base = (now >> (shift + _BITS)) << (shift + _BITS)
+            return level, slot, base | (slot << shift)
+        return None
+
+    # Avança o tempo até now e retorna os ids vencidos (prazo <= now), por prazo e
+    # ordem de agendamento; um tempo anterior ao atual não muda nada
+    def advance(self, now: int) -> List[int]:
+        due = []
+        deadlines = self.deadlines
+        while True:
+            found = self._next_slot()
+            if found is None or found[2] > now:
+                break
+            level, slot, start = found
+            self.now = start
+            entries = self._slots[level].pop(slot)
+            self._occupied[level] &= ~(1 << slot)
+            for deadline, order_id in entries:
+                if deadlines.get(order_id) != deadline:
+                    continue
+                if deadline == start:
+                    del deadlines[order_id]
+                    due.append((deadline, order_id))
+                else:
+                    self._place(deadline, order_id)
+        if now > self.now:
+            self.now = now
+        due.sort()
+        return [order_id for _, order_id in due]
+
+    # Ordens agendadas em ordem de prazo: [(id, prazo)]
+    def items(self) -> List[Tuple[int, int]]:
+        return sorted(self.deadlines.items(), key=lambda item: (item[1], item[0]))
+
+    # Confere os prazos contra o tempo atual e as ordens vivas do livro
+    def check(self, orders_by_id: dict):
+        placed = set()
+        for level, slots in enumerate(self._slots):
+            mask = 0
+            for slot, entries in slots.items():
+                mask |= 1 << slot
+                for deadline, order_id in entries:
+                    if deadline <= self.now:
+                        raise AssertionError(f"prazo {deadline} da ordem {order_id} vencido sem expirar")
+                    if ((deadline ^ self.now).bit_length() - 1) // _BITS != level:
+                        raise AssertionError(f"prazo {deadline} da ordem {order_id} fora do nível {level}")
+                    if self.deadlines.get(order_id) == deadline:
+                        placed.add(order_id)
+            if mask != self._occupied[level]:
+                raise AssertionError(f"máscara do nível {level} difere das posições ocupadas")
+        for order_id in self.deadlines:
+            if order_id not in placed:
+                raise AssertionError(f"ordem {order_id} com prazo fora da roda")
+            if order_id not in orders_by_id:
+                raise AssertionError(f"ordem {order_id} com prazo não está no livro")